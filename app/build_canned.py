@@ -0,0 +1,53 @@
+"""
+Regenerates the canned answers served by the fast path (see app/canned.py),
+typically after the FAQ corpus changes. Only FAQs that are new or changed since
+the existing file was built are regenerated; removed FAQs are dropped.
+
+Usage:
+    python3 -m app.build_canned --output faq_index/canned_answers.json
+    # LLM-polished answers (needs GEMINI_API_KEY); failures fall back to the template
+    python3 -m app.build_canned --output faq_index/canned_answers.json --mode llm
+    CANNED_ANSWERS_PATH=faq_index/canned_answers.json python3 -m uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from .canned import build_canned_answers, read_canned_answers, save_canned_answers
+
+FAQ_FILE_PATH = os.path.join(os.path.dirname(__file__), "..", "SEED_DATA", "epic_vendor_faq.json")
+
+async def polished_answer(faq):
+    """Asks the LLM to answer the FAQ's own question from the FAQ, as /chat would."""
+    from .response import build_messages, call_llm_async
+    return await call_llm_async(build_messages(faq.get("question", ""), faq))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--faq-file", default=FAQ_FILE_PATH, help="FAQ corpus.")
+    parser.add_argument("--output", required=True, help="Canned answer file to write (updated in place if it exists).")
+    parser.add_argument("--mode", choices=("template", "llm"), default="template", help="How new answers are written.")
+    parser.add_argument("--force", action="store_true", help="Regenerate every answer, not only new or changed FAQs.")
+    args = parser.parse_args(argv)
+
+    with open(args.faq_file) as f:
+        faq_data = json.load(f)
+    previous = {} if args.force else read_canned_answers(args.output)
+
+    generate, source = None, "template"
+    if args.mode == "llm":
+        from .response import MODEL_NAME
+        generate, source = polished_answer, f"llm:{MODEL_NAME}"
+
+    start = time.perf_counter()
+    entries, counts = asyncio.run(build_canned_answers(faq_data, previous, generate, source))
+    save_canned_answers(entries, args.output)
+    print(
+        f"Wrote {len(entries)} canned answers to {args.output} in {time.perf_counter() - start:.2f}s "
+        f"({counts['kept']} unchanged, {counts['generated']} generated, {counts['templated']} templated, {counts['failed']} failed)"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Builds an offline embedding model for the embedding retriever (see app/embeddings.py).
+
+Two kinds of model can be built, both stored as a TF-IDF vocabulary plus a dense
+projection matrix, so encoding needs only numpy at serving time:
+  lsa            latent semantic analysis: a truncated SVD of the corpus's TF-IDF matrix
+  word-vectors   IDF-weighted average of pretrained word vectors, converted from a
+                 GloVe/word2vec text file (one "word v1 v2 ..." per line)
+
+Usage:
+    python3 -m app.build_embedding_model --output embedding_model --dim 128
+    python3 -m app.build_embedding_model --output embedding_model --word-vectors glove.6B.100d.txt
+    RETRIEVER_BACKEND=embedding EMBEDDING_MODEL_PATH=embedding_model python3 -m uvicorn app.main:app
+"""
+import argparse
+import json
+import os
+import random
+import time
+from typing import Dict, List
+
+import numpy as np
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS, TfidfVectorizer
+
+from .embeddings import save_projection_encoder
+
+FAQ_FILE_PATH = os.path.join(os.path.dirname(__file__), "..", "SEED_DATA", "epic_vendor_faq.json")
+
+def corpus_texts(faq_data: List[Dict], max_docs: int = 0, seed: int = 0) -> List[str]:
+    """Question and answer texts, optionally from a random sample of `max_docs` FAQs."""
+    if max_docs and len(faq_data) > max_docs:
+        faq_data = random.Random(seed).sample(faq_data, max_docs)
+    return [faq.get(field, '') for faq in faq_data for field in ("question", "answer")]
+
+def fit_lsa(texts: List[str], dim: int, seed: int = 0):
+    """Returns (terms, idf, projection) for an LSA model of at most `dim` dimensions."""
+    vectorizer = TfidfVectorizer(stop_words='english')
+    tfidf = vectorizer.fit_transform(texts)
+    # A truncated SVD has fewer components than both dimensions of the matrix.
+    dim = max(1, min(dim, tfidf.shape[0] - 1, tfidf.shape[1] - 1))
+    svd = TruncatedSVD(n_components=dim, random_state=seed).fit(tfidf)
+
+    vocabulary = vectorizer.vocabulary_
+    terms = sorted(vocabulary, key=vocabulary.get)
+    return terms, vectorizer.idf_, svd.components_.T
+
+def read_word_vectors(path: str, max_words: int = 0):
+    """Reads a GloVe/word2vec text file. Returns (words, vectors)."""
+    words, vectors = [], []
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            parts = line.rstrip().split(" ")
+            if len(parts) <= 2:
+                continue  # word2vec header line ("count dim") or blank line
+            words.append(parts[0].lower())
+            vectors.append(np.asarray(parts[1:], dtype=np.float32))
+            if max_words and len(words) >= max_words:
+                break
+    return words, np.vstack(vectors)
+
+def word_vector_model(texts: List[str], words: List[str], vectors: np.ndarray):
+    """
+    Returns (terms, idf, projection) for an IDF-weighted mean of word vectors.
+    Words that never occur in the corpus get the highest IDF seen in it.
+    """
+    vectorizer = TfidfVectorizer(stop_words='english').fit(texts)
+    corpus_idf = dict(zip(vectorizer.get_feature_names_out(), vectorizer.idf_))
+    max_idf = max(corpus_idf.values(), default=1.0)
+
+    terms, rows, seen = [], [], set()
+    for row, word in enumerate(words):
+        # Queries are lowercased and tokenized like TF-IDF, so only those tokens can match.
+        if word in seen or word in ENGLISH_STOP_WORDS or len(word) < 2 or not word.replace("_", "").isalnum():
+            continue
+        seen.add(word)
+        terms.append(word)
+        rows.append(row)
+    idf = np.array([corpus_idf.get(term, max_idf) for term in terms])
+    return terms, idf, vectors[rows]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--faq-file", default=FAQ_FILE_PATH, help="FAQ corpus to fit the model on.")
+    parser.add_argument("--output", required=True, help="Directory to write the model to.")
+    parser.add_argument("--dim", type=int, default=128, help="LSA dimensions (capped by the corpus size).")
+    parser.add_argument("--max-docs", type=int, default=0, help="Fit LSA on a random sample of this many FAQs (0: all).")
+    parser.add_argument("--word-vectors", help="GloVe/word2vec text file; builds a word-vector model instead of LSA.")
+    parser.add_argument("--max-words", type=int, default=200_000, help="Read only the first (most frequent) N word vectors.")
+    args = parser.parse_args(argv)
+
+    with open(args.faq_file) as f:
+        faq_data = json.load(f)
+
+    start = time.perf_counter()
+    texts = corpus_texts(faq_data, args.max_docs)
+    if args.word_vectors:
+        words, vectors = read_word_vectors(args.word_vectors, args.max_words)
+        terms, idf, projection = word_vector_model(texts, words, vectors)
+        kind = "word_vectors"
+    else:
+        terms, idf, projection = fit_lsa(texts, args.dim)
+        kind = "lsa"
+
+    save_projection_encoder(args.output, terms, idf, ENGLISH_STOP_WORDS, projection, kind)
+    print(f"Wrote {kind} model ({len(terms)} terms, {projection.shape[1]} dims) to {args.output} in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Fits the FAQ retriever offline and writes it in the on-disk index format, so
+workers can memory-map it at startup instead of fitting TF-IDF.
+
+Usage:
+    python3 -m app.build_index --output faq_index
+    FAQ_INDEX_PATH=faq_index python3 -m uvicorn app.main:app
+
+The index must be built with the same --passage-tokens as the app's FAQ_PASSAGE_TOKENS.
+
+Templated canned answers for the fast path are written to <output>/canned_answers.json;
+answers already there for unchanged FAQs (e.g. LLM-polished by app.build_canned) are kept.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from .canned import CANNED_FILE, build_canned_answers, read_canned_answers, save_canned_answers
+from .corpus import corpus_version
+from .index import save_index
+from .passages import split_passages
+from .retrieval import FAQRetriever
+
+FAQ_FILE_PATH = os.path.join(os.path.dirname(__file__), "..", "SEED_DATA", "epic_vendor_faq.json")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--faq-file", default=FAQ_FILE_PATH, help="FAQ corpus to index.")
+    parser.add_argument("--output", required=True, help="Directory to write the index to.")
+    parser.add_argument("--passage-tokens", type=int, default=int(os.getenv("FAQ_PASSAGE_TOKENS", "0")),
+                        help="Split answers into passages of about this many tokens (0: index whole FAQs).")
+    args = parser.parse_args(argv)
+
+    with open(args.faq_file, 'rb') as f:
+        raw = f.read()
+
+    start = time.perf_counter()
+    retriever = FAQRetriever(split_passages(json.loads(raw), args.passage_tokens))
+    save_index(retriever, args.output, corpus_version=corpus_version(raw), passage_tokens=args.passage_tokens)
+    print(f"Indexed {len(retriever.faq_data)} {'passages' if args.passage_tokens else 'FAQs'} to {args.output} in {time.perf_counter() - start:.2f}s")
+
+    canned_path = os.path.join(args.output, CANNED_FILE)
+    entries, counts = asyncio.run(build_canned_answers(json.loads(raw), read_canned_answers(canned_path)))
+    save_canned_answers(entries, canned_path)
+    print(f"Wrote {len(entries)} canned answers to {canned_path} ({counts['kept']} unchanged)")
+
+if __name__ == "__main__":
+    main()
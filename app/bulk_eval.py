@@ -0,0 +1,271 @@
+"""
+Runs a JSONL log of chat requests through the full chat pipeline in-process and
+writes one result per turn, for evaluating corpus, threshold or prompt changes
+on real traffic without a running server.
+
+Each input line is one request or one conversation:
+    {"id": "r1", "message": "What is Vendor Services?", "history": [...]}   # or "query"
+    {"id": "c1", "messages": ["What is Vendor Services?", {"message": "How much does it cost?", "faq_id": "faq_2"}]}
+A conversation's turns run in order, each with the history returned by the one
+before. An optional "faq_id" (null for questions the FAQ cannot answer) labels
+the expected match, as in SEED_DATA/epic_vendor_faq_queries.jsonl.
+
+The input is read lazily and results are written in input order as they
+complete, so memory stays constant however long the log is. Up to --concurrency
+requests or conversations are in flight at once (the LLM limiter and client
+still apply), and at most --window are buffered waiting for an earlier one.
+Output lines carry the input line number; rerunning with the same --output
+resumes after the last request that was completely written. The aggregate
+summary at the end covers the whole output file, including resumed results.
+
+The pipeline is configured by the usual environment variables (USE_MOCK_GEMINI,
+FAQ_INDEX_PATH, RETRIEVAL_RANKING, CANNED_ANSWERS_PATH, ...).
+
+Usage:
+    python3 -m app.bulk_eval SEED_DATA/epic_vendor_faq_queries.jsonl --output results.jsonl --mock
+    USE_MOCK_GEMINI=false python3 -m app.bulk_eval requests.jsonl --output results.jsonl --concurrency 16
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import sys
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Marks an absent label, since a null faq_id means "no FAQ should match".
+UNLABELLED = object()
+
+def read_items(lines: Iterable[str], start: int = 0) -> Iterator[Tuple[int, Dict]]:
+    """
+    Yields (line number, request) for each non-empty input line from line `start`
+    on. Requests are normalized to {"id", "history", "turns": [(message, label)]}.
+    """
+    for number, line in enumerate(lines):
+        if number < start or not line.strip():
+            continue
+        record = json.loads(line)
+        if "messages" in record:
+            turns = [
+                (turn, UNLABELLED) if isinstance(turn, str) else (turn.get("message", ""), turn.get("faq_id", UNLABELLED))
+                for turn in record["messages"]
+            ]
+        else:
+            turns = [(record.get("message", record.get("query", "")), record.get("faq_id", UNLABELLED))]
+        yield number, {
+            "id": record.get("id") or record.get("requestID") or str(number),
+            "history": record.get("history", []),
+            "turns": turns,
+        }
+
+async def ordered_map(items: Iterable, func: Callable[[Any], Awaitable[Any]], concurrency: int, window: int) -> AsyncIterator[Any]:
+    """
+    Yields func(item) for each item, in input order. At most `concurrency` calls
+    run at once and at most `window` items are pending, so a slow item holds back
+    the output without letting the buffer grow.
+    """
+    limiter = asyncio.Semaphore(concurrency)
+
+    async def run(item):
+        async with limiter:
+            return await func(item)
+
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(asyncio.ensure_future(run(item)))
+            if len(pending) >= max(window, concurrency):
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for task in pending:
+            task.cancel()
+
+class LatencySketch:
+    """
+    Latency percentiles in constant memory: counts per logarithmic bucket, each
+    2% wider than the one before, so percentiles are within about 1%.
+    """
+    GROWTH = 1.02
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+
+    def add(self, ms: float) -> None:
+        bucket = math.floor(math.log(max(ms, 0.01), self.GROWTH))
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.total += 1
+
+    def percentile(self, fraction: float) -> float:
+        if not self.total:
+            return 0.0
+        rank = min(self.total - 1, int(self.total * fraction))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen > rank:
+                # The bucket's midpoint.
+                return self.GROWTH ** (bucket + 0.5)
+        return 0.0
+
+class Summary:
+    """Aggregate metrics over the per-turn results."""
+    def __init__(self):
+        self.requests = 0
+        self.turns = 0
+        self.errors = 0
+        self.matched = 0
+        self.follow_ups = 0
+        self.cached = 0
+        self.canned = 0
+        self.labelled = 0
+        self.correct = 0
+        self.latency = LatencySketch()
+
+    def add(self, result: Dict) -> None:
+        self.turns += 1
+        self.requests += result["turn"] == result["turns"] - 1
+        if "error" in result:
+            self.errors += 1
+            return
+        self.matched += bool(result["sources"])
+        self.follow_ups += result["memory_used"]
+        self.cached += bool(result.get("cached"))
+        self.canned += bool(result.get("canned"))
+        if "correct" in result:
+            self.labelled += 1
+            self.correct += result["correct"]
+        self.latency.add(result["latency_ms"])
+
+    def report(self) -> Dict[str, Any]:
+        answered = max(self.turns - self.errors, 1)
+        report = {
+            "requests": self.requests,
+            "turns": self.turns,
+            "errors": self.errors,
+            "retrieval_hit_rate": round(self.matched / answered, 4),
+            "follow_up_rate": round(self.follow_ups / answered, 4),
+            "cached_rate": round(self.cached / answered, 4),
+            "canned_rate": round(self.canned / answered, 4),
+            "p50_ms": round(self.latency.percentile(0.50), 1),
+            "p95_ms": round(self.latency.percentile(0.95), 1),
+            "p99_ms": round(self.latency.percentile(0.99), 1),
+        }
+        if self.labelled:
+            report["accuracy"] = round(self.correct / self.labelled, 4)
+        return report
+
+def resume_point(path: str, summary: Summary) -> int:
+    """
+    Finds the first input line not completely written to `path`, adds the
+    complete results to `summary`, and truncates any partial request at the end.
+    """
+    if not os.path.exists(path):
+        return 0
+    next_line = 0
+    complete_bytes = 0
+    partial: List[Dict] = []
+    with open(path, "rb") as f:
+        offset = 0
+        for raw in f:
+            offset += len(raw)
+            if not raw.endswith(b"\n"):
+                break
+            result = json.loads(raw)
+            partial.append(result)
+            if result["turn"] == result["turns"] - 1:
+                for done in partial:
+                    summary.add(done)
+                partial = []
+                next_line = result["line"] + 1
+                complete_bytes = offset
+    with open(path, "r+b") as f:
+        f.truncate(complete_bytes)
+    return next_line
+
+async def evaluate(number: int, item: Dict, chat_turn, faq_questions: Dict[str, str]) -> List[Dict]:
+    """Runs the turns of one request or conversation; returns one result per turn."""
+    results = []
+    history = list(item["history"])
+    for turn, (message, label) in enumerate(item["turns"]):
+        result = {"line": number, "id": item["id"], "turn": turn, "turns": len(item["turns"]), "message": message}
+        start = time.perf_counter()
+        try:
+            response = await chat_turn(message, history)
+        except Exception as e:
+            print(f"Error evaluating line {number} turn {turn}: {e}", file=sys.stderr)
+            result["error"] = str(e)
+            results.append(result)
+            continue
+        result.update(
+            latency_ms=round((time.perf_counter() - start) * 1000, 3),
+            answer=response.answer, sources=response.sources, url=response.url, memory_used=response.memory_used,
+        )
+        for flag in ("cached", "canned"):
+            if getattr(response, flag):
+                result[flag] = True
+        if label is not UNLABELLED:
+            expected = [faq_questions[label]] if label in faq_questions else []
+            result["faq_id"] = label
+            result["correct"] = response.sources == expected
+        history = response.history
+        results.append(result)
+    return results
+
+async def run(input_path: str, output_path: str, concurrency: int, window: int, summary: Summary) -> int:
+    """Evaluates the requests not yet in the output file; returns how many were run."""
+    start = resume_point(output_path, summary)
+    if start:
+        print(f"Resuming after {summary.requests} completed requests (line {start})", file=sys.stderr)
+
+    from . import main as chat_app
+    # Labels name FAQs; with passages, the corpus entries are keyed by their parent FAQ.
+    faq_questions = {faq.get("faq_id") or faq["id"]: faq["question"] for faq in chat_app.corpus.faq_data if "id" in faq}
+
+    count = 0
+    with open(input_path) as lines, open(output_path, "a") as out:
+        items = read_items(lines, start)
+        async for results in ordered_map(
+            items, lambda entry: evaluate(entry[0], entry[1], chat_app.chat_turn, faq_questions), concurrency, window,
+        ):
+            # One write per request, so an interruption leaves at most one partial request.
+            out.write("".join(json.dumps(result) + "\n" for result in results))
+            out.flush()
+            for result in results:
+                summary.add(result)
+            count += 1
+    return count
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL file of chat requests or conversations.")
+    parser.add_argument("--output", required=True, help="JSONL results (resumed if it exists).")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests or conversations evaluated at once.")
+    parser.add_argument("--window", type=int, default=0, help="Completed results buffered for ordering (default: 4x concurrency).")
+    parser.add_argument("--mock", action="store_true", help="Use the mock LLM (sets USE_MOCK_GEMINI=true).")
+    parser.add_argument("--fresh", action="store_true", help="Overwrite the output instead of resuming.")
+    args = parser.parse_args(argv)
+
+    if args.mock:
+        os.environ["USE_MOCK_GEMINI"] = "true"
+    # Bulk runs don't need the FAQ file watcher.
+    os.environ.setdefault("FAQ_WATCH_INTERVAL_SECONDS", "0")
+    if args.fresh and os.path.exists(args.output):
+        os.remove(args.output)
+
+    summary = Summary()
+    start = time.perf_counter()
+    count = asyncio.run(run(args.input, args.output, args.concurrency, args.window or 4 * args.concurrency, summary))
+    elapsed = time.perf_counter() - start
+
+    report = summary.report()
+    print(f"Evaluated {count} requests in {elapsed:.2f}s ({count / max(elapsed, 1e-9):.1f}/s); wrote {args.output}", file=sys.stderr)
+    print(json.dumps(report, indent=2))
+    return report
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+class CacheBackend(ABC):
+    """
+    A bounded key/value store with TTL and LRU eviction.
+    Values must be JSON-serializable so backends can be shared between processes.
+    """
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.evictions = 0
+        self.expirations = 0
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """Returns the stored value, or None if the key is missing or expired."""
+
+    @abstractmethod
+    def set(self, key: str, value: Any) -> None:
+        """Stores a value, evicting the least recently used entries if the store is full."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Removes a key if present."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Removes every entry."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    In-process LRU cache built on an OrderedDict. Fast, but private to one worker.
+    """
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 3600):
+        super().__init__(max_size, ttl_seconds)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    LRU cache stored in a local SQLite file. Several worker processes can point
+    at the same file to share entries, standing in for an external store such as Redis.
+    """
+    def __init__(self, path: str, max_size: int = 1024, ttl_seconds: float = 3600):
+        super().__init__(max_size, ttl_seconds)
+        self.path = path
+        self._lock = threading.Lock()
+        self._connect()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)")
+
+    def _connect(self) -> None:
+        self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._pid = os.getpid()
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        # A connection must not be used across fork (see app/serve.py): a forked worker opens its own.
+        if self._pid != os.getpid():
+            self._connect()
+        return self._connection
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+
+            value, expires_at = row
+            if expires_at <= now:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self.expirations += 1
+                return None
+
+            self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            return json.loads(value)
+
+    def set(self, key: str, value: Any) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + self.ttl_seconds, now),
+            )
+            overflow = len(self) - self.max_size
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at LIMIT ?)",
+                    (overflow,),
+                )
+                self.evictions += overflow
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+def create_cache_backend(backend: str, max_size: int, ttl_seconds: float, path: str = "") -> CacheBackend:
+    """
+    Builds a cache backend by name ("memory" or "sqlite").
+    """
+    if backend == "memory":
+        return MemoryCacheBackend(max_size=max_size, ttl_seconds=ttl_seconds)
+    if backend == "sqlite":
+        return SQLiteCacheBackend(path, max_size=max_size, ttl_seconds=ttl_seconds)
+    raise ValueError(f"Unknown cache backend: {backend}")
+
+def normalize_query(query: str) -> str:
+    """
+    Normalizes a query for cache lookups: lowercase, punctuation removed, whitespace collapsed.
+    "What is Vendor Services?" and "what is vendor services" share a cache entry.
+    """
+    return " ".join(re.sub(r"[^\w\s]", " ", query.lower()).split())
+
+class AnswerCache:
+    """
+    Caches generated answers for non-follow-up turns, keyed on the matched FAQ id
+    plus the normalized query. Only the answer text is stored; the response itself
+    is rebuilt by the normal pipeline so cached replies match uncached ones exactly.
+    """
+    def __init__(self, backend: Optional[CacheBackend], namespace: str = ""):
+        self.backend = backend
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None and self.backend.max_size > 0
+
+    def key(self, faq_id: str, query: str) -> str:
+        return f"{self.namespace}|{faq_id}|{normalize_query(query)}"
+
+    def get(self, faq_id: str, query: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+
+        answer = self.backend.get(self.key(faq_id, query))
+        if answer is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return answer
+
+    def set(self, faq_id: str, query: str, answer: str) -> None:
+        if self.enabled:
+            self.backend.set(self.key(faq_id, query), answer)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "size": len(self.backend) if self.enabled else 0,
+            "max_size": self.backend.max_size if self.backend else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.backend.evictions if self.backend else 0,
+            "expirations": self.backend.expirations if self.backend else 0,
+        }
+
+def answer_cache_from_env(namespace: str) -> AnswerCache:
+    """
+    Builds the answer cache from environment variables:
+      ANSWER_CACHE_SIZE (0 disables), ANSWER_CACHE_TTL_SECONDS,
+      ANSWER_CACHE_BACKEND ("memory" or "sqlite"), ANSWER_CACHE_PATH (sqlite file).
+    """
+    max_size = int(os.getenv("ANSWER_CACHE_SIZE", "1024"))
+    if max_size <= 0:
+        return AnswerCache(None, namespace)
+
+    backend = create_cache_backend(
+        os.getenv("ANSWER_CACHE_BACKEND", "memory"),
+        max_size=max_size,
+        ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600")),
+        path=os.getenv("ANSWER_CACHE_PATH", "answer_cache.sqlite3"),
+    )
+    return AnswerCache(backend, namespace)
@@ -0,0 +1,127 @@
+"""
+Canned answers: responses precomputed per FAQ, served without an LLM call when
+a fresh question matches an FAQ with high confidence (typically a near-exact
+copy of the FAQ question).
+
+Canned answers are written next to the index by `python -m app.build_index`
+(templated, like the mock LLM), and can be regenerated or LLM-polished offline
+with `python -m app.build_canned`. Each entry records a hash of the FAQ it was
+built from; entries whose FAQ has since changed or been removed are ignored at
+load time, so a corpus edit never serves a stale answer.
+
+File format (JSON):
+    {"format_version": 1, "created_at": ..., "answers": {
+        <faq id>: {"question": ..., "content_hash": ..., "answer": ..., "source": "template" | "llm:<model>"}}}
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .mock import template_answer
+from .retrieval import SearchHit
+
+FORMAT_VERSION = 1
+CANNED_FILE = "canned_answers.json"
+
+def faq_key(faq: Dict) -> str:
+    """The FAQ id a canned answer is stored under (the parent FAQ of a passage)."""
+    return faq.get("faq_id") or faq.get("id") or faq.get("question", "")
+
+def content_hash(faq: Dict) -> str:
+    return hashlib.sha1(json.dumps(faq, sort_keys=True).encode()).hexdigest()[:12]
+
+def fast_path_confidence(hit: SearchHit) -> float:
+    """
+    How sure retrieval is that the query asks exactly the FAQ's question: the
+    calibrated confidence of a hybrid hit, or the question similarity of a
+    cascade hit. Matches on the answer text never qualify.
+    """
+    if hit.confidence is not None:
+        return hit.confidence
+    return hit.score if hit.field == "question" else 0.0
+
+def read_canned_answers(path: str) -> Dict[str, Dict]:
+    """The entries of a canned-answer file, or {} if it does not exist."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        data = json.load(f)
+    if data.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported canned answer format {data.get('format_version')!r} in {path}")
+    return data["answers"]
+
+def save_canned_answers(entries: Dict[str, Dict], path: str) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({"format_version": FORMAT_VERSION, "created_at": time.time(), "answers": entries}, f, indent=2)
+    # Atomic replace, so a running app never reads a half-written file.
+    os.replace(tmp_path, path)
+
+async def build_canned_answers(faq_data: List[Dict], previous: Optional[Dict[str, Dict]] = None,
+                               generate: Optional[Callable[[Dict], Awaitable[str]]] = None,
+                               source: str = "template") -> Tuple[Dict[str, Dict], Dict[str, int]]:
+    """
+    Builds the canned answer of every FAQ. Entries in `previous` whose FAQ is
+    unchanged are kept as they are; the others are generated with `generate`
+    (an LLM call, recorded as `source`), or templated if it is omitted or fails.
+
+    Returns the entries and counts of kept, generated, templated and failed answers.
+    """
+    previous = previous or {}
+    counts = {"kept": 0, "generated": 0, "templated": 0, "failed": 0}
+
+    async def attempt(faq: Dict) -> Optional[str]:
+        try:
+            return await generate(faq)
+        except Exception as e:
+            print(f"Error generating canned answer for {faq_key(faq)}: {e}")
+            counts["failed"] += 1
+            return None
+
+    stale = []
+    for faq in faq_data:
+        entry = previous.get(faq_key(faq))
+        if not (entry and entry.get("content_hash") == content_hash(faq) and (generate is None or entry.get("source") == source)):
+            stale.append(faq)
+    # LLM calls run concurrently, bounded by the shared LLM limiter inside `generate`.
+    generated = await asyncio.gather(*(attempt(faq) for faq in stale)) if generate is not None else [None] * len(stale)
+    answers = {faq_key(faq): answer for faq, answer in zip(stale, generated)}
+
+    entries: Dict[str, Dict] = {}
+    for faq in faq_data:
+        key = faq_key(faq)
+        if key not in answers:
+            entries[key] = previous[key]
+            counts["kept"] += 1
+        elif answers[key] is not None:
+            entries[key] = {"question": faq.get("question", ""), "content_hash": content_hash(faq), "answer": answers[key], "source": source}
+            counts["generated"] += 1
+        else:
+            entries[key] = {"question": faq.get("question", ""), "content_hash": content_hash(faq), "answer": template_answer(faq), "source": "template"}
+            counts["templated"] += 1
+    return entries, counts
+
+class CannedAnswers:
+    """
+    The canned answers that are valid for the current corpus, looked up by FAQ.
+    """
+    def __init__(self, entries: Dict[str, Dict]):
+        self.answers = {key: entry["answer"] for key, entry in entries.items()}
+        self.sources = {key: entry.get("source", "template") for key, entry in entries.items()}
+
+    @classmethod
+    def load(cls, path: str, faq_data: List[Dict]) -> "CannedAnswers":
+        """Loads the entries of `path` that were built from the current version of their FAQ."""
+        entries = read_canned_answers(path)
+        current = {faq_key(faq): content_hash(faq) for faq in faq_data}
+        return cls({key: entry for key, entry in entries.items() if current.get(key) == entry.get("content_hash")})
+
+    def get(self, faq: Dict) -> Optional[str]:
+        return self.answers.get(faq_key(faq))
+
+    def __len__(self) -> int:
+        return len(self.answers)
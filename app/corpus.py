@@ -0,0 +1,216 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from .canned import CannedAnswers
+from .index import load_index, read_manifest
+from .passages import split_passages
+from .retrieval import FAQRetriever, Retriever
+
+def corpus_version(raw: bytes) -> str:
+    """A short content hash identifying a version of the FAQ file."""
+    return hashlib.sha256(raw).hexdigest()[:12]
+
+class CorpusManager:
+    """
+    Owns the FAQ corpus and its retriever, and rebuilds the retriever when the
+    corpus file changes.
+
+    Rebuilds happen off the event loop, and the new retriever is swapped in with a
+    single attribute assignment. Callers should read `manager.retriever` once per
+    request and use that object throughout, so a request never mixes two indexes.
+
+    If `index_path` points at a prebuilt index (see `python -m app.build_index`)
+    for the same corpus version, it is memory-mapped instead of fitting TF-IDF.
+
+    With `backend="embedding"`, the retriever is an EmbeddingRetriever using the
+    model in `embedding_model_path` (see `python -m app.build_embedding_model`).
+    With `ranking="hybrid"`, it is a HybridRetriever fusing the TF-IDF scores with
+    the embedding scores (if the embedding backend is configured).
+
+    With `passage_tokens` > 0, answers are split into passages of about that many
+    tokens (see app/passages.py) and the retriever indexes passages instead of FAQs.
+
+    With `canned_path`, the canned answers for the fast path (see app/canned.py)
+    that match the current corpus are loaded as `manager.canned`, and reloaded
+    when either file changes.
+    """
+    def __init__(self, path: str, index_path: str = "", backend: str = "tfidf", embedding_model_path: str = "",
+                 retriever_options: Optional[Dict[str, Any]] = None, ranking: str = "cascade",
+                 hybrid_options: Optional[Dict[str, Any]] = None, passage_tokens: int = 0, canned_path: str = ""):
+        self.path = path
+        self.canned_path = canned_path
+        self.canned: Optional[CannedAnswers] = None
+        self._canned_mtime = 0.0
+        self.passage_tokens = passage_tokens
+        self.index_path = index_path
+        self.backend = backend
+        if ranking not in ("cascade", "hybrid"):
+            raise ValueError(f"Unknown ranking {ranking!r} (expected 'cascade' or 'hybrid')")
+        self.ranking = ranking
+        self.hybrid_options = hybrid_options or {}
+        self.retriever_options = retriever_options or {}
+        self.encoder = None
+        if backend == "embedding":
+            # Imported only for this backend, since a model may pull in heavy dependencies.
+            from .embeddings import embedding_retriever_options_from_env, load_encoder
+            self.encoder = load_encoder(embedding_model_path)
+            if retriever_options is None:
+                self.retriever_options = embedding_retriever_options_from_env()
+        elif backend != "tfidf":
+            raise ValueError(f"Unknown retriever backend {backend!r} (expected 'tfidf' or 'embedding')")
+        self.source = ""
+        self.retriever: Optional[Retriever] = None
+        self.version = ""
+        self.loaded_at = 0.0
+        self.last_reload_seconds = 0.0
+        self.reload_count = 0
+        self.last_error: Optional[str] = None
+        self._mtime = 0.0
+        self._lock = asyncio.Lock()
+        self.load()
+
+    @property
+    def faq_data(self):
+        return self.retriever.faq_data
+
+    def load(self) -> bool:
+        """
+        Reads the corpus file and rebuilds the retriever if its content changed.
+        Returns True if a new retriever was swapped in.
+        """
+        self._mtime = os.path.getmtime(self.path)
+        with open(self.path, 'rb') as f:
+            raw = f.read()
+
+        version = corpus_version(raw)
+        if version == self.version:
+            return self.load_canned(raw)
+
+        start = time.perf_counter()
+        previous = self.retriever
+        semantic = None
+        if self.encoder is not None:
+            from .embeddings import EmbeddingRetriever
+            semantic = EmbeddingRetriever(self.entries(raw), self.encoder, **self.retriever_options)
+
+        if semantic is not None and self.ranking != "hybrid":
+            retriever = semantic
+            self.source = "embedding"
+        else:
+            retriever = None
+            if self.index_matches(version):
+                try:
+                    retriever = load_index(self.index_path)
+                    self.source = "index"
+                except ValueError as e:
+                    # E.g. the index was rewritten while it was being loaded; fit the corpus instead.
+                    print(f"Error loading FAQ index: {e}")
+            if retriever is None:
+                faq_data = self.entries(raw)
+                # Unchanged documents reuse their tokenization from the current index.
+                retriever = FAQRetriever(faq_data, analyzed_cache=getattr(previous, "analyzed_cache", None))
+                self.source = "fit"
+            if self.ranking == "hybrid":
+                from .hybrid import HybridRetriever
+                retriever = HybridRetriever(retriever, semantic, **self.hybrid_options)
+
+        # The canned answers for the new corpus go live before its retriever, so a
+        # request that reads the retriever and then the canned answers never pairs
+        # a new FAQ with the answer precomputed for its old version.
+        if self.canned_path:
+            self.canned = self.read_canned(raw)
+        # Atomic swap: in-flight requests keep the retriever they already hold.
+        self.retriever = retriever
+        self.version = version
+        self.loaded_at = time.time()
+        self.last_reload_seconds = time.perf_counter() - start
+        if previous is not None:
+            self.reload_count += 1
+        return True
+
+    def canned_mtime(self) -> float:
+        try:
+            return os.path.getmtime(self.canned_path)
+        except OSError:
+            return 0.0
+
+    def read_canned(self, raw: bytes) -> CannedAnswers:
+        """The canned answers built from the FAQs in `raw`."""
+        self._canned_mtime = self.canned_mtime()
+        return CannedAnswers.load(self.canned_path, json.loads(raw))
+
+    def load_canned(self, raw: bytes) -> bool:
+        """
+        Reloads the canned answers if their file changed, keeping only entries
+        built from the FAQs in `raw`. Returns True if they were reloaded.
+        """
+        if not self.canned_path or self.canned_mtime() == self._canned_mtime:
+            return False
+        self.canned = self.read_canned(raw)
+        return True
+
+    def entries(self, raw: bytes) -> List[Dict]:
+        """The documents to index: the FAQs, or their passages."""
+        return split_passages(json.loads(raw), self.passage_tokens)
+
+    def index_matches(self, version: str) -> bool:
+        if not self.index_path:
+            return False
+        manifest = read_manifest(self.index_path)
+        return (
+            manifest is not None
+            and manifest.get("corpus_version") == version
+            and manifest.get("passage_tokens", 0) == self.passage_tokens
+        )
+
+    async def reload(self) -> bool:
+        """
+        Rebuilds the retriever in a worker thread. Concurrent reloads are serialized.
+        A corpus that fails to load leaves the current retriever in place.
+        """
+        async with self._lock:
+            try:
+                changed = await asyncio.to_thread(self.load)
+            except (OSError, ValueError) as e:
+                self.last_error = str(e)
+                print(f"Error reloading FAQ corpus: {e}")
+                raise
+            self.last_error = None
+            return changed
+
+    def file_changed(self) -> bool:
+        try:
+            return os.path.getmtime(self.path) != self._mtime or (bool(self.canned_path) and self.canned_mtime() != self._canned_mtime)
+        except OSError:
+            return False
+
+    async def watch(self, interval_seconds: float) -> None:
+        """
+        Polls the corpus file and reloads it when its modification time changes.
+        """
+        while True:
+            await asyncio.sleep(interval_seconds)
+            if self.file_changed():
+                try:
+                    await self.reload()
+                except (OSError, ValueError):
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "backend": self.backend,
+            "ranking": self.ranking,
+            "passage_tokens": self.passage_tokens,
+            "source": self.source,
+            "faq_count": len(self.retriever.faq_data),
+            "canned_answers": len(self.canned) if self.canned is not None else 0,
+            "loaded_at": self.loaded_at,
+            "last_reload_seconds": self.last_reload_seconds,
+            "reload_count": self.reload_count,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,291 @@
+"""
+Dense-embedding retrieval backend. Runs on CPU from offline model files, with no
+network access at startup or query time.
+
+An embedding model is a directory containing `encoder.json`, whose "type" is one of:
+  projection              vocabulary.json, idf.npy, projection.npy: a query's TF-IDF
+                          vector times a (terms x dim) matrix. Covers LSA models and
+                          IDF-weighted averages of word vectors (GloVe, word2vec),
+                          both written by `python -m app.build_embedding_model`.
+  sentence_transformers   a local sentence-transformers model directory ("model");
+                          the package is imported only when such a model is loaded.
+
+FAQ embeddings are kept as one C-contiguous float32 matrix per field with unit-norm
+rows, so scoring a query is a single matrix-vector product. Corpora larger than
+`ann_min_size` also get an IVF index (see IVFIndex), which scans only the vectors
+in the clusters nearest the query.
+"""
+import json
+import math
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from .index import TermVectorizer
+from .retrieval import Retriever, SearchHit
+
+ENCODER_FILE = "encoder.json"
+FIELDS = ("question", "answer")
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalizes rows in place and returns a C-contiguous float32 array. Zero rows stay zero."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+class Encoder(ABC):
+    """Maps texts to unit-norm float32 vectors of a fixed dimension."""
+    dim: int
+
+    @abstractmethod
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Returns a (len(texts), dim) C-contiguous float32 array with unit-norm rows
+        (all-zero for a text the model has no words for)."""
+
+class ProjectionEncoder(Encoder):
+    """
+    Projects TF-IDF vectors into a dense space: LSA when the projection comes from a
+    truncated SVD, an IDF-weighted mean of word vectors when it holds word vectors.
+    """
+    def __init__(self, vectorizer: TermVectorizer, projection: np.ndarray):
+        self.vectorizer = vectorizer
+        self.projection = projection
+        self.dim = projection.shape[1]
+
+    def encode(self, texts: List[str], batch_size: int = 4096) -> np.ndarray:
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            tfidf = self.vectorizer.transform(texts[start:start + batch_size]).astype(np.float32)
+            out[start:start + batch_size] = tfidf @ self.projection
+        return normalize_rows(out)
+
+class SentenceTransformerEncoder(Encoder):
+    def __init__(self, model_path: str):
+        # Optional dependency: only needed for this model type.
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_path, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        vectors = self.model.encode(texts, batch_size=64, convert_to_numpy=True, normalize_embeddings=True)
+        return normalize_rows(vectors.reshape(len(texts), self.dim))
+
+def save_projection_encoder(path: str, terms: List[str], idf: np.ndarray, stop_words, projection: np.ndarray, kind: str) -> None:
+    """Writes a projection model in the format read by load_encoder."""
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, "vocabulary.json"), 'w') as f:
+        json.dump(terms, f)
+    np.save(os.path.join(path, "idf.npy"), np.asarray(idf, dtype=np.float64))
+    np.save(os.path.join(path, "projection.npy"), np.ascontiguousarray(projection, dtype=np.float32))
+    with open(os.path.join(path, ENCODER_FILE), 'w') as f:
+        json.dump({"type": "projection", "kind": kind, "dim": int(projection.shape[1]), "stop_words": sorted(stop_words)}, f)
+
+def load_encoder(path: str) -> Encoder:
+    """Loads the embedding model in directory `path`."""
+    with open(os.path.join(path, ENCODER_FILE)) as f:
+        config = json.load(f)
+
+    if config["type"] == "projection":
+        with open(os.path.join(path, "vocabulary.json")) as f:
+            terms = json.load(f)
+        idf = np.load(os.path.join(path, "idf.npy"))
+        projection = np.load(os.path.join(path, "projection.npy"), mmap_mode="r")
+        return ProjectionEncoder(TermVectorizer(terms, idf, config["stop_words"]), projection)
+    if config["type"] == "sentence_transformers":
+        return SentenceTransformerEncoder(os.path.join(path, config.get("model", ".")))
+    raise ValueError(f"Unknown embedding model type {config['type']!r} in {path}")
+
+class IVFIndex:
+    """
+    Inverted-file approximate nearest-neighbour index over unit vectors (IVF-Flat).
+
+    Vectors are clustered with spherical k-means and stored sorted by cluster, so
+    each cluster is a contiguous slice. A query is scored against the centroids,
+    then exactly against the vectors of the `nprobe` nearest clusters.
+    """
+    def __init__(self, vectors: np.ndarray, n_lists: int = 0, iterations: int = 10, max_train: int = 50_000, seed: int = 0):
+        n = len(vectors)
+        self.n_lists = min(n, n_lists or max(1, int(math.sqrt(n))))
+        rng = np.random.default_rng(seed)
+
+        sample = vectors[rng.choice(n, min(n, max_train), replace=False)] if n > max_train else vectors
+        self.centroids = self._train(sample, iterations, rng)
+
+        assignment = self._assign(vectors, self.centroids)
+        order = np.argsort(assignment, kind="stable")
+        # Row position in `vectors` -> FAQ index.
+        self.ids = order.astype(np.int64)
+        self.vectors = np.ascontiguousarray(vectors[order])
+        self.offsets = np.searchsorted(assignment[order], np.arange(self.n_lists + 1))
+
+    def _train(self, sample: np.ndarray, iterations: int, rng) -> np.ndarray:
+        centroids = sample[rng.choice(len(sample), self.n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = self._assign(sample, centroids)
+            # Sum each cluster's members with one sparse one-hot product.
+            membership = csr_matrix(
+                (np.ones(len(sample), dtype=np.float32), (assignment, np.arange(len(sample)))),
+                shape=(self.n_lists, len(sample)),
+            )
+            sums = np.asarray(membership @ sample)
+            empty = np.flatnonzero(membership.getnnz(axis=1) == 0)
+            sums[empty] = sample[rng.choice(len(sample), len(empty))]
+            centroids = normalize_rows(sums)
+        return centroids
+
+    @staticmethod
+    def _assign(vectors: np.ndarray, centroids: np.ndarray, max_cells: int = 1 << 24) -> np.ndarray:
+        assignment = np.empty(len(vectors), dtype=np.int64)
+        chunk = max(1, max_cells // max(len(centroids), 1))
+        for start in range(0, len(vectors), chunk):
+            assignment[start:start + chunk] = (vectors[start:start + chunk] @ centroids.T).argmax(axis=1)
+        return assignment
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """Exact scores of every vector, in FAQ order."""
+        scores = np.empty(len(self.ids), dtype=np.float32)
+        scores[self.ids] = self.vectors @ query
+        return scores
+
+    def search(self, query: np.ndarray, k: int, nprobe: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns (FAQ indexes, scores) of up to `k` approximate nearest neighbours, best first."""
+        nprobe = min(nprobe, self.n_lists)
+        centroid_scores = self.centroids @ query
+        lists = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe] if nprobe < self.n_lists else np.arange(self.n_lists)
+
+        rows = np.concatenate([np.arange(self.offsets[i], self.offsets[i + 1]) for i in lists])
+        if len(rows) == 0:
+            return rows, np.empty(0, dtype=np.float32)
+        scores = np.concatenate([self.vectors[self.offsets[i]:self.offsets[i + 1]] @ query for i in lists])
+        ids = self.ids[rows]
+
+        if k < len(scores):
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        # Sort by descending score, breaking ties by FAQ index as in exact search.
+        top = top[np.lexsort((ids[top], -scores[top]))]
+        return ids[top], scores[top]
+
+class EmbeddingRetriever(Retriever):
+    """
+    Retriever backend scoring FAQs by cosine similarity of dense embeddings.
+    Same interface and question-then-answer cascade as FAQRetriever; the default
+    thresholds are calibrated for the projection models built from the seed FAQs.
+    """
+    DEFAULT_THRESHOLDS = {
+        "question": 0.6,
+        "answer": 0.4,
+    }
+
+    def __init__(self, faq_data: List[Dict], encoder: Encoder, thresholds: Optional[Dict[str, float]] = None,
+                 ann_min_size: int = 20_000, nprobe: int = 8, ann_lists: int = 0):
+        """
+        Args:
+            faq_data: The FAQ entries to index.
+            encoder: The embedding model (see load_encoder).
+            thresholds: Optional per-field overrides of DEFAULT_THRESHOLDS.
+            ann_min_size: Corpora with at least this many FAQs get an IVF index;
+                smaller ones are always scanned exactly.
+            nprobe: Number of IVF clusters scanned per query.
+            ann_lists: Number of IVF clusters (0: about sqrt of the corpus size).
+        """
+        self.faq_data = faq_data
+        self.encoder = encoder
+        self.thresholds = {**self.DEFAULT_THRESHOLDS, **(thresholds or {})}
+        self.nprobe = nprobe
+
+        self.embeddings: Dict[str, np.ndarray] = {}
+        self.ann: Dict[str, IVFIndex] = {}
+        for field in FIELDS:
+            vectors = encoder.encode([faq.get(field, '') for faq in faq_data]) if faq_data else np.zeros((0, encoder.dim), dtype=np.float32)
+            if len(faq_data) >= ann_min_size:
+                # The IVF index keeps the only copy of the vectors, in cluster order.
+                self.ann[field] = IVFIndex(vectors, n_lists=ann_lists)
+            else:
+                self.embeddings[field] = vectors
+
+    def field_scores(self, query: str) -> Dict[str, np.ndarray]:
+        """Exact cosine similarity of the query with every FAQ, per field."""
+        query_vector = self.encoder.encode([query])[0]
+        scores = {}
+        for field in FIELDS:
+            if field in self.ann:
+                scores[field] = self.ann[field].scores(query_vector)
+            else:
+                scores[field] = self.embeddings[field] @ query_vector
+        return scores
+
+    def search(self, query: str, k: int = 5, exact: bool = False) -> List[SearchHit]:
+        """
+        Returns up to `k` hits per field, question hits first, each field ordered
+        by descending score. Hits with a zero or negative score are dropped.
+
+        Args:
+            query: The user's input string.
+            k: Number of hits to return per field.
+            exact: Scan every FAQ even if the corpus has an IVF index.
+        """
+        if not self.faq_data or k <= 0:
+            return []
+        if exact or not self.ann:
+            hits = []
+            for field, scores in self.field_scores(query).items():
+                hits.extend(self._top_k(scores, k, field))
+            return hits
+
+        query_vector = self.encoder.encode([query])[0]
+        hits = []
+        for field in FIELDS:
+            ids, scores = self.ann[field].search(query_vector, k, self.nprobe)
+            hits.extend(
+                SearchHit(faq=self.faq_data[i], index=int(i), score=float(score), field=field)
+                for i, score in zip(ids, scores)
+                if score > 0
+            )
+        return hits
+
+    def find_best_matches(self, queries: List[str], max_cells: int = 1 << 22) -> List[Optional[Dict]]:
+        """
+        Batched find_best_match: queries are encoded together and, without an IVF
+        index, scored in chunks with one dense matrix product per field. Returns the
+        same FAQ (or None) per query as find_best_match.
+        """
+        if self.ann or not self.faq_data:
+            return super().find_best_matches(queries)
+
+        results: List[Optional[Dict]] = [None] * len(queries)
+        query_vectors = self.encoder.encode(queries)
+        pending = np.arange(len(queries))
+        for field in FIELDS:
+            if len(pending) == 0:
+                break
+            matrix = self.embeddings[field]
+            chunk = max(1, max_cells // len(matrix))
+            best_index = np.empty(len(pending), dtype=np.int64)
+            best_score = np.empty(len(pending), dtype=np.float32)
+            for start in range(0, len(pending), chunk):
+                scores = query_vectors[pending[start:start + chunk]] @ matrix.T
+                best_index[start:start + chunk] = scores.argmax(axis=1)
+                best_score[start:start + chunk] = scores.max(axis=1)
+
+            accepted = best_score > self.thresholds[field]
+            for query_position, faq_index in zip(pending[accepted], best_index[accepted]):
+                results[query_position] = self.faq_data[faq_index]
+            pending = pending[~accepted]
+        return results
+
+def embedding_retriever_options_from_env() -> Dict:
+    """
+    Retriever options from environment variables:
+      EMBEDDING_ANN_MIN_SIZE, EMBEDDING_NPROBE, EMBEDDING_ANN_LISTS.
+    """
+    return {
+        "ann_min_size": int(os.getenv("EMBEDDING_ANN_MIN_SIZE", "20000")),
+        "nprobe": int(os.getenv("EMBEDDING_NPROBE", "8")),
+        "ann_lists": int(os.getenv("EMBEDDING_ANN_LISTS", "0")),
+    }
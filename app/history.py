@@ -0,0 +1,199 @@
+"""
+Compacts the chat history into Gemini user/model turns for the answer prompt.
+
+The stored history interleaves the conversation with bookkeeping entries
+("Edited user", "Matched FAQ"). The compactor groups it into turns, keeps only
+the user message and the assistant reply of each, and notes the FAQ a turn was
+about only when it changes. Assistant replies that repeat the FAQ content
+already in the prompt have it replaced by a short reference.
+
+Recent turns are kept verbatim within a token budget; older turns are folded
+into a rolling extractive summary. Summaries are cached by a chained hash of
+the folded turns, so the next request in the same conversation only summarizes
+the newly folded turn.
+"""
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from .cache import MemoryCacheBackend
+from .passages import estimate_tokens
+from .rewrite import MATCHED_FAQ_PREFIX
+
+FAQ_REFERENCE = "[the FAQ content above]"
+SUMMARY_HEADER = "Summary of the earlier conversation:"
+
+@dataclass
+class HistoryTurn:
+    """One user message with the FAQ it matched (if any) and the assistant reply (if any)."""
+    user: str
+    faq: Optional[str] = None
+    reply: Optional[str] = None
+
+def history_turns(history: List[Dict]) -> List[HistoryTurn]:
+    """Groups a stored history into turns. Bookkeeping entries only contribute the matched FAQ."""
+    turns: List[HistoryTurn] = []
+    for msg in history:
+        role = msg.get("role")
+        content = msg.get("content", "")
+        if role == "user":
+            turns.append(HistoryTurn(user=content))
+        elif not turns:
+            # A trimmed history can start mid-turn; entries before the first user message are dropped.
+            continue
+        elif role == "Matched FAQ" and content.startswith(MATCHED_FAQ_PREFIX):
+            turns[-1].faq = content[len(MATCHED_FAQ_PREFIX):]
+        elif role == "assistant":
+            turns[-1].reply = content if turns[-1].reply is None else f"{turns[-1].reply}\n{content}"
+    return turns
+
+def append_message(messages: List[Dict], role: str, text: str) -> None:
+    """Appends a message, merging it into the previous one if it has the same role (Gemini expects alternation)."""
+    if messages and messages[-1]["role"] == role:
+        messages[-1]["parts"].append(text)
+    else:
+        messages.append({"role": role, "parts": [text]})
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cuts `text` to about `max_tokens` estimated tokens, at a word boundary."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    cut = text[:max(max_tokens, 1) * 4].rsplit(" ", 1)[0]
+    return f"{cut} ..."
+
+class HistoryCompactor:
+    """
+    Turns a stored history into prompt messages. See the module docstring.
+    """
+    def __init__(self, token_budget: int = 400, summary_tokens: int = 100, cache_size: int = 1024, cache_ttl_seconds: float = 3600):
+        """
+        Args:
+            token_budget: Estimated tokens for the verbatim turns (0: keep every turn).
+                The most recent turn is always kept, cut to the budget if needed.
+            summary_tokens: Estimated tokens for the summary of older turns; its
+                oldest lines are dropped first.
+            cache_size, cache_ttl_seconds: Bounds of the summary cache.
+        """
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.summaries = MemoryCacheBackend(max_size=cache_size, ttl_seconds=cache_ttl_seconds)
+        self.summary_hits = 0
+        self.summary_misses = 0
+
+    def turn_texts(self, turn: HistoryTurn, previous_faq: Optional[str], current_faq: Optional[Dict]) -> List[tuple]:
+        """The (role, text) messages for one turn."""
+        user = turn.user
+        current_question = current_faq.get("question") if current_faq else None
+        # The FAQ is only noted when the topic changes, and never for the FAQ already in the prompt.
+        if turn.faq and turn.faq != previous_faq and turn.faq != current_question:
+            user = f"{user}\n(matched FAQ: {turn.faq})"
+        texts = [("user", user)]
+        if turn.reply is not None:
+            reply = turn.reply
+            answer = (current_faq or {}).get("answer", "")
+            if answer and answer in reply:
+                reply = reply.replace(answer, FAQ_REFERENCE)
+            texts.append(("model", reply))
+        return texts
+
+    def summary_line(self, turn: HistoryTurn) -> str:
+        line = f"- The user asked: {truncate_tokens(turn.user, 30)}"
+        if turn.faq:
+            line += f" (FAQ: {turn.faq})"
+        elif turn.reply is not None:
+            line += " (no FAQ matched)"
+        return line
+
+    def summarize(self, turns: List[HistoryTurn]) -> str:
+        """
+        Rolling summary of `turns`, reusing the cached summary of the longest
+        already-summarized prefix.
+        """
+        keys = []
+        key = ""
+        for turn in turns:
+            key = hashlib.sha1(f"{key}|{json.dumps([turn.user, turn.faq, turn.reply])}".encode()).hexdigest()
+            keys.append(key)
+
+        start, lines = 0, []
+        for i in range(len(turns) - 1, -1, -1):
+            cached = self.summaries.get(keys[i])
+            if cached is not None:
+                start, lines = i + 1, list(cached)
+                break
+        if start == len(turns):
+            self.summary_hits += 1
+        else:
+            self.summary_misses += 1
+
+        for i in range(start, len(turns)):
+            lines.append(self.summary_line(turns[i]))
+            while len(lines) > 1 and estimate_tokens("\n".join(lines)) > self.summary_tokens:
+                lines.pop(0)
+            # A snapshot: `lines` keeps growing for the longer prefixes.
+            self.summaries.set(keys[i], tuple(lines))
+        return "\n".join([SUMMARY_HEADER] + lines)
+
+    def compact(self, history: List[Dict], current_faq: Optional[Dict] = None, user_input: Optional[str] = None) -> List[Dict]:
+        """
+        Returns the history as alternating user/model messages, starting with the
+        summary of any folded turns. A trailing unanswered turn for `user_input`
+        (the question being asked) is left out, since the prompt asks it separately.
+        """
+        turns = history_turns(history)
+        if turns and turns[-1].reply is None and turns[-1].user == user_input:
+            turns = turns[:-1]
+        if not turns:
+            return []
+
+        rendered = []
+        previous_faq = None
+        for turn in turns:
+            rendered.append(self.turn_texts(turn, previous_faq, current_faq))
+            previous_faq = turn.faq or previous_faq
+
+        kept = len(turns)
+        if self.token_budget > 0:
+            used = 0
+            kept = 0
+            for texts in reversed(rendered):
+                cost = sum(estimate_tokens(text) for _, text in texts)
+                if kept and used + cost > self.token_budget:
+                    break
+                used += cost
+                kept += 1
+            if kept == 1 and used > self.token_budget:
+                share = max(self.token_budget // len(rendered[-1]), 1)
+                rendered[-1] = [(role, truncate_tokens(text, share)) for role, text in rendered[-1]]
+
+        messages: List[Dict] = []
+        folded = len(turns) - kept
+        if folded:
+            append_message(messages, "user", self.summarize(turns[:folded]))
+        for texts in rendered[folded:]:
+            for role, text in texts:
+                append_message(messages, role, text)
+        return messages
+
+    def stats(self) -> Dict:
+        return {
+            "token_budget": self.token_budget,
+            "summary_tokens": self.summary_tokens,
+            "summary_cache_size": len(self.summaries),
+            "summary_hits": self.summary_hits,
+            "summary_misses": self.summary_misses,
+        }
+
+def history_compactor_from_env() -> HistoryCompactor:
+    """
+    Builds the compactor from environment variables:
+      HISTORY_TOKEN_BUDGET (0 keeps every turn), HISTORY_SUMMARY_TOKENS,
+      HISTORY_SUMMARY_CACHE_SIZE.
+    """
+    return HistoryCompactor(
+        token_budget=int(os.getenv("HISTORY_TOKEN_BUDGET", "400")),
+        summary_tokens=int(os.getenv("HISTORY_SUMMARY_TOKENS", "100")),
+        cache_size=int(os.getenv("HISTORY_SUMMARY_CACHE_SIZE", "1024")),
+    )
@@ -0,0 +1,236 @@
+"""
+Hybrid ranking: instead of the question-then-answer cascade, every signal
+(question text, answer text and section name, plus question and answer embeddings
+when a semantic retriever is configured) is scored in one pass and the results
+are fused into a single ranking, so a weak title match no longer hides a much
+better answer match.
+
+Each field is scored once per query. The top `candidates` FAQs of each text signal
+are pooled, every signal is read off for the pooled FAQs, and the pool is ranked
+by reciprocal-rank fusion ("rrf") or a weighted sum of scores ("weighted"). Hits
+carry a confidence from a logistic calibration over the raw signal scores, fitted
+offline on labelled queries (benchmarks/eval_retrieval.py --calibrate).
+"""
+import json
+import math
+import os
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .index import TermVectorizer
+from .retrieval import ANSWER_STOP_WORDS, FAQRetriever, Retriever, SearchHit
+
+FUSION_METHODS = ("weighted", "rrf")
+# Signals that nominate candidates; the section name only re-ranks them, since
+# every FAQ in a matching section would otherwise tie.
+CANDIDATE_SIGNALS = ("question", "answer", "semantic_question", "semantic_answer")
+
+class SectionIndex:
+    """TF-IDF over the distinct section names, scored once per section and broadcast to FAQs."""
+    def __init__(self, faq_data: List[Dict]):
+        sections = [faq.get('section', '') for faq in faq_data]
+        names = sorted(set(sections))
+        position = {name: i for i, name in enumerate(names)}
+        self.section_ids = np.array([position[name] for name in sections], dtype=np.int64)
+
+        analyzer = TermVectorizer([], np.zeros(0), ANSWER_STOP_WORDS)
+        document_frequency: Dict[str, int] = {}
+        for name in names:
+            for term in set(analyzer.analyze(name)):
+                document_frequency[term] = document_frequency.get(term, 0) + 1
+        terms = sorted(document_frequency)
+        # Smoothed IDF, as TfidfVectorizer computes it.
+        idf = np.array([math.log((1 + len(names)) / (1 + document_frequency[term])) + 1 for term in terms])
+        self.vectorizer = TermVectorizer(terms, idf, ANSWER_STOP_WORDS)
+        self.matrix = self.vectorizer.transform(names)
+
+    def scores(self, query: str) -> np.ndarray:
+        if not len(self.section_ids) or not self.vectorizer.vocabulary_:
+            return np.zeros(len(self.section_ids))
+        section_scores = (self.matrix @ self.vectorizer.transform([query]).T).toarray().ravel()
+        return section_scores[self.section_ids]
+
+@dataclass
+class Calibration:
+    """Logistic model mapping a hit's raw signal scores to the probability it is the right FAQ."""
+    coef: Dict[str, float] = field(default_factory=dict)
+    intercept: float = 0.0
+
+    def confidence(self, features: Dict[str, float]) -> float:
+        z = self.intercept + sum(weight * features.get(signal, 0.0) for signal, weight in self.coef.items())
+        return 1.0 / (1.0 + math.exp(-z))
+
+    def save(self, path: str) -> None:
+        with open(path, 'w') as f:
+            json.dump({"coef": self.coef, "intercept": self.intercept}, f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "Calibration":
+        with open(path) as f:
+            data = json.load(f)
+        return cls(coef=data["coef"], intercept=data["intercept"])
+
+def fit_calibration(rows: Sequence[Dict[str, float]], labels: Sequence[int], signals: Sequence[str], l2: float = 0.1, iterations: int = 25) -> Calibration:
+    """
+    Fits a Calibration by L2-regularized logistic regression (Newton's method).
+    `rows` are the signal scores of candidate hits; `labels` are 1 for correct hits.
+    """
+    x = np.array([[1.0] + [row.get(signal, 0.0) for signal in signals] for row in rows])
+    y = np.asarray(labels, dtype=np.float64)
+    penalty = l2 * np.eye(x.shape[1])
+    penalty[0, 0] = 0.0  # the intercept is not regularized
+    w = np.zeros(x.shape[1])
+    for _ in range(iterations):
+        p = 1.0 / (1.0 + np.exp(-x @ w))
+        gradient = x.T @ (p - y) + penalty @ w
+        hessian = (x * (p * (1 - p))[:, None]).T @ x + penalty
+        step = np.linalg.solve(hessian, gradient)
+        w -= step
+        if np.abs(step).max() < 1e-8:
+            break
+    return Calibration(coef={signal: float(weight) for signal, weight in zip(signals, w[1:])}, intercept=float(w[0]))
+
+class HybridRetriever(Retriever):
+    """
+    Ranks FAQs by fusing the per-field scores of a lexical FAQRetriever and,
+    optionally, a semantic (embedding) retriever. See the module docstring.
+    """
+    # A fused hit is accepted only if its calibrated confidence is above this threshold.
+    DEFAULT_THRESHOLDS = {"confidence": 0.5}
+    DEFAULT_WEIGHTS = {
+        "question": 1.0,
+        "answer": 0.8,
+        "section": 0.2,
+        "semantic_question": 1.0,
+        "semantic_answer": 0.8,
+    }
+    # Fitted on the top hits for SEED_DATA/epic_vendor_faq_queries.jsonl with weighted fusion
+    # and the lexical signals only. Semantic signals need a calibration fitted for the
+    # embedding model in use (benchmarks/eval_retrieval.py --calibrate).
+    DEFAULT_CALIBRATION = Calibration(coef={"question": 0.41, "answer": 8.47, "section": 2.78}, intercept=-1.49)
+
+    def __init__(self, lexical: FAQRetriever, semantic: Optional[Retriever] = None, fusion: str = "weighted",
+                 weights: Optional[Dict[str, float]] = None, rrf_k: int = 60, candidates: int = 20,
+                 thresholds: Optional[Dict[str, float]] = None, calibration: Optional[Calibration] = None):
+        """
+        Args:
+            lexical: TF-IDF retriever providing the question and answer scores.
+            semantic: Optional retriever with `field_scores` (e.g. EmbeddingRetriever)
+                over the same FAQs, providing the semantic_* signals.
+            fusion: "weighted" (weighted mean of scores) or "rrf" (reciprocal-rank fusion).
+            weights: Optional per-signal overrides of DEFAULT_WEIGHTS.
+            rrf_k: RRF damping constant; larger values flatten the rank contributions.
+            candidates: FAQs nominated per text signal.
+            thresholds: Optional override of the confidence threshold.
+            calibration: Confidence model; DEFAULT_CALIBRATION if omitted.
+        """
+        if fusion not in FUSION_METHODS:
+            raise ValueError(f"Unknown fusion method {fusion!r} (expected one of {', '.join(FUSION_METHODS)})")
+        self.lexical = lexical
+        self.semantic = semantic
+        self.faq_data = lexical.faq_data
+        self.fusion = fusion
+        self.weights = {**self.DEFAULT_WEIGHTS, **(weights or {})}
+        self.rrf_k = rrf_k
+        self.candidates = candidates
+        self.thresholds = {**self.DEFAULT_THRESHOLDS, **(thresholds or {})}
+        self.calibration = calibration or self.DEFAULT_CALIBRATION
+        self.sections = SectionIndex(self.faq_data)
+
+    @property
+    def analyzed_cache(self):
+        return self.lexical.analyzed_cache
+
+    def signal_scores(self, query: str) -> Dict[str, np.ndarray]:
+        """Scores of every FAQ for each signal, each field scored exactly once."""
+        scores = dict(self.lexical.field_scores(query))
+        scores["section"] = self.sections.scores(query)
+        if self.semantic is not None:
+            for name, values in self.semantic.field_scores(query).items():
+                scores[f"semantic_{name}"] = values
+        return scores
+
+    def candidate_pool(self, scores: Dict[str, np.ndarray]) -> np.ndarray:
+        """Union of the top `candidates` FAQs with a positive score in each text signal."""
+        pool = []
+        for signal in CANDIDATE_SIGNALS:
+            values = scores.get(signal)
+            if values is None or not len(values):
+                continue
+            if self.candidates < len(values):
+                top = np.argpartition(-values, self.candidates - 1)[:self.candidates]
+            else:
+                top = np.arange(len(values))
+            pool.append(top[values[top] > 0])
+        return np.unique(np.concatenate(pool)) if pool else np.zeros(0, dtype=np.int64)
+
+    def fuse(self, scores: Dict[str, np.ndarray], pool: np.ndarray) -> np.ndarray:
+        """Fused score of each pooled FAQ."""
+        fused = np.zeros(len(pool))
+        total_weight = 0.0
+        for signal, values in scores.items():
+            weight = self.weights.get(signal, 0.0)
+            pooled = values[pool]
+            total_weight += weight
+            if self.fusion == "weighted":
+                fused += weight * pooled
+                continue
+            # Competition ranking within the pool: tied scores share a rank.
+            ordered = np.sort(-pooled)
+            ranks = np.searchsorted(ordered, -pooled, side="left") + 1
+            fused += np.where(pooled > 0, weight / (self.rrf_k + ranks), 0.0)
+        return fused / total_weight if total_weight else fused
+
+    def search(self, query: str, k: int = 5) -> List[SearchHit]:
+        """
+        Returns up to `k` hits ordered by fused score, each with a calibrated
+        confidence. All hits have field "hybrid".
+        """
+        if not self.faq_data or k <= 0:
+            return []
+        return self.rank(self.signal_scores(query), k)
+
+    def rank(self, scores: Dict[str, np.ndarray], k: int) -> List[SearchHit]:
+        """Fuses precomputed signal scores (see signal_scores) into the top `k` hits."""
+        pool = self.candidate_pool(scores)
+        if not len(pool):
+            return []
+
+        fused = self.fuse(scores, pool)
+        # Sort by descending fused score, breaking ties by FAQ index.
+        order = np.lexsort((pool, -fused))[:k]
+        hits = []
+        for position in order:
+            i = int(pool[position])
+            hits.append(SearchHit(
+                faq=self.faq_data[i], index=i, score=float(fused[position]), field="hybrid",
+                confidence=self.calibration.confidence(self.features(scores, i)),
+            ))
+        return hits
+
+    @staticmethod
+    def features(scores: Dict[str, np.ndarray], index: int) -> Dict[str, float]:
+        """The raw signal scores of one FAQ: the calibration's input."""
+        return {signal: float(values[index]) for signal, values in scores.items()}
+
+    def best_hit(self, query: str) -> Optional[SearchHit]:
+        """Returns the top fused hit if its confidence is above the threshold, else None."""
+        hits = self.search(query, k=1)
+        if hits and hits[0].confidence > self.thresholds["confidence"]:
+            return hits[0]
+        return None
+
+def hybrid_options_from_env() -> Dict:
+    """
+    HybridRetriever options from environment variables:
+      HYBRID_FUSION ("weighted" or "rrf"), HYBRID_CONFIDENCE_THRESHOLD,
+      HYBRID_CALIBRATION_PATH (JSON written by benchmarks/eval_retrieval.py --calibrate).
+    """
+    calibration_path = os.getenv("HYBRID_CALIBRATION_PATH", "")
+    return {
+        "fusion": os.getenv("HYBRID_FUSION", "weighted"),
+        "thresholds": {"confidence": float(os.getenv("HYBRID_CONFIDENCE_THRESHOLD", "0.5"))},
+        "calibration": Calibration.load(calibration_path) if calibration_path else None,
+    }
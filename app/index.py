@@ -0,0 +1,188 @@
+"""
+On-disk format for a fitted FAQRetriever, so workers can load the index instead
+of re-fitting TF-IDF at startup.
+
+An index is a directory containing:
+  manifest.json                   format version, corpus version, passage size, per-field metadata
+  faqs.json                       the FAQ entries (or passages)
+  <field>.vocabulary.json         terms, in column order
+  <field>.idf.npy                 IDF weight per term
+  <field>.data.npy / .indices.npy / .indptr.npy
+                                  the TF-IDF matrix in term-major CSR form (one row
+                                  per term, i.e. the column-major layout scoring uses)
+
+The arrays are opened with `np.load(mmap_mode="r")`, so loading is near-instant and
+every worker reading the same index shares its pages through the OS page cache.
+
+Rewriting an index in place is safe for processes loading or serving it: the
+manifest is removed first and written last, every file is replaced by renaming
+(so existing memory maps keep the old data), and load_index rejects an index
+whose manifest changed while it was being read.
+"""
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from scipy.sparse import csc_matrix, csr_matrix
+
+from .retrieval import FAQRetriever
+from .text import tokenize
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+FAQS_FILE = "faqs.json"
+FIELDS = ("question", "answer")
+
+class TermVectorizer:
+    """
+    Query-time replacement for a fitted TfidfVectorizer, built from a saved
+    vocabulary and IDF weights. Produces the same L2-normalized TF-IDF vectors
+    as TfidfVectorizer.transform for the default settings used by FAQRetriever.
+    """
+    def __init__(self, terms: List[str], idf: np.ndarray, stop_words: Iterable[str]):
+        self.vocabulary_ = {term: i for i, term in enumerate(terms)}
+        self.idf_ = idf
+        self.stop_words = frozenset(stop_words)
+
+    def analyze(self, text: str) -> List[str]:
+        return tokenize(text, self.stop_words)
+
+    def transform(self, texts: List[str]) -> csr_matrix:
+        data, indices, indptr = [], [], [0]
+        for text in texts:
+            counts: Dict[int, int] = {}
+            for token in self.analyze(text):
+                column = self.vocabulary_.get(token)
+                if column is not None:
+                    counts[column] = counts.get(column, 0) + 1
+
+            columns = sorted(counts)
+            weights = np.array([counts[column] for column in columns], dtype=np.float64) * self.idf_[columns]
+            norm = np.sqrt(np.dot(weights, weights))
+            if norm > 0:
+                weights /= norm
+
+            data.extend(weights)
+            indices.extend(columns)
+            indptr.append(len(indices))
+
+        return csr_matrix(
+            (np.array(data, dtype=np.float64), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int32)),
+            shape=(len(texts), len(self.vocabulary_)),
+        )
+
+def _field_path(path: str, field: str, name: str) -> str:
+    return os.path.join(path, f"{field}.{name}")
+
+@contextmanager
+def _replace(path: str, mode: str = 'w'):
+    """Opens a temporary file that is renamed over `path` once written."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, mode) as f:
+        yield f
+    os.replace(tmp_path, path)
+
+def save_index(retriever: FAQRetriever, path: str, corpus_version: str = "", passage_tokens: int = 0) -> None:
+    """
+    Writes a fitted retriever to `path` in the on-disk index format. `passage_tokens`
+    records the passage size the FAQs were split with (0: whole FAQs).
+    """
+    os.makedirs(path, exist_ok=True)
+    # Without a manifest, the index is not loaded while its files are being replaced.
+    try:
+        os.remove(os.path.join(path, MANIFEST_FILE))
+    except FileNotFoundError:
+        pass
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "corpus_version": corpus_version,
+        "passage_tokens": passage_tokens,
+        "created_at": time.time(),
+        "faq_count": len(retriever.faq_data),
+        "fields": {},
+    }
+
+    vectorizers = {"question": retriever.question_vectorizer, "answer": retriever.answer_vectorizer}
+    matrices = {"question": retriever.question_matrix, "answer": retriever.answer_matrix}
+    for field in FIELDS:
+        matrix = matrices[field]
+        if matrix is None:
+            manifest["fields"][field] = None
+            continue
+
+        vocabulary = vectorizers[field].vocabulary_
+        terms = sorted(vocabulary, key=vocabulary.get)
+        with _replace(_field_path(path, field, "vocabulary.json")) as f:
+            json.dump(terms, f)
+
+        # A CSC matrix's arrays are the CSR arrays of its transpose (one row per term).
+        term_major = matrix.tocsc()
+        term_major.sort_indices()
+        arrays = {
+            "idf.npy": np.asarray(vectorizers[field].idf_, dtype=np.float64),
+            "data.npy": term_major.data.astype(np.float64),
+            "indices.npy": term_major.indices.astype(np.int32),
+            "indptr.npy": term_major.indptr.astype(np.int32),
+        }
+        for name, array in arrays.items():
+            with _replace(_field_path(path, field, name), 'wb') as f:
+                np.save(f, array)
+
+        manifest["fields"][field] = {
+            "shape": list(matrix.shape),
+            "nnz": int(term_major.nnz),
+            "stop_words": sorted(retriever.stop_words[field]),
+        }
+
+    with _replace(os.path.join(path, FAQS_FILE)) as f:
+        json.dump(retriever.faq_data, f)
+    # The manifest is written last so a partially written index is never loaded.
+    with _replace(os.path.join(path, MANIFEST_FILE)) as f:
+        json.dump(manifest, f)
+
+def read_manifest(path: str) -> Optional[Dict]:
+    """
+    Returns the index manifest, or None if there is no index at `path`.
+    """
+    try:
+        with open(os.path.join(path, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def load_index(path: str, thresholds: Optional[Dict[str, float]] = None) -> FAQRetriever:
+    """
+    Loads an index written by save_index. Matrix arrays are memory-mapped read-only.
+    """
+    manifest = read_manifest(path)
+    if manifest is None:
+        raise FileNotFoundError(f"No index manifest in {path}")
+    if manifest["format_version"] != FORMAT_VERSION:
+        raise ValueError(f"Unsupported index format {manifest['format_version']} (expected {FORMAT_VERSION})")
+
+    with open(os.path.join(path, FAQS_FILE)) as f:
+        faq_data = json.load(f)
+
+    fitted = {}
+    for field in FIELDS:
+        meta = manifest["fields"].get(field)
+        if meta is None:
+            fitted[field] = (None, None)
+            continue
+
+        with open(_field_path(path, field, "vocabulary.json")) as f:
+            terms = json.load(f)
+        idf = np.load(_field_path(path, field, "idf.npy"), mmap_mode="r")
+        arrays = [np.load(_field_path(path, field, name), mmap_mode="r") for name in ("data.npy", "indices.npy", "indptr.npy")]
+
+        matrix = csc_matrix(tuple(arrays), shape=tuple(meta["shape"]), copy=False)
+        fitted[field] = (TermVectorizer(terms, idf, meta["stop_words"]), matrix)
+
+    # A rewrite removes the manifest before replacing any file, so an unchanged
+    # manifest means every file read above belongs to it.
+    if read_manifest(path) != manifest:
+        raise ValueError(f"Index at {path} was rewritten while loading")
+    return FAQRetriever.from_fitted(faq_data, fitted["question"], fitted["answer"], thresholds=thresholds)
@@ -0,0 +1,345 @@
+"""
+Resilience layer around the LLM calls in app/response.py (or the mock LLM):
+per-attempt timeouts, an overall deadline per call, bounded retries with jittered
+backoff limited by a retry budget, and a circuit breaker shared by every call to
+the same upstream.
+
+While the breaker is open, calls fail immediately with CircuitOpenError, so the
+chat pipeline serves its fallback (retrieval-only answer, or the raw query instead
+of a rewrite) without waiting on an upstream that is known to be failing.
+
+With a `limiter` (the shared LLM concurrency limiter), each attempt first waits
+for a slot. Time spent queued locally is not an upstream fault, so it counts
+toward neither the attempt timeout, the deadline nor the breaker.
+"""
+import asyncio
+import os
+import random
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncContextManager, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from .metrics import LLM_CALLS, registry
+
+LLM_ATTEMPT_SECONDS = registry.histogram("chat_llm_attempt_seconds", "Duration of individual LLM attempts, by purpose and outcome.", ["purpose", "outcome"])
+LLM_RETRIES = registry.counter("chat_llm_retries_total", "LLM attempts that were retries.", ["purpose"])
+LLM_SHORT_CIRCUITS = registry.counter("chat_llm_short_circuits_total", "LLM calls rejected by the open circuit breaker.", ["purpose"])
+
+# HTTP-style status codes that mean the request itself is bad, not that the
+# upstream is unhealthy: these are neither retried nor counted by the breaker.
+NON_RETRYABLE_CODES = {400, 401, 403, 404}
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the LLM while the circuit breaker is open."""
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker. After `failure_threshold` consecutive failures the
+    breaker opens and rejects calls; after `reset_seconds` it lets a single trial
+    call through (half-open), which closes it on success or re-opens it on failure.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.changed_at = time.time()
+        self.times_opened = 0
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        """The current state; an open breaker turns half-open once `reset_seconds` have passed."""
+        if self._state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self._set_state(self.HALF_OPEN)
+            self._trial_in_flight = False
+        return self._state
+
+    def _set_state(self, state: str) -> None:
+        if state != self._state:
+            self._state = state
+            self.changed_at = time.time()
+
+    def allow_request(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+        self._set_state(self.CLOSED)
+
+    def release_trial(self) -> None:
+        """Called when a call ends without an outcome (e.g. the client went away)."""
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self._trial_in_flight = False
+        if self._state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                self.times_opened += 1
+            self.opened_at = time.monotonic()
+            self._set_state(self.OPEN)
+
+    def stats(self) -> Dict[str, Any]:
+        retry_in = 0.0
+        state = self.state
+        if state == self.OPEN:
+            retry_in = max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+        return {
+            "state": state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "reset_seconds": self.reset_seconds,
+            "state_changed_at": self.changed_at,
+            "half_open_in_seconds": retry_in,
+            "times_opened": self.times_opened,
+        }
+
+class RetryBudget:
+    """
+    Limits retries to a fraction of calls so that retries cannot multiply the load
+    on an upstream that is already struggling. Every call deposits `ratio` tokens
+    (up to `max_tokens`); every retry spends one.
+    """
+    def __init__(self, ratio: float = 0.2, max_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+
+    def deposit(self) -> None:
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+@dataclass
+class CallPolicy:
+    attempt_timeout_seconds: float
+    deadline_seconds: float
+    max_retries: int
+
+def is_retryable(error: BaseException) -> bool:
+    return getattr(error, "code", None) not in NON_RETRYABLE_CODES
+
+class ResilientLLMClient:
+    """
+    Runs LLM calls under a per-purpose CallPolicy ("answer", "rewrite") with a
+    shared circuit breaker and retry budget.
+    """
+    def __init__(self, policies: Dict[str, CallPolicy], breaker: Optional[CircuitBreaker] = None,
+                 retry_budget: Optional[RetryBudget] = None, backoff_base_seconds: float = 0.2,
+                 backoff_max_seconds: float = 2.0, rng: Optional[random.Random] = None,
+                 limiter: Optional[Callable[[], AsyncContextManager]] = None):
+        self.policies = policies
+        self.limiter = limiter
+        self.breaker = breaker or CircuitBreaker()
+        self.retry_budget = retry_budget or RetryBudget()
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.rng = rng or random.Random()
+        self.timeouts = 0
+        self.failures = 0
+        self.retries = 0
+        self.short_circuits = 0
+
+    def _check_breaker(self, purpose: str) -> None:
+        if not self.breaker.allow_request():
+            self.short_circuits += 1
+            LLM_SHORT_CIRCUITS.inc(purpose)
+            raise CircuitOpenError(f"LLM circuit breaker is open; skipping {purpose} call")
+
+    @asynccontextmanager
+    async def _slot(self) -> AsyncIterator[float]:
+        """Holds a slot on the limiter for the block; yields the seconds spent waiting for it."""
+        if self.limiter is None:
+            yield 0.0
+            return
+        queued_at = time.monotonic()
+        async with self.limiter():
+            yield time.monotonic() - queued_at
+
+    def _backoff(self, attempt: int) -> float:
+        # "Full jitter": a random delay up to the exponential backoff cap.
+        return self.rng.uniform(0, min(self.backoff_max_seconds, self.backoff_base_seconds * 2 ** attempt))
+
+    def _record_outcome(self, purpose: str, started: float, error: Optional[BaseException]) -> None:
+        if error is None:
+            outcome = "success"
+            self.breaker.record_success()
+        elif isinstance(error, asyncio.TimeoutError):
+            outcome = "timeout"
+            self.timeouts += 1
+            self.breaker.record_failure()
+        elif is_retryable(error):
+            outcome = "error"
+            self.failures += 1
+            self.breaker.record_failure()
+        else:
+            outcome = "rejected"
+            self.breaker.release_trial()
+        LLM_ATTEMPT_SECONDS.observe(time.perf_counter() - started, purpose, outcome)
+
+    async def _wait_before_retry(self, purpose: str, error: BaseException, attempt: int, policy: CallPolicy, deadline: float) -> bool:
+        """Sleeps before the next attempt. Returns False if the call should not be retried."""
+        if attempt >= policy.max_retries or not is_retryable(error) or not self.retry_budget.try_spend():
+            return False
+        delay = self._backoff(attempt)
+        # Only retry if the backoff leaves the next attempt a meaningful share of its timeout.
+        if time.monotonic() + delay + policy.attempt_timeout_seconds * 0.1 >= deadline:
+            return False
+        await asyncio.sleep(delay)
+        self.retries += 1
+        LLM_RETRIES.inc(purpose)
+        return True
+
+    async def call(self, purpose: str, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Awaits `fn(*args, **kwargs)` under the purpose's policy. Raises CircuitOpenError
+        without calling `fn` while the breaker is open, or the last error once retries
+        or the deadline are exhausted.
+        """
+        policy = self.policies[purpose]
+        deadline = time.monotonic() + policy.deadline_seconds
+        self.retry_budget.deposit()
+
+        attempt = 0
+        while True:
+            self._check_breaker(purpose)
+            try:
+                async with self._slot() as queued:
+                    deadline += queued
+                    LLM_CALLS.inc(purpose)
+                    started = time.perf_counter()
+                    timeout = min(policy.attempt_timeout_seconds, deadline - time.monotonic())
+                    result = await asyncio.wait_for(fn(*args, **kwargs), timeout=timeout)
+            except asyncio.CancelledError:
+                self.breaker.release_trial()
+                raise
+            except Exception as e:
+                self._record_outcome(purpose, started, e)
+                if not await self._wait_before_retry(purpose, e, attempt, policy, deadline):
+                    raise
+                attempt += 1
+                continue
+            self._record_outcome(purpose, started, None)
+            return result
+
+    async def stream(self, purpose: str, fn: Callable[..., AsyncIterator[str]], *args, **kwargs) -> AsyncIterator[str]:
+        """
+        Streaming counterpart of call. An attempt may be retried until its first chunk
+        arrives; after that, each chunk must arrive within the attempt timeout and a
+        failure is raised to the caller, since part of the answer was already delivered.
+        """
+        policy = self.policies[purpose]
+        deadline = time.monotonic() + policy.deadline_seconds
+        self.retry_budget.deposit()
+
+        attempt = 0
+        # The slot of the current attempt, held until its stream ends.
+        slot = AsyncExitStack()
+        while True:
+            self._check_breaker(purpose)
+            try:
+                deadline += await slot.enter_async_context(self._slot())
+            except asyncio.CancelledError:
+                self.breaker.release_trial()
+                raise
+            LLM_CALLS.inc(purpose)
+            started = time.perf_counter()
+            chunks = fn(*args, **kwargs).__aiter__()
+            try:
+                timeout = min(policy.attempt_timeout_seconds, deadline - time.monotonic())
+                first = await asyncio.wait_for(chunks.__anext__(), timeout=timeout)
+            except StopAsyncIteration:
+                self._record_outcome(purpose, started, None)
+                await slot.aclose()
+                return
+            except asyncio.CancelledError:
+                self.breaker.release_trial()
+                await slot.aclose()
+                raise
+            except Exception as e:
+                self._record_outcome(purpose, started, e)
+                await chunks.aclose()
+                await slot.aclose()
+                if not await self._wait_before_retry(purpose, e, attempt, policy, deadline):
+                    raise
+                attempt += 1
+                continue
+            break
+
+        finished = False
+        try:
+            yield first
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout=policy.attempt_timeout_seconds)
+                except StopAsyncIteration:
+                    break
+                yield chunk
+        except Exception as e:
+            finished = True
+            self._record_outcome(purpose, started, e)
+            raise
+        finally:
+            await chunks.aclose()
+            await slot.aclose()
+            if not finished:
+                # Completed normally, or the consumer stopped reading (e.g. the client disconnected).
+                self._record_outcome(purpose, started, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "breaker": self.breaker.stats(),
+            "timeouts": self.timeouts,
+            "failures": self.failures,
+            "retries": self.retries,
+            "short_circuits": self.short_circuits,
+            "retry_budget_tokens": round(self.retry_budget.tokens, 2),
+            "policies": {purpose: vars(policy) for purpose, policy in self.policies.items()},
+        }
+
+def llm_client_from_env(limiter: Optional[Callable[[], AsyncContextManager]] = None) -> ResilientLLMClient:
+    """
+    Builds the LLM client, queueing on `limiter`, from environment variables:
+      LLM_ATTEMPT_TIMEOUT_SECONDS / LLM_DEADLINE_SECONDS (answers),
+      LLM_REWRITE_TIMEOUT_SECONDS / LLM_REWRITE_DEADLINE_SECONDS (follow-up rewrites),
+      LLM_MAX_RETRIES, LLM_RETRY_BUDGET_RATIO,
+      LLM_BREAKER_FAILURES, LLM_BREAKER_RESET_SECONDS.
+    """
+    max_retries = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    return ResilientLLMClient(
+        policies={
+            "answer": CallPolicy(
+                attempt_timeout_seconds=float(os.getenv("LLM_ATTEMPT_TIMEOUT_SECONDS", "10")),
+                deadline_seconds=float(os.getenv("LLM_DEADLINE_SECONDS", "20")),
+                max_retries=max_retries,
+            ),
+            "rewrite": CallPolicy(
+                attempt_timeout_seconds=float(os.getenv("LLM_REWRITE_TIMEOUT_SECONDS", "3")),
+                deadline_seconds=float(os.getenv("LLM_REWRITE_DEADLINE_SECONDS", "5")),
+                max_retries=max_retries,
+            ),
+        },
+        breaker=CircuitBreaker(
+            failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+            reset_seconds=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30")),
+        ),
+        retry_budget=RetryBudget(ratio=float(os.getenv("LLM_RETRY_BUDGET_RATIO", "0.2"))),
+        limiter=limiter,
+    )
@@ -1,63 +1,191 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException
+from contextlib import asynccontextmanager
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional
+import asyncio
+import hashlib
 import json
 import os
+import time
 from dotenv import load_dotenv
 load_dotenv()
-from .retrieval import FAQRetriever
+from .canned import CannedAnswers, fast_path_confidence
+from .corpus import CorpusManager
+from .hybrid import hybrid_options_from_env
 from .models import ChatRequest, ChatResponse
-from .response import build_messages, call_llm, rewrite_query
-from .utils import is_follow_up_question
-from .mock import call_mock_llm
+from .retrieval import SearchHit
+from .response import (
+    build_messages, call_llm_async, generate_rewrite_async, prompt_tokens, stream_llm_async, llm_limiter,
+    history_compactor, llm_recording, MODEL_NAME, PROMPT_CONTEXT_TOKENS,
+)
+from .passages import context_text, estimate_tokens, sibling_passages
+from .cache import answer_cache_from_env
+from .rewrite import QueryRewriter
+from .session import session_store_from_env
+from .metrics import (
+    FAST_PATH, FAST_PATH_SAVED_SECONDS, FOLLOW_UPS, LLM_FALLBACKS, PROMPT_TOKENS, RETRIEVAL_MISSES, STAGE_SECONDS, TURNS,
+    MetricsMiddleware, SamplingProfiler, profile_dump_hook, record_stage, registry, tracer_from_env,
+)
+from .utils import FollowUpDetector
+from .llm_client import llm_client_from_env
+from .mock import call_mock_llm_async, call_mock_llm_stream
 
 USE_MOCK_GEMINI = os.getenv("USE_MOCK_GEMINI", "false").lower() == "true"
 
 # Load the FAQ data from the JSON file
 FAQ_FILE_PATH = os.path.join(os.path.dirname(__file__), "..", "SEED_DATA", "epic_vendor_faq.json")
-with open(FAQ_FILE_PATH, 'r') as f:
-    faq_data = json.load(f)
 
-# Create a single, pre-computed retriever instance when the app starts.
-retriever = FAQRetriever(faq_data)
+# How often to check the FAQ file for changes (0 disables the watcher; /admin/reload still works).
+FAQ_WATCH_INTERVAL_SECONDS = float(os.getenv("FAQ_WATCH_INTERVAL_SECONDS", "5"))
+# If set, /admin endpoints require this value in the X-Admin-Token header.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+# Optional prebuilt index (python -m app.build_index); used when it matches the FAQ file.
+FAQ_INDEX_PATH = os.getenv("FAQ_INDEX_PATH", "")
+# Retrieval backend: "tfidf" (default) or "embedding" with an offline model (python -m app.build_embedding_model).
+RETRIEVER_BACKEND = os.getenv("RETRIEVER_BACKEND", "tfidf")
+EMBEDDING_MODEL_PATH = os.getenv("EMBEDDING_MODEL_PATH", "")
+# "cascade" (best question match, else best answer match) or "hybrid" (fused ranking with calibrated confidence).
+RETRIEVAL_RANKING = os.getenv("RETRIEVAL_RANKING", "cascade")
+# Split FAQ answers into passages of about this many tokens for retrieval and prompts (0: whole FAQs).
+FAQ_PASSAGE_TOKENS = int(os.getenv("FAQ_PASSAGE_TOKENS", "0"))
+# Precomputed answers (python -m app.build_index / app.build_canned) served without the LLM
+# for fresh questions matched with at least CANNED_ANSWER_THRESHOLD confidence. Empty disables the fast path.
+CANNED_ANSWERS_PATH = os.getenv("CANNED_ANSWERS_PATH", "")
+CANNED_ANSWER_THRESHOLD = float(os.getenv("CANNED_ANSWER_THRESHOLD", "0.9"))
+# LLM time a canned answer is assumed to save until answer latencies have been measured.
+CANNED_ANSWER_LLM_SECONDS = float(os.getenv("CANNED_ANSWER_LLM_SECONDS", "1.0"))
+# If set (with SLOW_REQUEST_MS), a sampling profiler runs and slow requests are dumped here.
+PROFILE_SLOW_REQUESTS_DIR = os.getenv("PROFILE_SLOW_REQUESTS_DIR", "")
+
+# Build the retriever when the app starts. The corpus manager rebuilds it in the
+# background and swaps it in atomically whenever the FAQ file changes.
+corpus = CorpusManager(
+    FAQ_FILE_PATH, index_path=FAQ_INDEX_PATH, backend=RETRIEVER_BACKEND, embedding_model_path=EMBEDDING_MODEL_PATH,
+    ranking=RETRIEVAL_RANKING, hybrid_options=hybrid_options_from_env() if RETRIEVAL_RANKING == "hybrid" else None,
+    passage_tokens=FAQ_PASSAGE_TOKENS, canned_path=CANNED_ANSWERS_PATH,
+)
+
+# Follow-up detector with a prebuilt analyzer and memoized per-message term counts.
+follow_up_detector = FollowUpDetector()
+
+# Per-stage timing spans and slow-request hooks for the chat endpoints.
+tracer = tracer_from_env()
+
+# Timeouts, retries and the circuit breaker for every LLM call (real or mock).
+llm_client = llm_client_from_env(limiter=llm_limiter)
+registry.gauge(
+    "chat_llm_breaker_state", "LLM circuit breaker state: 0 closed, 1 half-open, 2 open.",
+    lambda: ("closed", "half_open", "open").index(llm_client.breaker.state),
+)
+
+async def resilient_rewrite_query(user_input: str, history: List[Dict]) -> str:
+    # Raises on failure or while the breaker is open; the rewriter then uses the raw query.
+    if not history:
+        return user_input
+    return await llm_client.call("rewrite", generate_rewrite_async, user_input, history)
+
+# Rewrites follow-ups locally where possible, only falling back to the LLM when needed.
+query_rewriter = QueryRewriter(resilient_rewrite_query)
+
+# Cache of generated answers for repeated non-follow-up questions.
+answer_cache = answer_cache_from_env(namespace="mock" if USE_MOCK_GEMINI else MODEL_NAME)
+
+# Server-side conversation history for clients that send a sessionID.
+session_store = session_store_from_env()
 
 # Define a constant for the maximum history length
 MAX_HISTORY_LENGTH = 20
 
-app = FastAPI()
+EMPTY_MESSAGE_ANSWER = "It looks like you sent an empty message. Please type a question to get started."
+NO_MATCH_ANSWER = "I'm sorry, I'm not sure how to help with that. Could you please rephrase your question or ask about a new topic?"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    watcher = None
+    if FAQ_WATCH_INTERVAL_SECONDS > 0:
+        watcher = asyncio.create_task(corpus.watch(FAQ_WATCH_INTERVAL_SECONDS))
+    profiler = None
+    if PROFILE_SLOW_REQUESTS_DIR and tracer.slow_request_seconds:
+        # Sample the event loop thread; this function runs on it.
+        profiler = SamplingProfiler(interval_seconds=float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000)
+        profiler.start()
+        tracer.add_slow_request_hook(profile_dump_hook(profiler, PROFILE_SLOW_REQUESTS_DIR))
+    yield
+    if watcher:
+        watcher.cancel()
+    if profiler:
+        profiler.stop()
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware, tracer=tracer, paths=["/chat", "/chat/stream"])
+# Set by the multi-process launcher (app/serve.py) when a worker starts draining on shutdown.
+app.state.draining = False
 
-@app.post("/chat", response_model=ChatResponse)
-def chat(req: ChatRequest) -> ChatResponse:
-    # Extract the user's message and conversation history from the request
-    user_message = req.message
-    history = req.history
+@dataclass
+class ChatTurn:
+    """
+    The state of a single chat turn after follow-up detection and retrieval,
+    shared by the regular and streaming endpoints.
+    """
+    user_message: str
+    history: List[Dict]
+    is_follow_up: bool
+    relevant_faq: Optional[Dict] = None
+    # All passages of the matched FAQ; the prompt includes as many as fit its token budget.
+    passages: List[Dict] = field(default_factory=list)
+    # The matched FAQ with its answer cut to the context the prompt carries, for the mock and fallback answers.
+    context_faq: Optional[Dict] = None
+    # Set when the fast path answers the turn without the LLM.
+    canned_answer: Optional[str] = None
+    sources: List[str] = field(default_factory=list)
+    fallback_used: bool = False
+    messages: Optional[List[Dict]] = None
 
+    @property
+    def url(self) -> str:
+        return self.relevant_faq.get("url", "") if self.relevant_faq else ""
+
+def empty_message_response(history: List[Dict]) -> ChatResponse:
     # Handle empty or whitespace-only input gracefully.
-    if not user_message or not user_message.strip():
-        return ChatResponse(
-            answer="It looks like you sent an empty message. Please type a question to get started.",
-            sources=[],
-            url="",
-            memory_used=False,
-            history=history  # Return original history
-        )
-    
+    return ChatResponse(
+        answer=EMPTY_MESSAGE_ANSWER,
+        sources=[],
+        url="",
+        memory_used=False,
+        history=history  # Return original history
+    )
+
+def fallback_answer(relevant_faq: Dict) -> str:
+    # Fallback: If LLM generation fails, provide a safe fallback using the retrieved data.
+    faq_question = relevant_faq.get("question", "No question found.")
+    return f"I found a relevant FAQ, but I'm having trouble generating a conversational response right now. \n\n**Question:** {faq_question}\n**Answer:** {relevant_faq.get('answer', 'Please check the source link.')}"
+
+async def prepare_turn(user_message: str, history: List[Dict]) -> ChatTurn:
+    """
+    Runs follow-up detection, the optional query rewrite and FAQ retrieval,
+    recording each step in the history.
+    """
+    # Use one retriever for the whole turn, even if a reload swaps in a new one meanwhile.
+    # The canned answers are read after it, so they are never older than its FAQs.
+    retriever = corpus.retriever
+    canned = corpus.canned
+
     # Determine if the input is a follow-up before doing anything else.
-    is_follow_up = is_follow_up_question(user_message, history)
-    
-    # The `memory_used` flag should reflect if this is a follow-up turn.
-    # If it's not a follow-up, we are starting a new context, so memory from the prior turn is not used.
-    memory_used = is_follow_up
+    with tracer.span("follow_up"):
+        is_follow_up = follow_up_detector.is_follow_up(user_message, history)
+    TURNS.inc()
+    if is_follow_up:
+        FOLLOW_UPS.inc()
 
     history.append({"role": "user", "content": user_message})
 
     if is_follow_up and not USE_MOCK_GEMINI:
         # If it's a follow-up, rewrite it to be a standalone query for better searching.
-        try:
-            search_query = rewrite_query(user_message, history[:-1])
-        except Exception:
-            # Fallback: If rewrite fails (LLM error), use the original message.
-            search_query = user_message
-            
+        # The rewriter also retrieves the FAQ for the rewritten query.
+        with tracer.span("rewrite"):
+            search_query, relevant_faq = await query_rewriter.rewrite(user_message, history[:-1], retriever)
         history.append({"role": "Edited user", "content": search_query})
     else:
         # If it's a new topic, use the message directly. No rewrite needed.
@@ -67,52 +195,162 @@ def chat(req: ChatRequest) -> ChatResponse:
         else:
             history.append({"role": "Edited user", "content": "No rewrite needed"})
 
-    # Now, retrieve the FAQ using the determined search_query.
-    relevant_faq = retriever.find_best_match(search_query)
-    
-    answer = ""
-    sources = []
+        # Now, retrieve the FAQ using the determined search_query.
+        with tracer.span("retrieval"):
+            hit = retriever.best_hit(search_query)
+        relevant_faq = hit.faq if hit else None
 
-    if USE_MOCK_GEMINI:
-        # Mock response for testing without calling the actual Gemini API
-        if relevant_faq:
-            faq_question = relevant_faq.get("question", "No question found.")
-            history.append({"role": "Matched FAQ", "content": f"Found: {faq_question}"})
-            sources = [faq_question]
-        else:
-            history.append({"role": "Matched FAQ", "content": "No relevant FAQ found."})
-            sources = []
-            
-        answer = call_mock_llm(relevant_faq, is_follow_up=is_follow_up)
-
-        if not is_follow_up:
-            history = history[-3:]
-    elif relevant_faq:
-        # --- Case 1: A relevant FAQ was found. ---
+    turn = ChatTurn(user_message=user_message, history=history, is_follow_up=is_follow_up, relevant_faq=relevant_faq)
+    if relevant_faq:
         faq_question = relevant_faq.get("question", "No question found.")
         history.append({"role": "Matched FAQ", "content": f"Found: {faq_question}"})
-        sources = [faq_question]
-        
-        # Generate a conversational answer using the LLM with the FAQ as context.
-        # Only include history if it is a follow-up; otherwise, treat it as a fresh query.
-        messages = build_messages(user_message, relevant_faq, history if is_follow_up else None)
-        try:
-            answer = call_llm(messages)
-        except Exception:
-            # Fallback: If LLM generation fails, provide a safe fallback using the retrieved data.
-            answer = f"I found a relevant FAQ, but I'm having trouble generating a conversational response right now. \n\n**Question:** {faq_question}\n**Answer:** {relevant_faq.get('answer', 'Please check the source link.')}"
-
-        # If it's not a follow-up, we can clear the history to avoid confusion in future interactions.
-        if not is_follow_up:
-            # Reset history to keep only the current turn (User, Edited User, Matched FAQ)
-            history = history[-3:]
+        turn.sources = [faq_question]
+        if not is_follow_up and canned is not None:
+            with tracer.span("fast_path"):
+                turn.canned_answer = canned_answer(hit, canned)
+            if turn.canned_answer is not None:
+                # No prompt is needed.
+                return turn
+        turn.passages = sibling_passages(retriever.faq_data, relevant_faq)
+        context = context_text(relevant_faq, turn.passages, user_message, PROMPT_CONTEXT_TOKENS)
+        turn.context_faq = {**relevant_faq, "answer": context}
     else:
-        # --- Case 2: No relevant FAQ was found. ---
+        RETRIEVAL_MISSES.inc()
         history.append({"role": "Matched FAQ", "content": "No relevant FAQ found."})
-        
+
+    return turn
+
+def canned_answer(hit: SearchHit, canned: CannedAnswers) -> Optional[str]:
+    """
+    The precomputed answer for a fresh question whose match is confident enough
+    (the fast path), or None if the turn needs the LLM.
+    """
+    if fast_path_confidence(hit) < CANNED_ANSWER_THRESHOLD:
+        FAST_PATH.inc("low_confidence")
+        return None
+    answer = canned.get(hit.faq)
+    if answer is None:
+        FAST_PATH.inc("no_answer")
+        return None
+    FAST_PATH.inc("hit")
+    FAST_PATH_SAVED_SECONDS.inc(amount=llm_seconds_estimate())
+    return answer
+
+def llm_seconds_estimate() -> float:
+    """
+    The mean time of an answer from the LLM: of a generated answer, else of a
+    streamed one, else CANNED_ANSWER_LLM_SECONDS before either has been measured.
+    """
+    for stage in ("llm", "llm_stream"):
+        if STAGE_SECONDS.count(stage):
+            return STAGE_SECONDS.mean(stage)
+    return CANNED_ANSWER_LLM_SECONDS
+
+def turn_messages(turn: ChatTurn) -> List[Dict]:
+    # Only include history if it is a follow-up; otherwise, treat it as a fresh query.
+    return build_messages(
+        turn.user_message, turn.relevant_faq, turn.history if turn.is_follow_up else None,
+        passages=turn.passages, token_budget=PROMPT_CONTEXT_TOKENS,
+    )
+
+def answer_messages(turn: ChatTurn) -> List[Dict]:
+    """
+    Builds the answer prompt, only for turns that reach the LLM, and records its
+    size next to the size it would have with the whole FAQ.
+    """
+    if turn.messages is None:
+        turn.messages = turn_messages(turn)
+        budgeted = prompt_tokens(turn.messages)
+        PROMPT_TOKENS.observe(budgeted, "budgeted")
+        # Only the FAQ content differs, so there is no need to build (and compact) the prompt again.
+        full_context = context_text(turn.relevant_faq, turn.passages, turn.user_message, 0)
+        PROMPT_TOKENS.observe(budgeted - estimate_tokens(turn.context_faq["answer"]) + estimate_tokens(full_context), "full_faq")
+    return turn.messages
+
+async def mock_generate(relevant_faq: Optional[Dict], is_follow_up: bool) -> str:
+    # Respect the same concurrency limit as the real LLM so load tests are representative.
+    async with llm_limiter():
+        return await call_mock_llm_async(relevant_faq, is_follow_up=is_follow_up)
+
+async def mock_stream(relevant_faq: Optional[Dict], is_follow_up: bool) -> AsyncIterator[str]:
+    async with llm_limiter():
+        async for chunk in call_mock_llm_stream(relevant_faq, is_follow_up=is_follow_up):
+            yield chunk
+
+def failure_answer(turn: ChatTurn) -> str:
+    # Only the mock is called without a matched FAQ, and it only fails when faults are injected.
+    return fallback_answer(turn.context_faq) if turn.context_faq else NO_MATCH_ANSWER
+
+async def generate_answer(turn: ChatTurn) -> str:
+    if USE_MOCK_GEMINI:
+        # Mock response for testing without calling the actual Gemini API.
+        call = llm_client.call("answer", mock_generate, turn.context_faq, turn.is_follow_up)
+    elif not turn.relevant_faq:
         # Fallback for when no FAQ is found
-        answer = "I'm sorry, I'm not sure how to help with that. Could you please rephrase your question or ask about a new topic?"
-    
+        return NO_MATCH_ANSWER
+    else:
+        # Generate a conversational answer using the LLM with the FAQ as context.
+        call = llm_client.call("answer", call_llm_async, answer_messages(turn))
+
+    try:
+        return await call
+    except Exception:
+        # Includes timeouts and an open circuit breaker, which fail without waiting on the LLM.
+        turn.fallback_used = True
+        LLM_FALLBACKS.inc()
+        return failure_answer(turn)
+
+async def stream_answer(turn: ChatTurn) -> AsyncIterator[str]:
+    """
+    Streaming counterpart of generate_answer. Yields answer chunks as the LLM produces them.
+    """
+    if USE_MOCK_GEMINI:
+        chunks = llm_client.stream("answer", mock_stream, turn.context_faq, turn.is_follow_up)
+    elif not turn.relevant_faq:
+        yield NO_MATCH_ANSWER
+        return
+    else:
+        chunks = llm_client.stream("answer", stream_llm_async, answer_messages(turn))
+
+    streamed_any = False
+    try:
+        async for chunk in chunks:
+            streamed_any = True
+            yield chunk
+    except Exception:
+        # Keep whatever was already shown and append the retrieval-only fallback.
+        turn.fallback_used = True
+        LLM_FALLBACKS.inc()
+        yield ("\n\n" if streamed_any else "") + failure_answer(turn)
+
+def is_cacheable(turn: ChatTurn) -> bool:
+    # Follow-ups depend on the conversation, so only fresh questions with a matched FAQ are cached.
+    return not turn.is_follow_up and turn.relevant_faq is not None
+
+def faq_cache_id(faq: Dict, passages: Optional[List[Dict]] = None) -> str:
+    # Include a content hash so answers cached before a corpus edit are never served for the edited FAQ.
+    # The prompt may include every passage of the FAQ, so all of them are hashed.
+    content = json.dumps(passages or faq, sort_keys=True).encode()
+    return f"{faq.get('faq_id') or faq.get('id') or faq.get('question', '')}:{hashlib.sha1(content).hexdigest()[:12]}"
+
+def cached_answer(turn: ChatTurn) -> Optional[str]:
+    if not is_cacheable(turn):
+        return None
+    return answer_cache.get(faq_cache_id(turn.relevant_faq, turn.passages), turn.user_message)
+
+def store_answer(turn: ChatTurn, answer: str) -> None:
+    # Never cache the fallback answer served when the LLM call failed.
+    if is_cacheable(turn) and not turn.fallback_used:
+        answer_cache.set(faq_cache_id(turn.relevant_faq, turn.passages), turn.user_message, answer)
+
+def finish_turn(turn: ChatTurn, answer: str) -> ChatResponse:
+    history = turn.history
+
+    # If it's not a follow-up, we can clear the history to avoid confusion in future interactions.
+    if (USE_MOCK_GEMINI or turn.relevant_faq) and not turn.is_follow_up:
+        # Reset history to keep only the current turn (User, Edited User, Matched FAQ)
+        history = history[-3:]
+
     history.append({"role": "assistant", "content": answer})
 
     # Limit history to prevent context overflow.
@@ -121,12 +359,230 @@ def chat(req: ChatRequest) -> ChatResponse:
 
     return ChatResponse(
         answer=answer,
-        sources=sources,
-        url=relevant_faq.get("url", "") if relevant_faq else "",
-        memory_used=memory_used,
+        sources=turn.sources,
+        url=turn.url,
+        # The `memory_used` flag should reflect if this is a follow-up turn.
+        # If it's not a follow-up, we are starting a new context, so memory from the prior turn is not used.
+        memory_used=turn.is_follow_up,
         history=history
     )
 
+def check_sessions_enabled() -> None:
+    if not session_store.enabled:
+        raise HTTPException(status_code=400, detail="Sessions are disabled on this server")
+
+def session_response(session_id: str, previous_length: int, history: List[Dict], response: ChatResponse) -> ChatResponse:
+    """
+    Stores the conversation for the session and trims the response to the new turn,
+    which starts at its "user" entry. An empty message adds no turn.
+    """
+    new_turn = []
+    if len(history) > previous_length:
+        session_store.save(session_id, response.history)
+        start = max(i for i, msg in enumerate(response.history) if msg.get("role") == "user")
+        new_turn = response.history[start:]
+    response.history = new_turn
+    response.sessionID = session_id
+    return response
+
+async def chat_turn(user_message: str, history: List[Dict]) -> ChatResponse:
+    if not user_message or not user_message.strip():
+        return empty_message_response(history)
+
+    turn = await prepare_turn(user_message, history)
+    if turn.canned_answer is not None:
+        response = finish_turn(turn, turn.canned_answer)
+        response.canned = True
+        return response
+
+    with tracer.span("cache"):
+        answer = cached_answer(turn)
+    if answer is not None:
+        response = finish_turn(turn, answer)
+        response.cached = True
+        return response
+
+    with tracer.span("llm"):
+        answer = await generate_answer(turn)
+    store_answer(turn, answer)
+    return finish_turn(turn, answer)
+
+@app.post("/chat", response_model=ChatResponse, response_model_exclude_none=True)
+async def chat(req: ChatRequest) -> ChatResponse:
+    tracer.tag(req.requestID)
+    if not req.sessionID:
+        # Stateless mode: the client sends and receives the whole history.
+        response = await chat_turn(req.message, req.history)
+    else:
+        check_sessions_enabled()
+        async with session_store.lock(req.sessionID):
+            history = session_store.load(req.sessionID)
+            previous_length = len(history)
+            response = session_response(req.sessionID, previous_length, history, await chat_turn(req.message, history))
+
+    tracer.handler_done()
+    return response
+
+def sse_event(event: str, data: Dict) -> str:
+    """Formats a single Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def turn_events(user_message: str, history: List[Dict]) -> AsyncIterator[tuple]:
+    """
+    Yields (event, data) pairs for a streamed chat turn. The `done` data is the
+    ChatResponse itself, so the caller can adjust it before it is serialized.
+    """
+    if not user_message or not user_message.strip():
+        response = empty_message_response(history)
+        yield "meta", {"sources": [], "url": "", "memory_used": False}
+        yield "token", {"text": response.answer}
+        yield "done", response
+        return
+
+    turn = await prepare_turn(user_message, history)
+    yield "meta", {"sources": turn.sources, "url": turn.url, "memory_used": turn.is_follow_up}
+
+    if turn.canned_answer is not None:
+        yield "token", {"text": turn.canned_answer}
+        response = finish_turn(turn, turn.canned_answer)
+        response.canned = True
+        yield "done", response
+        return
+
+    with tracer.span("cache"):
+        answer = cached_answer(turn)
+    if answer is not None:
+        yield "token", {"text": answer}
+        response = finish_turn(turn, answer)
+        response.cached = True
+        yield "done", response
+        return
+
+    chunks = []
+    start = time.perf_counter()
+    async for chunk in stream_answer(turn):
+        if not chunks:
+            record_stage("llm_first_token", time.perf_counter() - start)
+        chunks.append(chunk)
+        yield "token", {"text": chunk}
+    # Includes time the client took to read the stream, since generation is paced by it.
+    record_stage("llm_stream", time.perf_counter() - start)
+
+    answer = "".join(chunks)
+    store_answer(turn, answer)
+    yield "done", finish_turn(turn, answer)
+
+async def chat_events(req: ChatRequest) -> AsyncIterator[str]:
+    """
+    Yields the SSE events for a streamed chat turn:
+      - `meta`:  sources, url and memory_used, sent as soon as retrieval finishes
+      - `token`: answer chunks as they are generated
+      - `done`:  the complete ChatResponse, identical to what /chat returns
+    """
+    if not req.sessionID:
+        async for event, data in turn_events(req.message, req.history):
+            yield sse_event(event, data.model_dump(exclude_none=True) if event == "done" else data)
+        return
+
+    async with session_store.lock(req.sessionID):
+        history = session_store.load(req.sessionID)
+        previous_length = len(history)
+        async for event, data in turn_events(req.message, history):
+            if event == "done":
+                data = session_response(req.sessionID, previous_length, history, data).model_dump(exclude_none=True)
+            yield sse_event(event, data)
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest) -> StreamingResponse:
+    tracer.tag(req.requestID)
+    if req.sessionID:
+        check_sessions_enabled()
+    return StreamingResponse(
+        chat_events(req),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def check_admin_token(token: str) -> None:
+    if ADMIN_TOKEN and token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@app.post("/admin/reload")
+async def reload_corpus(x_admin_token: str = Header(default="")):
+    """
+    Rebuilds the retriever from the FAQ file and swaps it in. No-op if the file is unchanged.
+    """
+    check_admin_token(x_admin_token)
+    try:
+        changed = await corpus.reload()
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=500, detail=f"Reload failed, keeping the current corpus: {e}")
+    return {"reloaded": changed, **corpus.stats()}
+
+@app.get("/healthz")
+def healthz():
+    # Liveness: the worker is up and its event loop is responsive.
+    return {"status": "ok", "pid": os.getpid()}
+
+@app.get("/readyz")
+def readyz():
+    """
+    Readiness: 200 once the corpus is loaded, 503 while it is not or while the
+    worker is draining, so a load balancer only routes to workers that can answer.
+    """
+    if app.state.draining:
+        return JSONResponse({"status": "draining", "pid": os.getpid()}, status_code=503)
+    if corpus.retriever is None or not corpus.version:
+        return JSONResponse({"status": "loading", "pid": os.getpid()}, status_code=503)
+    return {"status": "ready", "pid": os.getpid(), "corpus_version": corpus.version, "source": corpus.source}
+
+@app.get("/admin/corpus")
+def corpus_stats(x_admin_token: str = Header(default="")):
+    check_admin_token(x_admin_token)
+    return corpus.stats()
+
+@app.get("/cache/stats")
+def cache_stats():
+    return answer_cache.stats()
+
+@app.get("/metrics")
+async def metrics():
+    # Rendered on the event loop, the only thread that updates the metrics.
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/llm/stats")
+def llm_stats():
+    stats = llm_client.stats()
+    if llm_recording is not None:
+        stats["recording"] = llm_recording.stats()
+    return stats
+
+@app.get("/rewrite/stats")
+def rewrite_stats():
+    return query_rewriter.stats()
+
+@app.get("/history/stats")
+def history_stats():
+    return history_compactor.stats()
+
+@app.post("/sessions")
+def create_session():
+    """
+    Returns a new session id. Pass it as `sessionID` on /chat to keep the history server-side.
+    """
+    check_sessions_enabled()
+    return {"sessionID": session_store.new_session_id(), "ttl_seconds": session_store.backend.ttl_seconds}
+
+@app.get("/sessions/stats")
+def session_stats():
+    return session_store.stats()
+
+@app.delete("/sessions/{session_id}")
+def delete_session(session_id: str):
+    check_sessions_enabled()
+    session_store.delete(session_id)
+    return {"deleted": True}
+
 # Mount the parent directory to serve index.html, styles.css, and app.js
 # We place this at the end to ensure specific routes like /chat are matched first.
-app.mount("/", StaticFiles(directory=os.path.join(os.path.dirname(__file__), "..", "frontend"), html=True), name="static")
\ No newline at end of file
+app.mount("/", StaticFiles(directory=os.path.join(os.path.dirname(__file__), "..", "frontend"), html=True), name="static")
@@ -0,0 +1,362 @@
+"""
+Lightweight request tracing and Prometheus-format metrics for the chat pipeline.
+
+Every /chat request gets a RequestTrace (held in a context variable), and
+`tracer.span(stage)` times a pipeline stage into both the trace and the
+`chat_stage_seconds` histogram. The trace carries the client's requestID, so a
+slow request can be broken down stage by stage in the logs, while the histograms
+stay low-cardinality (labelled by stage and endpoint only).
+
+Metrics are plain dicts updated from the event loop thread, with no locks or
+external dependencies; a span costs two perf_counter calls and a bisect.
+"""
+import contextvars
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter as StackCounter, deque
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Seconds. Covers sub-millisecond retrieval up to slow LLM calls.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        # Unlabelled counters are exported as 0 before their first increment.
+        self.values: Dict[Tuple[str, ...], float] = {} if self.labelnames else {(): 0.0}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self.values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value:g}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # Per label set: [per-bucket counts (last one is +Inf), sum, count]
+        self.series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def count(self, *labels: str) -> int:
+        series = self.series.get(labels)
+        return series[2] if series else 0
+
+    def mean(self, *labels: str) -> float:
+        series = self.series.get(labels)
+        return series[1] / series[2] if series and series[2] else 0.0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                bucket_labels = _format_labels(self.labelnames, labels, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+class Gauge:
+    """A value read from a callback at scrape time, e.g. a cache size or breaker state."""
+    def __init__(self, name: str, help_text: str, read: Callable[[], float]):
+        self.name = name
+        self.help_text = help_text
+        self.read = read
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge", f"{self.name} {self.read():g}"]
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: List = []
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help_text, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], float]) -> Gauge:
+        metric = Gauge(name, help_text, read)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Returns every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+REQUEST_SECONDS = registry.histogram("chat_request_seconds", "End-to-end request latency.", ["endpoint"])
+STAGE_SECONDS = registry.histogram("chat_stage_seconds", "Time spent in each chat pipeline stage.", ["stage"])
+TURNS = registry.counter("chat_turns_total", "Chat turns processed (non-empty messages).")
+FOLLOW_UPS = registry.counter("chat_follow_ups_total", "Turns detected as follow-up questions.")
+RETRIEVAL_MISSES = registry.counter("chat_retrieval_misses_total", "Turns where no FAQ matched.")
+LLM_CALLS = registry.counter("chat_llm_calls_total", "LLM calls made, by purpose (answer or rewrite).", ["purpose"])
+LLM_FALLBACKS = registry.counter("chat_llm_fallbacks_total", "Turns answered with the retrieval-only fallback after an LLM error.")
+PROMPT_TOKENS = registry.histogram(
+    "chat_prompt_tokens", "Estimated answer prompt size: as sent (budgeted) and with the whole FAQ (full_faq).", ["context"],
+    buckets=(50, 100, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 5000),
+)
+FAST_PATH = registry.counter(
+    "chat_fast_path_total",
+    "Fresh questions with a matched FAQ, by fast-path outcome: hit (canned answer served), low_confidence or no_answer.",
+    ["result"],
+)
+FAST_PATH_SAVED_SECONDS = registry.counter(
+    "chat_fast_path_saved_seconds_total", "Estimated LLM time saved by canned answers (mean answer LLM latency, or CANNED_ANSWER_LLM_SECONDS, per hit).",
+)
+SLOW_REQUESTS = registry.counter("chat_slow_requests_total", "Requests slower than SLOW_REQUEST_MS.")
+
+class RequestTrace:
+    """
+    Stage timings for one request, tagged with the client's requestID.
+    """
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.request_id = ""
+        self.start = time.perf_counter()
+        self.end = 0.0
+        self.handler_end = 0.0
+        self.spans: List[Tuple[str, float]] = []
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+    def summary(self) -> str:
+        stages = " ".join(f"{stage}={seconds * 1000:.1f}ms" for stage, seconds in self.spans)
+        return f"request {self.request_id or '-'} {self.endpoint} {self.duration * 1000:.1f}ms: {stages}"
+
+_current_trace: contextvars.ContextVar[Optional[RequestTrace]] = contextvars.ContextVar("current_trace", default=None)
+
+class Span:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record_stage(self.stage, time.perf_counter() - self.start)
+        return False
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NO_SPAN = _NoSpan()
+
+def record_stage(stage: str, seconds: float) -> None:
+    STAGE_SECONDS.observe(seconds, stage)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.spans.append((stage, seconds))
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current_trace.get()
+
+class Tracer:
+    """
+    Starts and finishes request traces and hands out stage spans. Every finished
+    trace is passed to the trace hooks (e.g. a load test collecting per-stage
+    timings); requests slower than `slow_request_seconds` also go to the
+    slow-request hooks.
+    """
+    def __init__(self, enabled: bool = True, slow_request_seconds: float = 0.0):
+        self.enabled = enabled
+        self.slow_request_seconds = slow_request_seconds
+        self.trace_hooks: List[Callable[[RequestTrace], None]] = []
+        self.slow_request_hooks: List[Callable[[RequestTrace], None]] = []
+
+    def span(self, stage: str):
+        return Span(stage) if self.enabled else _NO_SPAN
+
+    def tag(self, request_id: str) -> None:
+        """Tags the current request's trace with the client's requestID."""
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.request_id = request_id
+
+    def handler_done(self) -> None:
+        """Marks the end of the endpoint function, so serialization can be timed."""
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.handler_end = time.perf_counter()
+
+    def add_slow_request_hook(self, hook: Callable[[RequestTrace], None]) -> None:
+        self.slow_request_hooks.append(hook)
+
+    def finish(self, trace: RequestTrace) -> None:
+        trace.end = time.perf_counter()
+        REQUEST_SECONDS.observe(trace.duration, trace.endpoint)
+        for hook in self.trace_hooks:
+            hook(trace)
+        if self.slow_request_seconds and trace.duration > self.slow_request_seconds:
+            SLOW_REQUESTS.inc()
+            for hook in self.slow_request_hooks:
+                try:
+                    hook(trace)
+                except Exception as e:
+                    print(f"Error in slow request hook: {e}")
+
+def log_slow_request(trace: RequestTrace) -> None:
+    print(f"Slow {trace.summary()}")
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that traces requests to the given paths: it times the whole
+    request, and the "serialize" stage between the endpoint returning and the
+    response headers being sent (for /chat, that is response model validation
+    and JSON encoding).
+    """
+    def __init__(self, app, tracer: Tracer, paths: Sequence[str]):
+        self.app = app
+        self.tracer = tracer
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.tracer.enabled or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace(scope["path"])
+        token = _current_trace.set(trace)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and trace.handler_end:
+                record_stage("serialize", time.perf_counter() - trace.handler_end)
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                self.tracer.finish(trace)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_trace.reset(token)
+
+class SamplingProfiler:
+    """
+    Samples the stack of one thread (normally the event loop's) at a fixed interval
+    into a bounded ring buffer. For a slow request, the samples taken while it was
+    in flight can be dumped in the folded-stack format used by flame graph tools.
+
+    The event loop interleaves requests, so a dump shows everything the loop did
+    during the request, not only that request's own work; samples in the selector
+    mean the loop was idle, waiting on I/O such as the LLM call.
+    """
+    def __init__(self, interval_seconds: float = 0.005, max_samples: int = 20000):
+        self.interval_seconds = interval_seconds
+        self.samples: "deque[Tuple[float, str]]" = deque(maxlen=max_samples)
+        self.thread_id: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, thread_id: Optional[int] = None) -> None:
+        self.thread_id = thread_id or threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples.append((time.perf_counter(), self.fold(frame)))
+
+    @staticmethod
+    def fold(frame) -> str:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+            frame = frame.f_back
+        return ";".join(reversed(stack))
+
+    def stacks_between(self, start: float, end: float) -> StackCounter:
+        return StackCounter(stack for timestamp, stack in list(self.samples) if start <= timestamp <= end)
+
+    def dump(self, path: str, start: float, end: float) -> int:
+        """Writes "stack count" lines for the samples in [start, end]. Returns the sample count."""
+        stacks = self.stacks_between(start, end)
+        with open(path, 'w') as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return sum(stacks.values())
+
+def profile_dump_hook(profiler: SamplingProfiler, directory: str) -> Callable[[RequestTrace], None]:
+    """
+    Returns a slow-request hook that dumps the profiler's samples for the request
+    to `<directory>/<requestID or timestamp>.folded`.
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    def hook(trace: RequestTrace) -> None:
+        name = "".join(c for c in trace.request_id if c.isalnum() or c in "-_") or f"{time.time():.6f}"
+        path = os.path.join(directory, f"{name}.folded")
+        samples = profiler.dump(path, trace.start, trace.end)
+        print(f"Wrote {samples} profile samples for request {trace.request_id or '-'} to {path}")
+
+    return hook
+
+def tracer_from_env() -> Tracer:
+    """
+    Builds the tracer from environment variables:
+      METRICS_ENABLED ("false" turns off stage spans), SLOW_REQUEST_MS (0 disables
+      slow-request logging).
+    """
+    tracer = Tracer(
+        enabled=os.getenv("METRICS_ENABLED", "true").lower() == "true",
+        slow_request_seconds=float(os.getenv("SLOW_REQUEST_MS", "0")) / 1000,
+    )
+    if tracer.slow_request_seconds:
+        tracer.add_slow_request_hook(log_slow_request)
+    return tracer
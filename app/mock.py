@@ -1,4 +1,45 @@
-from typing import Dict, Optional
+import asyncio
+import os
+import random
+import re
+import time
+from typing import AsyncIterator, Dict, Optional
+
+# Optional simulated generation latency (in milliseconds) so load tests against
+# the mock behave like a slow upstream LLM. Defaults to instant responses.
+MOCK_LLM_LATENCY_MS = float(os.getenv("MOCK_LLM_LATENCY_MS", "0"))
+# Random +/- variation around the latency, drawn from a seeded generator so
+# load test runs are reproducible.
+MOCK_LLM_JITTER_MS = float(os.getenv("MOCK_LLM_JITTER_MS", "0"))
+_jitter_rng = random.Random(int(os.getenv("MOCK_LLM_SEED", "0")))
+
+# Fault injection, so timeouts, retries and the circuit breaker can be exercised
+# offline: a fraction of calls fail outright, and a fraction hang (sleep for
+# MOCK_LLM_HANG_SECONDS) like a stalled upstream.
+MOCK_LLM_FAILURE_RATE = float(os.getenv("MOCK_LLM_FAILURE_RATE", "0"))
+MOCK_LLM_HANG_RATE = float(os.getenv("MOCK_LLM_HANG_RATE", "0"))
+MOCK_LLM_HANG_SECONDS = float(os.getenv("MOCK_LLM_HANG_SECONDS", "60"))
+_fault_rng = random.Random(int(os.getenv("MOCK_LLM_SEED", "0")))
+
+class MockLLMError(Exception):
+    """An injected upstream failure (behaves like an HTTP 503)."""
+    code = 503
+
+async def _inject_fault() -> None:
+    if not (MOCK_LLM_FAILURE_RATE or MOCK_LLM_HANG_RATE):
+        return
+    draw = _fault_rng.random()
+    if draw < MOCK_LLM_FAILURE_RATE:
+        raise MockLLMError("Injected mock LLM failure")
+    if draw < MOCK_LLM_FAILURE_RATE + MOCK_LLM_HANG_RATE:
+        await asyncio.sleep(MOCK_LLM_HANG_SECONDS)
+
+def mock_latency_seconds() -> float:
+    """The simulated latency of one mock LLM call, including jitter."""
+    latency = MOCK_LLM_LATENCY_MS
+    if MOCK_LLM_JITTER_MS > 0:
+        latency += _jitter_rng.uniform(-MOCK_LLM_JITTER_MS, MOCK_LLM_JITTER_MS)
+    return max(latency, 0.0) / 1000
 
 # Simulate LLM answer for testing without calling the actual Gemini API
 def call_mock_llm(relevant_faq: Optional[Dict], is_follow_up: bool = False) -> str:
@@ -6,7 +47,47 @@ def call_mock_llm(relevant_faq: Optional[Dict], is_follow_up: bool = False) -> s
     Simulates an LLM response using the retrieved FAQ data.
     This is useful for local testing without a Gemini API key.
     """
-    
+    latency = mock_latency_seconds()
+    if latency > 0:
+        time.sleep(latency)
+
+    return _mock_answer(relevant_faq, is_follow_up)
+
+async def call_mock_llm_async(relevant_faq: Optional[Dict], is_follow_up: bool = False) -> str:
+    """
+    Async version of call_mock_llm. The simulated latency is awaited so it does
+    not block the event loop. Injected faults apply here and to the stream.
+    """
+    await _inject_fault()
+    latency = mock_latency_seconds()
+    if latency > 0:
+        await asyncio.sleep(latency)
+
+    return _mock_answer(relevant_faq, is_follow_up)
+
+async def call_mock_llm_stream(relevant_faq: Optional[Dict], is_follow_up: bool = False) -> AsyncIterator[str]:
+    """
+    Chunked version of call_mock_llm for testing streaming offline. Yields the mock
+    answer word by word, spreading the simulated latency evenly across chunks.
+    Joining the chunks gives exactly the call_mock_llm answer.
+    """
+    await _inject_fault()
+    chunks = re.findall(r"\s*\S+\s*", _mock_answer(relevant_faq, is_follow_up))
+    delay = mock_latency_seconds() / max(len(chunks), 1)
+
+    for chunk in chunks:
+        if delay > 0:
+            await asyncio.sleep(delay)
+        yield chunk
+
+def template_answer(faq: Dict) -> str:
+    """
+    The templated answer for an FAQ, without an LLM. Also used to precompute
+    canned answers for the fast path (app/canned.py).
+    """
+    return _mock_answer(faq)
+
+def _mock_answer(relevant_faq: Optional[Dict], is_follow_up: bool = False) -> str:
     if not relevant_faq:
         if is_follow_up:
             return f"I apologize, but I couldn't find any relevant information in the FAQ database for your follow-up question based on our previous conversation."
@@ -22,5 +103,5 @@ def call_mock_llm(relevant_faq: Optional[Dict], is_follow_up: bool = False) -> s
         f"{answer}\n"
         "Is there anything else you'd like to know about this topic?"
     )
-    
-    
+
+
@@ -1,13 +1,23 @@
 from pydantic import BaseModel
+from typing import Optional
 
 class ChatRequest(BaseModel):
     message: str
     history: list[dict] = []
     requestID: str = "" 
+    # Opt-in server-side history: with a session id, `history` is ignored and
+    # the server keeps the conversation (see POST /sessions).
+    sessionID: str = ""
 
 class ChatResponse(BaseModel):
     answer: str
     sources: list[str]
     url: str
     memory_used: bool
-    history: list[dict]
\ No newline at end of file
+    history: list[dict]
+    # Set only when the answer was served from the answer cache.
+    cached: Optional[bool] = None
+    # Set only when a precomputed canned answer was served (the fast path).
+    canned: Optional[bool] = None
+    # Echoed in session mode, where `history` holds only the entries of the new turn.
+    sessionID: Optional[str] = None
\ No newline at end of file
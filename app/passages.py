@@ -0,0 +1,112 @@
+"""
+Splits long FAQ answers into passages, so retrieval matches the relevant part of
+an answer and prompts carry only as much of the FAQ as fits a token budget.
+
+Passages are FAQ-shaped entries (question, section, url and a slice of the answer)
+and are indexed by every retriever backend like whole FAQs. Each records its parent
+("faq_id"), its position ("passage", out of "passages") and its row in the passage
+list ("row"); the passages of one FAQ are contiguous, in document order.
+"""
+import math
+import re
+from typing import Dict, List
+
+from .retrieval import ANSWER_STOP_WORDS
+from .text import TOKEN_PATTERN
+
+BULLET = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough LLM token count (about four characters per token for English text).
+    Good enough for budgeting prompts without shipping a tokenizer.
+    """
+    return math.ceil(len(text) / 4)
+
+def split_answer(answer: str, max_tokens: int) -> List[str]:
+    """
+    Splits an answer at paragraph breaks and bullet items (and at sentence ends
+    inside an overlong paragraph), then packs consecutive pieces into passages of
+    at most `max_tokens` estimated tokens. A single longer sentence stays whole.
+    """
+    pieces = []
+    for block in re.split(r"\n\s*\n", answer.strip()):
+        lines = [line.strip() for line in block.splitlines() if line.strip()]
+        units = lines if any(BULLET.match(line) for line in lines) else [" ".join(lines)]
+        for unit in units:
+            if estimate_tokens(unit) > max_tokens:
+                pieces.extend(SENTENCE_END.split(unit))
+            elif unit:
+                pieces.append(unit)
+
+    passages: List[str] = []
+    for piece in pieces:
+        if passages and estimate_tokens(passages[-1]) + estimate_tokens(piece) + 1 <= max_tokens:
+            passages[-1] = f"{passages[-1]}\n{piece}"
+        else:
+            passages.append(piece)
+    return passages or [answer]
+
+def split_passages(faq_data: List[Dict], max_tokens: int) -> List[Dict]:
+    """
+    Returns the passages of every FAQ, or `faq_data` itself if `max_tokens` is 0.
+    """
+    if max_tokens <= 0:
+        return faq_data
+
+    passages = []
+    for i, faq in enumerate(faq_data):
+        faq_id = faq.get('id') or f"faq_{i + 1}"
+        texts = split_answer(faq.get('answer', ''), max_tokens)
+        for n, text in enumerate(texts):
+            passages.append({
+                **faq,
+                "id": f"{faq_id}#{n}",
+                "answer": text,
+                "faq_id": faq_id,
+                "passage": n,
+                "passages": len(texts),
+                "row": len(passages),
+            })
+    return passages
+
+def sibling_passages(faq_data: List[Dict], faq: Dict) -> List[Dict]:
+    """All passages of `faq`'s parent FAQ, in document order ([faq] for a whole FAQ)."""
+    if "row" not in faq:
+        return [faq]
+    first = faq["row"] - faq["passage"]
+    return faq_data[first:first + faq["passages"]]
+
+def _terms(text: str) -> set:
+    return {token for token in TOKEN_PATTERN.findall(text.lower()) if token not in ANSWER_STOP_WORDS}
+
+def select_context(faq: Dict, passages: List[Dict], query: str, token_budget: int) -> List[Dict]:
+    """
+    Picks the passages to send as context: the matched passage `faq`, then the
+    other passages of the same FAQ that share the most terms with the query, as
+    long as they fit in `token_budget` (0 means no limit). Returns them in
+    document order.
+    """
+    if token_budget <= 0:
+        return passages
+
+    query_terms = _terms(query)
+    others = [p for p in passages if p is not faq]
+    # Stable sort: passages with equal overlap keep their document order.
+    others.sort(key=lambda p: -len(query_terms & _terms(p.get('answer', ''))))
+
+    chosen = [faq]
+    used = estimate_tokens(faq.get('answer', ''))
+    for passage in others:
+        cost = estimate_tokens(passage.get('answer', ''))
+        if used + cost <= token_budget:
+            chosen.append(passage)
+            used += cost
+    return sorted(chosen, key=lambda p: p.get("passage", 0))
+
+def context_text(faq: Dict, passages: List[Dict], query: str, token_budget: int) -> str:
+    """The answer text sent as context: the selected passages, or the whole answer of an unsplit FAQ."""
+    if not passages:
+        return faq.get('answer', '')
+    return "\n".join(p.get('answer', '') for p in select_context(faq, passages, query, token_budget))
@@ -0,0 +1,203 @@
+"""
+Record/replay of LLM traffic, for reproducible benchmarks without network access
+or an API key.
+
+In record mode, every LLM call made through app/response.py (answers, streamed
+answers and follow-up rewrites) is appended to a JSONL log with its prompt,
+response and measured latency; streams also keep the arrival time of each chunk.
+In replay mode the log is served back instead of calling Gemini: each call
+sleeps for the recorded latency (scaled by `speed`) and returns the recorded
+text, so rewrite, generation and prompt changes can be benchmarked against the
+same upstream behaviour on any machine.
+
+Records are looked up by a hash of the call (kind, model, system prompt, prompt
+and temperature). Loading a recording only scans it for each record's hash and
+byte range; a lookup is a dict access plus one read, however large the log.
+A prompt recorded several times is replayed round-robin, which keeps the
+original spread of latencies. A prompt that was never recorded raises
+ReplayMissError, or with miss="sample" borrows a recorded call of the same
+kind, picked by a seeded generator. A streamed answer whose prompt was only
+recorded as a plain answer replays that answer as one chunk.
+
+Log format (one JSON object per line):
+    {"key": ..., "kind": "answer" | "stream" | "rewrite", "model": ..., "prompt": ...,
+     "temperature": ..., "latency": <seconds>, "response": <text>,
+     "chunks": [[<seconds since the call started>, <text>], ...]}  # streams only
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Records start with their key and kind (as written by LLMRecorder), so loading a
+# recording can index it without parsing every prompt and response.
+_RECORD_HEAD = re.compile(rb'\{"key":"([0-9a-f]+)","kind":"(\w+)"')
+
+def call_key(kind: str, model: str, system: Optional[str], prompt: Any, temperature: Optional[float]) -> str:
+    """The hash a call is recorded and replayed under."""
+    payload = json.dumps([kind, model, system, prompt, temperature], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+class ReplayMissError(Exception):
+    """Raised in replay mode for a call that is not in the recording."""
+    # Like an HTTP 404: not retried and not counted by the circuit breaker.
+    code = 404
+
+class LLMRecorder:
+    """
+    Passes calls through to the LLM and appends each successful one to `path`.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Line buffered: each record reaches the file as one append.
+        self._file = open(path, "a", buffering=1)
+        self.recorded = 0
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self.recorded += 1
+
+    async def call(self, kind: str, model: str, system: Optional[str], prompt: Any, temperature: Optional[float],
+                   generate: Callable[[], Awaitable[str]]) -> str:
+        start = time.perf_counter()
+        text = await generate()
+        self._write({
+            "key": call_key(kind, model, system, prompt, temperature), "kind": kind, "model": model,
+            "prompt": prompt, "temperature": temperature, "latency": round(time.perf_counter() - start, 4), "response": text,
+        })
+        return text
+
+    async def stream(self, kind: str, model: str, system: Optional[str], prompt: Any, temperature: Optional[float],
+                     generate: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        start = time.perf_counter()
+        chunks = []
+        async for chunk in generate():
+            chunks.append([round(time.perf_counter() - start, 4), chunk])
+            yield chunk
+        # Only streams consumed to the end are recorded.
+        self._write({
+            "key": call_key(kind, model, system, prompt, temperature), "kind": kind, "model": model,
+            "prompt": prompt, "temperature": temperature, "latency": round(time.perf_counter() - start, 4),
+            "response": "".join(text for _, text in chunks), "chunks": chunks,
+        })
+
+    def close(self) -> None:
+        self._file.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mode": "record", "path": self.path, "recorded": self.recorded}
+
+class LLMReplayer:
+    """
+    Serves calls from a recording made by LLMRecorder, with the recorded timing.
+    """
+    # Kinds whose prompt may have been recorded under another kind instead.
+    FALLBACK_KINDS = {"stream": "answer"}
+
+    def __init__(self, path: str, speed: float = 1.0, miss: str = "error", seed: int = 0):
+        if miss not in ("error", "sample"):
+            raise ValueError(f"Unknown replay miss policy {miss!r}")
+        self.path = path
+        self.speed = speed
+        self.miss = miss
+        self._rng = random.Random(seed)
+        # key -> byte ranges of its records, and the same per kind for sampled misses.
+        self.index: Dict[str, List[Tuple[int, int]]] = {}
+        self.by_kind: Dict[str, List[Tuple[int, int]]] = {}
+        self._turns: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.sampled = 0
+
+        with open(path, "rb") as f:
+            offset = 0
+            for line in f:
+                if line.strip():
+                    match = _RECORD_HEAD.match(line)
+                    if match:
+                        key, kind = match.group(1).decode(), match.group(2).decode()
+                    else:
+                        head = json.loads(line)
+                        key, kind = head["key"], head["kind"]
+                    span = (offset, len(line))
+                    self.index.setdefault(key, []).append(span)
+                    self.by_kind.setdefault(kind, []).append(span)
+                offset += len(line)
+        self.records = sum(len(spans) for spans in self.index.values())
+        # Records are read with pread, which is safe to share across forked workers.
+        self._fd = os.open(path, os.O_RDONLY)
+
+    def _read(self, span: Tuple[int, int]) -> Dict[str, Any]:
+        return json.loads(os.pread(self._fd, span[1], span[0]))
+
+    def lookup(self, kind: str, model: str, system: Optional[str], prompt: Any, temperature: Optional[float]) -> Dict[str, Any]:
+        """
+        The recorded call to replay for this call (round-robin over repeated
+        prompts). A stream that was only recorded as a plain answer replays that.
+        """
+        for candidate in filter(None, (kind, self.FALLBACK_KINDS.get(kind))):
+            key = call_key(candidate, model, system, prompt, temperature)
+            spans = self.index.get(key)
+            if spans:
+                self.hits += 1
+                turn = self._turns.get(key, 0)
+                self._turns[key] = turn + 1
+                return self._read(spans[turn % len(spans)])
+
+        self.misses += 1
+        if self.miss == "sample" and self.by_kind.get(kind):
+            self.sampled += 1
+            return self._read(self._rng.choice(self.by_kind[kind]))
+        raise ReplayMissError(f"No recorded {kind} call for key {call_key(kind, model, system, prompt, temperature)[:12]} in {self.path}")
+
+    async def call(self, kind: str, model: str, system: Optional[str], prompt: Any, temperature: Optional[float],
+                   generate: Callable[[], Awaitable[str]]) -> str:
+        record = self.lookup(kind, model, system, prompt, temperature)
+        if self.speed > 0:
+            await asyncio.sleep(record["latency"] * self.speed)
+        return record["response"]
+
+    async def stream(self, kind: str, model: str, system: Optional[str], prompt: Any, temperature: Optional[float],
+                     generate: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        record = self.lookup(kind, model, system, prompt, temperature)
+        # An answer recorded without streaming replays as a single chunk at its end.
+        chunks = record.get("chunks") or [[record["latency"], record["response"]]]
+        start = time.perf_counter()
+        for offset, text in chunks:
+            delay = start + offset * self.speed - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield text
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": "replay", "path": self.path, "records": self.records, "prompts": len(self.index),
+            "hits": self.hits, "misses": self.misses, "sampled": self.sampled,
+        }
+
+def llm_recording_from_env():
+    """
+    Builds the recorder or replayer from environment variables, or returns None:
+      LLM_RECORD_MODE ("record", "replay" or empty), LLM_RECORDING_PATH,
+      LLM_REPLAY_SPEED (1 replays the recorded latencies, 0 none),
+      LLM_REPLAY_MISS ("error" or "sample"), LLM_REPLAY_SEED.
+    """
+    mode = os.getenv("LLM_RECORD_MODE", "").lower()
+    if not mode:
+        return None
+    path = os.getenv("LLM_RECORDING_PATH", "llm_recording.jsonl")
+    if mode == "record":
+        return LLMRecorder(path)
+    if mode == "replay":
+        return LLMReplayer(
+            path,
+            speed=float(os.getenv("LLM_REPLAY_SPEED", "1")),
+            miss=os.getenv("LLM_REPLAY_MISS", "error"),
+            seed=int(os.getenv("LLM_REPLAY_SEED", "0")),
+        )
+    raise ValueError(f"Unknown LLM_RECORD_MODE {mode!r}")
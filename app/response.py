@@ -1,59 +1,133 @@
-import google.generativeai as genai
+import asyncio
+import contextvars
 import os
+import weakref
+from functools import lru_cache
+
+from .history import append_message, history_compactor_from_env
+from .passages import context_text, estimate_tokens
+from .recording import llm_recording_from_env
 
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 MODEL_NAME = os.getenv("GEMINI_MODEL", "models/gemini-2.5-flash-lite")
 
-def build_messages(user_input, faq, history=None):
+# Maximum number of LLM calls allowed in flight at once. Requests beyond this
+# wait on the event loop instead of holding a worker thread.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "64"))
+
+# Approximate token budget for the FAQ content in a prompt (0: no limit). Only applies
+# when the corpus is split into passages (FAQ_PASSAGE_TOKENS).
+PROMPT_CONTEXT_TOKENS = int(os.getenv("PROMPT_CONTEXT_TOKENS", "200"))
+
+# Turns the stored history of a follow-up into compact user/model turns within a token budget.
+history_compactor = history_compactor_from_env()
+
+# Optional record/replay of the async LLM calls below (LLM_RECORD_MODE, see app/recording.py).
+llm_recording = llm_recording_from_env()
+
+SYSTEM_PROMPT = (
+    "You are a support assistant. "
+    "Answer using the provided FAQ content or the conversation history. "
+    "If the FAQ does not contain enough information, ask a clarifying question. "
+)
+
+# One limiter per event loop, since a semaphore binds to the loop that first waits on it.
+_llm_semaphores = weakref.WeakKeyDictionary()
+
+# Set while a slot is held, in the holder's context and the tasks it starts.
+_holding_llm_slot = contextvars.ContextVar("holding_llm_slot", default=False)
+
+class _LLMSlot:
+    """
+    A slot on the limiter, held for the `async with` block. Inside a block that
+    already holds one, acquiring again is a no-op, so the resilient LLM client can
+    wait for the slot before it starts timing a call that also acquires it.
+    """
+    def __init__(self, semaphore: asyncio.Semaphore):
+        self.semaphore = semaphore
+        self.acquired = False
+
+    async def __aenter__(self):
+        if not _holding_llm_slot.get():
+            await self.semaphore.acquire()
+            self.acquired = True
+            _holding_llm_slot.set(True)
+
+    async def __aexit__(self, *exc_info):
+        if self.acquired:
+            _holding_llm_slot.set(False)
+            self.semaphore.release()
+
+def llm_limiter() -> _LLMSlot:
+    """
+    Returns a slot on the semaphore that bounds concurrent LLM calls on the
+    running event loop, creating it on first use. Each loop (the server, a
+    TestClient, an asyncio.run in a script or the bulk evaluation CLI) gets its own.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = _llm_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _llm_semaphores[loop] = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return _LLMSlot(semaphore)
+
+@lru_cache(maxsize=None)
+def gemini():
+    """
+    Imports and configures the Gemini SDK on first use, so mock mode and replayed
+    traffic (see app/recording.py) never load it.
+    """
+    import google.generativeai as genai
+    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+    return genai
+
+@lru_cache(maxsize=None)
+def get_model(model_name=MODEL_NAME, system_instruction=None):
+    """
+    Returns a long-lived GenerativeModel for the given configuration.
+    Models are cached so the client is built once and reused across requests.
+    """
+    return gemini().GenerativeModel(
+        model_name=model_name,
+        system_instruction=system_instruction
+    )
+
+def build_messages(user_input, faq, history=None, passages=None, token_budget=PROMPT_CONTEXT_TOKENS, compactor=None):
+    """
+    Builds the Gemini messages for an answer. `faq` is the matched FAQ or passage;
+    `passages` are all passages of its FAQ (see app/passages.py), of which the
+    matched one and the others most relevant to the question are included, up to
+    `token_budget` estimated tokens. `history` is compacted into user/model turns
+    by `compactor` (the module's history_compactor by default).
+    """
+    content = context_text(faq, passages, user_input, token_budget) or 'No content provided'
+
     # We move the FAQ context directly into the user message 
     # since Gemini uses the system_instruction parameter for the "rules"
     context_block = f"""
         FAQ TITLE: {faq.get('question', 'Unknown')}
         SECTION: {faq.get('section', 'General')}
-        CONTENT: {faq.get('answer', 'No content provided')}
+        CONTENT: {content}
         SOURCE URL: {faq.get('url', 'N/A')}
     """
 
-    messages = []
-
-    # If you have history, format it as 'user' and 'model' pairs
-    if history:
-        # History needs to be a list of dicts: {"role": "user"/"model", "parts": ["text"]}
-        # For now, let's assume we're adding it as a single context block
-        messages.append({
-            "role": "user",
-            "parts": [f"Previous conversation context: {history}"]
-        })
-        messages.append({
-            "role": "model",
-            "parts": ["I have reviewed the history. How can I help with the FAQ?"]
-        })
+    # Earlier turns as 'user' and 'model' messages, without the bookkeeping entries.
+    messages = (compactor or history_compactor).compact(history, faq, user_input) if history else []
 
     # The final message combines the FAQ context and the user question
-    messages.append({
-        "role": "user",
-        "parts": [f"CONTEXT:\n{context_block}\n\nUSER QUESTION: {user_input}"]
-    })
+    append_message(messages, "user", f"CONTEXT:\n{context_block}\n\nUSER QUESTION: {user_input}")
 
     return messages
 
+def prompt_tokens(messages):
+    """Estimated token count of the text in a list of messages."""
+    return sum(estimate_tokens(part) for message in messages for part in message["parts"])
+
 def call_llm(messages, temperature=0.2):
-    # System prompt stays here - this is the correct place for it!
-    system_prompt = (
-        "You are a support assistant. "
-        "Answer using the provided FAQ content or the conversation history. "
-        "If the FAQ does not contain enough information, ask a clarifying question. "
-    )
-    
-    model = genai.GenerativeModel(
-        model_name=MODEL_NAME,
-        system_instruction=system_prompt
-    )
+    model = get_model(MODEL_NAME, SYSTEM_PROMPT)
     
     try:
         response = model.generate_content(
             messages,
-            generation_config=genai.types.GenerationConfig(
+            generation_config=gemini().types.GenerationConfig(
                 temperature=temperature,
             )
         )
@@ -62,20 +136,74 @@ def call_llm(messages, temperature=0.2):
         print(f"Error calling Gemini API: {e}")
         raise e
 
-def rewrite_query(user_input, history):
+async def _generate_answer(messages, temperature):
+    model = get_model(MODEL_NAME, SYSTEM_PROMPT)
+    response = await model.generate_content_async(
+        messages,
+        generation_config=gemini().types.GenerationConfig(
+            temperature=temperature,
+        )
+    )
+    return response.text
+
+async def call_llm_async(messages, temperature=0.2):
     """
-    Uses the LLM to rewrite a follow-up question into a standalone search query
-    by incorporating context from the conversation history.
+    Async version of call_llm. Waits for a free slot on the shared limiter
+    instead of blocking a threadpool worker for the whole round-trip.
     """
-    if not history:
-        return user_input
+    async with llm_limiter():
+        try:
+            if llm_recording is not None:
+                return await llm_recording.call(
+                    "answer", MODEL_NAME, SYSTEM_PROMPT, messages, temperature,
+                    lambda: _generate_answer(messages, temperature),
+                )
+            return await _generate_answer(messages, temperature)
+        except Exception as e:
+            print(f"Error calling Gemini API: {e}")
+            raise e
 
-    model = genai.GenerativeModel(MODEL_NAME)
-    
+async def _generate_stream(messages, temperature):
+    model = get_model(MODEL_NAME, SYSTEM_PROMPT)
+    response = await model.generate_content_async(
+        messages,
+        generation_config=gemini().types.GenerationConfig(
+            temperature=temperature,
+        ),
+        stream=True
+    )
+    async for chunk in response:
+        if chunk.parts:
+            yield chunk.text
+
+async def stream_llm_async(messages, temperature=0.2):
+    """
+    Streams the generated answer, yielding text chunks as Gemini produces them.
+    The concurrency slot is held until the stream is fully consumed.
+    """
+    async with llm_limiter():
+        try:
+            if llm_recording is not None:
+                chunks = llm_recording.stream(
+                    "stream", MODEL_NAME, SYSTEM_PROMPT, messages, temperature,
+                    lambda: _generate_stream(messages, temperature),
+                )
+            else:
+                chunks = _generate_stream(messages, temperature)
+            async for chunk in chunks:
+                yield chunk
+        except Exception as e:
+            print(f"Error streaming from Gemini API: {e}")
+            raise e
+
+def build_rewrite_prompt(user_input, history):
+    """
+    Builds the prompt used to rewrite a follow-up question into a standalone query.
+    """
     # Format the last few turns of history for context
     history_block = "\n".join([f"{msg.get('role', 'unknown')}: {msg.get('content', '')}" for msg in history[-3:]])
     
-    prompt = f"""
+    return f"""
     Rewrite the following follow-up question to be a standalone search query.
     Include necessary context from the conversation history (e.g., replace "it" with the specific topic).
     Do NOT answer the question, just rewrite it for a search engine.
@@ -87,10 +215,56 @@ def rewrite_query(user_input, history):
     
     Standalone Query:
     """
+
+def rewrite_query(user_input, history):
+    """
+    Uses the LLM to rewrite a follow-up question into a standalone search query
+    by incorporating context from the conversation history.
+    """
+    if not history:
+        return user_input
+
+    model = get_model(MODEL_NAME)
+    prompt = build_rewrite_prompt(user_input, history)
     
     try:
         response = model.generate_content(prompt)
         return response.text.strip()
     except Exception as e:
         print(f"Error rewriting query: {e}")
-        return user_input
\ No newline at end of file
+        return user_input
+
+async def generate_rewrite_async(user_input, history):
+    """
+    Calls the LLM to rewrite a follow-up, raising on errors so callers can apply
+    their own timeout, retry and fallback handling (see app/llm_client.py).
+    """
+    prompt = build_rewrite_prompt(user_input, history)
+
+    async def generate():
+        response = await get_model(MODEL_NAME).generate_content_async(prompt)
+        return response.text
+
+    async with llm_limiter():
+        try:
+            if llm_recording is not None:
+                text = await llm_recording.call("rewrite", MODEL_NAME, None, prompt, None, generate)
+            else:
+                text = await generate()
+            return text.strip()
+        except Exception as e:
+            print(f"Error rewriting query: {e}")
+            raise e
+
+async def rewrite_query_async(user_input, history):
+    """
+    Async version of rewrite_query, sharing the same model and concurrency limiter
+    as call_llm_async.
+    """
+    if not history:
+        return user_input
+
+    try:
+        return await generate_rewrite_async(user_input, history)
+    except Exception:
+        return user_input
@@ -1,75 +1,292 @@
-from sklearn.feature_extraction.text import TfidfVectorizer, ENGLISH_STOP_WORDS
-from sklearn.metrics.pairwise import cosine_similarity
-from typing import Dict, List, Optional
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
 
-class FAQRetriever:
+from .text import ENGLISH_STOP_WORDS, build_analyzer
+
+# Create a custom stop word list that preserves question words
+# This helps distinguish "Who is..." from "What is..."
+QUESTION_WORDS = {'who', 'what', 'where', 'when', 'why', 'how', 'which', 'whom', 'whose'}
+QUESTION_STOP_WORDS = frozenset(ENGLISH_STOP_WORDS - QUESTION_WORDS)
+ANSWER_STOP_WORDS = frozenset(ENGLISH_STOP_WORDS)
+
+@dataclass
+class SearchHit:
+    """
+    A scored FAQ match. `field` records which index produced the score ("question" or "answer",
+    or "hybrid" for a fused score). Hybrid hits also carry a calibrated `confidence` in [0, 1].
+    """
+    faq: Dict
+    index: int
+    score: float
+    field: str
+    confidence: Optional[float] = None
+
+class Retriever(ABC):
+    """
+    Interface shared by the retrieval backends (TF-IDF below, embeddings in
+    app/embeddings.py). Each backend scores the "question" and "answer" fields
+    separately; find_best_match takes the best question hit above its threshold,
+    falling back to the best answer hit.
+    """
+    # A field's best hit is accepted only if its score is above the field's threshold.
+    DEFAULT_THRESHOLDS: Dict[str, float] = {}
+
+    faq_data: List[Dict]
+    thresholds: Dict[str, float]
+
+    @abstractmethod
+    def search(self, query: str, k: int = 5) -> List[SearchHit]:
+        """
+        Returns up to `k` hits per field, question hits first, each field ordered
+        by descending score. Hits with a zero score are dropped.
+        """
+
+    def find_best_matches(self, queries: List[str]) -> List[Optional[Dict]]:
+        """Batched find_best_match. Backends override this with a vectorized version."""
+        return [self.find_best_match(query) for query in queries]
+
+    def find_best_match(self, query: str) -> Optional[Dict]:
+        """
+        Finds the best FAQ match for a user query using the pre-fitted model.
+
+        Args:
+            query: The user's input string.
+
+        Returns:
+            The FAQ dictionary with the highest similarity score, or None if no
+            suitable match is found above a certain threshold.
+        """
+        hit = self.best_hit(query)
+        return hit.faq if hit else None
+
+    def best_hit(self, query: str) -> Optional[SearchHit]:
+        """The hit find_best_match returns the FAQ of, with its score and field."""
+        # Questions are searched first; answers are the fallback.
+        for hit in self.search(query, k=1):
+            if hit.score > self.thresholds[hit.field]:
+                return hit
+        return None
+
+    def _top_k(self, scores: np.ndarray, k: int, field: str) -> List[SearchHit]:
+        if k == 1:
+            # argmax keeps the lowest index on ties, matching the original behavior.
+            top = np.array([scores.argmax()])
+        elif k < len(scores):
+            candidates = np.argpartition(-scores, k - 1)[:k]
+            # Sort by descending score, breaking ties by index.
+            top = candidates[np.lexsort((candidates, -scores[candidates]))]
+        else:
+            top = np.lexsort((np.arange(len(scores)), -scores))
+
+        return [
+            SearchHit(faq=self.faq_data[i], index=int(i), score=float(scores[i]), field=field)
+            for i in top
+            if scores[i] > 0
+        ]
+
+class FAQRetriever(Retriever):
     """
     A class to handle FAQ retrieval using a pre-computed TF-IDF model.
     The vectorizer is fitted once during initialization for efficiency.
+
+    Fitting uses scikit-learn, which is imported only then: a retriever loaded
+    from a prebuilt index (see app/index.py) scores with numpy and scipy alone.
     """
-    def __init__(self, faq_data: List[Dict]):
+    DEFAULT_THRESHOLDS = {
+        "question": 0.3,  # Higher confidence required for title match
+        "answer": 0.1,    # Can be lower as it's a broader search
+    }
+
+    def __init__(self, faq_data: List[Dict], thresholds: Optional[Dict[str, float]] = None, analyzed_cache: Optional[Dict[str, Dict[str, List[str]]]] = None):
         """
         Initializes the retriever, fits the TF-IDF vectorizer, and stores the data.
+
+        Args:
+            faq_data: The FAQ entries to index.
+            thresholds: Optional per-field overrides of DEFAULT_THRESHOLDS.
+            analyzed_cache: Tokenized documents from a previous retriever (its
+                `analyzed_cache`). Documents whose text is unchanged are not
+                re-tokenized, which is most of the cost of a rebuild.
         """
         self.faq_data = faq_data
-
-        # Create a custom stop word list that preserves question words
-        # This helps distinguish "Who is..." from "What is..."
-        question_words = {'who', 'what', 'where', 'when', 'why', 'how', 'which', 'whom', 'whose'}
-        custom_stop_words = list(ENGLISH_STOP_WORDS - question_words)
+        self.thresholds = {**self.DEFAULT_THRESHOLDS, **(thresholds or {})}
+        self.stop_words = {"question": QUESTION_STOP_WORDS, "answer": ANSWER_STOP_WORDS}
+        self.analyzed_cache: Dict[str, Dict[str, List[str]]] = {}
+        previous_cache = analyzed_cache or {}
 
         # 1. Vectorizer for Questions (High priority)
         self.questions = [faq.get('question', '') for faq in self.faq_data]
-        
-        # Handle case where data might be empty or only contain stop words
-        try:
-            self.question_vectorizer = TfidfVectorizer(stop_words=custom_stop_words)
-            self.question_matrix = self.question_vectorizer.fit_transform(self.questions)
-        except ValueError:
-            self.question_matrix = None
+        self.question_vectorizer, self.question_matrix = self._fit("question", self.questions, previous_cache)
 
         # 2. Vectorizer for Answers (Fallback)
         self.answers = [faq.get('answer', '') for faq in self.faq_data]
+        self.answer_vectorizer, self.answer_matrix = self._fit("answer", self.answers, previous_cache)
+
+        self._build_column_matrices()
+
+    @classmethod
+    def from_fitted(cls, faq_data: List[Dict], question: Tuple, answer: Tuple, thresholds: Optional[Dict[str, float]] = None) -> "FAQRetriever":
+        """
+        Builds a retriever from already-fitted (vectorizer, matrix) pairs for each
+        field, without fitting anything. Used to load a persisted index.
+        """
+        retriever = cls.__new__(cls)
+        retriever.faq_data = faq_data
+        retriever.thresholds = {**cls.DEFAULT_THRESHOLDS, **(thresholds or {})}
+        retriever.stop_words = {"question": QUESTION_STOP_WORDS, "answer": ANSWER_STOP_WORDS}
+        retriever.analyzed_cache = {}
+        retriever.questions = [faq.get('question', '') for faq in faq_data]
+        retriever.answers = [faq.get('answer', '') for faq in faq_data]
+        retriever.question_vectorizer, retriever.question_matrix = question
+        retriever.answer_vectorizer, retriever.answer_matrix = answer
+        retriever._build_column_matrices()
+        return retriever
+
+    @classmethod
+    def load(cls, path: str, thresholds: Optional[Dict[str, float]] = None) -> "FAQRetriever":
+        """
+        Loads an index written by `app.index.save_index`, memory-mapping its arrays.
+        """
+        from .index import load_index
+        return load_index(path, thresholds=thresholds)
+
+    def _build_column_matrices(self) -> None:
+        # Column-major copies of the matrices so scoring only touches the
+        # columns of the terms that appear in the query.
+        self._column_matrices = {
+            "question": self.question_matrix.tocsc() if self.question_matrix is not None else None,
+            "answer": self.answer_matrix.tocsc() if self.answer_matrix is not None else None,
+        }
+
+    def _fit(self, field: str, texts: List[str], previous_cache: Dict[str, Dict[str, List[str]]]):
+        """
+        Fits a TF-IDF vectorizer for one field, reusing tokenized documents from
+        `previous_cache`. The result is identical to
+        `TfidfVectorizer(stop_words=self.stop_words[field]).fit_transform(texts)`.
+        """
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        analyzer = build_analyzer(self.stop_words[field])
+        previous = previous_cache.get(field, {})
+        analyzed = self.analyzed_cache.setdefault(field, {})
+        for text in texts:
+            if text not in analyzed:
+                analyzed[text] = previous[text] if text in previous else analyzer(text)
+
+        # Fit on the pre-tokenized documents, then switch to the real analyzer for queries.
+        vectorizer = TfidfVectorizer(analyzer=lambda tokens: tokens)
         try:
-            self.answer_vectorizer = TfidfVectorizer(stop_words='english')
-            self.answer_matrix = self.answer_vectorizer.fit_transform(self.answers)
+            matrix = vectorizer.fit_transform([analyzed[text] for text in texts])
         except ValueError:
-            self.answer_matrix = None
+            # Handle case where data might be empty or only contain stop words
+            matrix = None
+        vectorizer.set_params(analyzer=analyzer)
+        return vectorizer, matrix
 
-    def find_best_match(self, query: str) -> Optional[Dict]:
+    def _indexes(self) -> List[Tuple[str, Any, object]]:
+        # Fields in priority order: questions first, answers as the fallback.
+        return [
+            ("question", self.question_vectorizer, self._column_matrices["question"]),
+            ("answer", self.answer_vectorizer, self._column_matrices["answer"]),
+        ]
+
+    @staticmethod
+    def _score(query: str, vectorizer, matrix) -> np.ndarray:
+        query_vector = vectorizer.transform([query])
+        # Only the query's non-zero terms contribute to the dot product.
+        return np.asarray(matrix[:, query_vector.indices] @ query_vector.data).ravel()
+
+    def field_scores(self, query: str) -> Dict[str, np.ndarray]:
         """
-        Finds the best FAQ match for a user query using the pre-fitted model.
+        Scores the query against every FAQ, one transform and one sparse
+        matrix-vector product per field.
+
+        TfidfVectorizer L2-normalizes its rows, so the dot product of the query
+        vector with each row is already the cosine similarity.
+        """
+        return {
+            field: self._score(query, vectorizer, matrix)
+            for field, vectorizer, matrix in self._indexes()
+            if matrix is not None
+        }
+
+    def best_hit(self, query: str) -> Optional[SearchHit]:
+        """
+        The hit find_best_match returns the FAQ of. The answers are only scored
+        when no question clears its threshold.
+        """
+        if not self.faq_data:
+            return None
+        for field, vectorizer, matrix in self._indexes():
+            if matrix is None:
+                continue
+            for hit in self._top_k(self._score(query, vectorizer, matrix), 1, field):
+                if hit.score > self.thresholds[field]:
+                    return hit
+        return None
+
+    def search(self, query: str, k: int = 5) -> List[SearchHit]:
+        """
+        Returns up to `k` hits per field, question hits first, each field ordered
+        by descending score. Hits with a zero score are dropped.
 
         Args:
             query: The user's input string.
+            k: Number of hits to return per field.
+        """
+        if not self.faq_data or k <= 0:
+            return []
 
-        Returns:
-            The FAQ dictionary with the highest similarity score, or None if no
-            suitable match is found above a certain threshold.
+        hits = []
+        for field, scores in self.field_scores(query).items():
+            hits.extend(self._top_k(scores, k, field))
+        return hits
+
+    def _best_rows(self, query_matrix, matrix, max_cells: int = 1 << 22) -> Tuple[np.ndarray, np.ndarray]:
         """
+        For each row of `query_matrix`, returns the index and score of the best FAQ.
+        Scores come from one sparse matrix product, densified in row chunks so memory
+        stays bounded on large corpora.
+        """
+        term_major = matrix.T.tocsr()
+        rows = query_matrix.shape[0]
+        chunk_rows = max(1, max_cells // max(matrix.shape[0], 1))
+
+        best_index = np.zeros(rows, dtype=np.int64)
+        best_score = np.zeros(rows)
+        for start in range(0, rows, chunk_rows):
+            scores = (query_matrix[start:start + chunk_rows] @ term_major).toarray()
+            best_index[start:start + chunk_rows] = scores.argmax(axis=1)
+            best_score[start:start + chunk_rows] = scores.max(axis=1)
+        return best_index, best_score
+
+    def find_best_matches(self, queries: List[str]) -> List[Optional[Dict]]:
+        """
+        Batched find_best_match for bulk/offline scoring. All queries are vectorized
+        in one transform per field and scored with one sparse matrix product, keeping
+        the question-then-answer fallback: only queries without a confident question
+        match are scored against the answers.
+
+        Returns one FAQ dictionary (or None) per query, identical to calling
+        find_best_match on each query.
+        """
+        results: List[Optional[Dict]] = [None] * len(queries)
         if not self.faq_data:
-            return None
+            return results
 
-        # Step 1: Search Questions
-        if self.question_matrix is not None:
-            q_vector = self.question_vectorizer.transform([query])
-            q_similarities = cosine_similarity(q_vector, self.question_matrix).flatten()
-            best_q_index = q_similarities.argmax()
-            max_q_sim = q_similarities[best_q_index]
-
-            # Threshold for questions (higher confidence required for title match)
-            if max_q_sim > 0.3:
-                return self.faq_data[best_q_index]
-
-        # Step 2: Search Answers (Fallback)
-        if self.answer_matrix is not None:
-            a_vector = self.answer_vectorizer.transform([query])
-            a_similarities = cosine_similarity(a_vector, self.answer_matrix).flatten()
-            best_a_index = a_similarities.argmax()
-            max_a_sim = a_similarities[best_a_index]
-
-            # Threshold for answers (can be lower as it's a broader search)
-            if max_a_sim > 0.1:
-                return self.faq_data[best_a_index]
-        
-        return None
+        pending = np.arange(len(queries))
+        for field, vectorizer, matrix in self._indexes():
+            if matrix is None or len(pending) == 0:
+                continue
+
+            query_matrix = vectorizer.transform([queries[i] for i in pending])
+            best_index, best_score = self._best_rows(query_matrix, matrix)
+
+            accepted = best_score > self.thresholds[field]
+            for query_position, faq_index in zip(pending[accepted], best_index[accepted]):
+                results[query_position] = self.faq_data[faq_index]
+            pending = pending[~accepted]
+
+        return results
@@ -0,0 +1,99 @@
+import re
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .cache import MemoryCacheBackend, normalize_query
+from .text import ENGLISH_STOP_WORDS
+from .utils import CONTEXTUAL_WORDS
+
+MATCHED_FAQ_PREFIX = "Found: "
+
+def last_matched_faq(history: List[Dict]) -> Optional[str]:
+    """
+    Returns the question of the most recent "Matched FAQ" entry in the history,
+    or None if the last retrieval found nothing.
+    """
+    for msg in reversed(history):
+        if msg.get("role") == "Matched FAQ":
+            content = msg.get("content", "")
+            if content.startswith(MATCHED_FAQ_PREFIX):
+                return content[len(MATCHED_FAQ_PREFIX):]
+            return None
+    return None
+
+def faq_topic(faq_question: str) -> str:
+    """
+    Reduces an FAQ question to its topic words, e.g. "What is Vendor Services?" -> "Vendor Services".
+    """
+    words = [word.strip("?.,!") for word in faq_question.split()]
+    topic = [word for word in words if word and word.lower() not in ENGLISH_STOP_WORDS]
+    return " ".join(topic) or faq_question.strip("?")
+
+def local_rewrite(user_input: str, faq_question: Optional[str]) -> str:
+    """
+    Rewrites a follow-up without the LLM by replacing pronouns ("it", "that", ...)
+    with the topic of the last matched FAQ. Returns the input unchanged if there is
+    no previous match or no pronoun to replace.
+    """
+    if not faq_question:
+        return user_input
+
+    topic = faq_topic(faq_question)
+    pattern = r"\b(" + "|".join(sorted(CONTEXTUAL_WORDS)) + r")\b"
+    return re.sub(pattern, topic, user_input, flags=re.IGNORECASE)
+
+class QueryRewriter:
+    """
+    Turns follow-up questions into standalone search queries, avoiding the LLM hop where possible:
+
+      1. Memoized rewrites are reused, keyed on (last matched FAQ, normalized follow-up).
+      2. A local pronoun swap is tried; if it retrieves an FAQ, the LLM is skipped.
+      3. Otherwise the LLM rewrite is used.
+
+    The retrieval result (from the `retriever` passed in) is returned alongside the
+    query so callers don't search twice.
+    """
+    def __init__(self, llm_rewrite: Callable[[str, List[Dict]], Awaitable[str]], memo_size: int = 1024, memo_ttl_seconds: float = 3600):
+        self.llm_rewrite = llm_rewrite
+        self.memo = MemoryCacheBackend(max_size=memo_size, ttl_seconds=memo_ttl_seconds)
+        self.avoided = 0
+        self.cached = 0
+        self.llm_calls = 0
+
+    def memo_key(self, faq_question: Optional[str], user_input: str) -> str:
+        return f"{faq_question or ''}|{normalize_query(user_input)}"
+
+    async def rewrite(self, user_input: str, history: List[Dict], retriever) -> Tuple[str, Optional[Dict]]:
+        faq_question = last_matched_faq(history)
+        key = self.memo_key(faq_question, user_input)
+
+        search_query = self.memo.get(key)
+        if search_query is not None:
+            self.cached += 1
+            return search_query, retriever.find_best_match(search_query)
+
+        search_query = local_rewrite(user_input, faq_question)
+        relevant_faq = retriever.find_best_match(search_query)
+        if relevant_faq:
+            self.avoided += 1
+            self.memo.set(key, search_query)
+            return search_query, relevant_faq
+
+        self.llm_calls += 1
+        try:
+            search_query = await self.llm_rewrite(user_input, history)
+        except Exception:
+            # Fallback: If rewrite fails (LLM error), use the original message.
+            search_query = user_input
+
+        # An unchanged query usually means the LLM call failed, so don't memoize it.
+        if search_query != user_input:
+            self.memo.set(key, search_query)
+        return search_query, retriever.find_best_match(search_query)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "avoided": self.avoided,
+            "cached": self.cached,
+            "llm": self.llm_calls,
+            "memo_size": len(self.memo),
+        }
@@ -0,0 +1,84 @@
+"""
+Scores logged queries against the FAQ corpus in bulk using the batched retrieval path.
+
+Useful for checking how threshold changes or corpus edits affect retrieval before
+deploying them. Input is a text file with one query per line, or a JSONL file whose
+lines have a "message" or "query" field. Output is one JSON object per query.
+
+Usage:
+    python3 -m app.score_queries queries.txt --output results.jsonl
+    python3 -m app.score_queries queries.jsonl --question-threshold 0.25 --faq-file my_faqs.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Iterable, List
+
+from .retrieval import FAQRetriever
+
+FAQ_FILE_PATH = os.path.join(os.path.dirname(__file__), "..", "SEED_DATA", "epic_vendor_faq.json")
+
+def read_queries(lines: Iterable[str]) -> List[str]:
+    queries = []
+    for line in lines:
+        line = line.rstrip("\n")
+        if line.startswith("{"):
+            record = json.loads(line)
+            queries.append(record.get("message", record.get("query", "")))
+        elif line:
+            queries.append(line)
+    return queries
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("queries", help="Query file (plain text or JSONL), or - for stdin.")
+    parser.add_argument("--output", help="Write JSONL results here instead of stdout.")
+    parser.add_argument("--faq-file", default=FAQ_FILE_PATH, help="FAQ corpus to score against.")
+    parser.add_argument("--question-threshold", type=float, help="Override the question match threshold.")
+    parser.add_argument("--answer-threshold", type=float, help="Override the answer match threshold.")
+    args = parser.parse_args(argv)
+
+    with open(args.faq_file, 'r') as f:
+        faq_data = json.load(f)
+
+    thresholds = {}
+    if args.question_threshold is not None:
+        thresholds["question"] = args.question_threshold
+    if args.answer_threshold is not None:
+        thresholds["answer"] = args.answer_threshold
+    retriever = FAQRetriever(faq_data, thresholds=thresholds)
+
+    if args.queries == "-":
+        queries = read_queries(sys.stdin)
+    else:
+        with open(args.queries, 'r') as f:
+            queries = read_queries(f)
+
+    start = time.perf_counter()
+    matches = retriever.find_best_matches(queries)
+    elapsed = time.perf_counter() - start
+
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for query, faq in zip(queries, matches):
+            out.write(json.dumps({
+                "query": query,
+                "faq_id": faq.get("id") if faq else None,
+                "question": faq.get("question") if faq else None,
+                "url": faq.get("url", "") if faq else "",
+            }) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    hits = sum(faq is not None for faq in matches)
+    print(
+        f"Scored {len(queries)} queries in {elapsed:.3f}s; "
+        f"{hits} matched ({hits / max(len(queries), 1):.1%})",
+        file=sys.stderr,
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Multi-process launcher: loads the app (and so the FAQ index) once in a parent
+process, then forks worker processes that share its memory copy-on-write.
+
+    python -m app.serve --workers 4 --port 8000
+
+Every worker serves the same listening socket, opened by the parent. The parent
+restarts workers that exit unexpectedly. On SIGTERM or SIGINT it forwards SIGTERM
+to the workers, which drain: /readyz turns 503 at once, the worker keeps serving
+for --drain-seconds so load balancers can take it out of rotation, then stops
+accepting connections and waits up to --graceful-timeout for in-flight requests.
+
+The retriever's numpy/scipy arrays are never written after loading, so their
+pages stay shared between workers. The parent calls gc.freeze() before forking so
+the workers' garbage collector does not touch (and so copy) the pages of the
+Python objects built at startup. A hot reload builds a new retriever in the
+worker that reloads, which is then private to that worker; with FAQ_INDEX_PATH,
+reloaded indexes are memory-mapped and shared through the page cache instead.
+
+With --no-preload each worker imports the app itself after the fork (every
+worker fits its own index), which is mainly useful for comparison.
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, List, Optional
+
+import uvicorn
+
+class DrainingServer(uvicorn.Server):
+    """
+    uvicorn server that, on the first shutdown signal, marks the app as draining
+    (failing /readyz) and keeps serving for `drain_seconds` before the usual
+    graceful shutdown. A second signal skips the rest of the drain period.
+    """
+    def __init__(self, config: uvicorn.Config, app, drain_seconds: float = 0.0):
+        super().__init__(config)
+        self.app = app
+        self.drain_seconds = drain_seconds
+        self.drain_deadline: Optional[float] = None
+
+    def handle_exit(self, sig, frame) -> None:
+        if self.drain_deadline is None and self.drain_seconds > 0:
+            self.app.state.draining = True
+            self.drain_deadline = time.monotonic() + self.drain_seconds
+            return
+        self.app.state.draining = True
+        super().handle_exit(sig, frame)
+
+    async def on_tick(self, counter: int) -> bool:
+        if self.drain_deadline is not None and time.monotonic() >= self.drain_deadline:
+            self.should_exit = True
+        return await super().on_tick(counter)
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """Opens the listening socket shared by every worker."""
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+def load_app():
+    from .main import app
+    return app
+
+def run_worker(sock: socket.socket, args: argparse.Namespace, app=None) -> None:
+    """Runs one uvicorn worker on the shared socket until it is told to stop."""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    gc.enable()
+    if app is None:
+        app = load_app()
+    config = uvicorn.Config(
+        app, log_level=args.log_level, timeout_graceful_shutdown=args.graceful_timeout,
+        limit_concurrency=args.limit_concurrency or None,
+    )
+    DrainingServer(config, app, drain_seconds=args.drain_seconds).run(sockets=[sock])
+
+class Supervisor:
+    """Forks the workers, restarts the ones that die and stops them all on shutdown."""
+    def __init__(self, sock: socket.socket, args: argparse.Namespace, app=None):
+        self.sock = sock
+        self.args = args
+        self.app = app
+        self.workers: Dict[int, int] = {}  # pid -> worker number
+        self.stopping = False
+        self.restarts = 0
+
+    def spawn(self, number: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(self.sock, self.args, self.app)
+            except BaseException as e:
+                print(f"Worker {number} failed: {e}", file=sys.stderr)
+                code = 1
+            finally:
+                os._exit(code)
+        self.workers[pid] = number
+
+    def stop(self, signum, frame) -> None:
+        if self.stopping:
+            # A second signal skips the drain period.
+            sig = signal.SIGINT
+        else:
+            self.stopping = True
+            sig = signal.SIGTERM
+            print(f"Draining {len(self.workers)} workers...", file=sys.stderr)
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for number in range(self.args.workers):
+            self.spawn(number)
+        print(f"Serving on {self.args.host}:{self.args.port} with {self.args.workers} workers "
+              f"({'preloaded' if self.app is not None else 'loaded per worker'})", file=sys.stderr)
+
+        while self.workers:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            number = self.workers.pop(pid, None)
+            if number is None or self.stopping:
+                continue
+            print(f"Worker {number} (pid {pid}) exited with status {status}; restarting", file=sys.stderr)
+            self.restarts += 1
+            time.sleep(self.args.restart_delay)
+            self.spawn(number)
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1))),
+                        help="Worker processes (default: WEB_CONCURRENCY or the CPU count).")
+    parser.add_argument("--no-preload", dest="preload", action="store_false",
+                        help="Import the app in each worker instead of once in the parent.")
+    parser.add_argument("--drain-seconds", type=float, default=float(os.getenv("DRAIN_SECONDS", "5")),
+                        help="How long a stopping worker keeps serving with /readyz failing.")
+    parser.add_argument("--graceful-timeout", type=float, default=float(os.getenv("GRACEFUL_TIMEOUT_SECONDS", "30")),
+                        help="How long a stopping worker waits for in-flight requests.")
+    parser.add_argument("--limit-concurrency", type=int, default=0, help="Per-worker connection limit (0: none).")
+    parser.add_argument("--restart-delay", type=float, default=1.0, help="Pause before restarting a dead worker.")
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "warning"))
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    # Keep the startup objects out of the collector's way until they are frozen below.
+    gc.disable()
+    app = load_app() if args.preload else None
+    sock = bind_socket(args.host, args.port)
+    # Move everything allocated so far to the permanent generation, so collections
+    # in the workers never write to (and copy) the shared pages.
+    gc.freeze()
+    Supervisor(sock, args, app).run()
+    sock.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import asyncio
+import os
+import secrets
+import weakref
+from typing import Any, Dict, List, Optional
+
+from .cache import CacheBackend, create_cache_backend
+
+class SessionStore:
+    """
+    Server-side conversation history for clients that opt in with a session id.
+    The client then sends only the new message and receives only the new turn,
+    instead of shipping the whole history back and forth on every request.
+
+    Histories are stored in a CacheBackend, so sessions are bounded by the same
+    TTL and LRU eviction as the answer cache; an expired or evicted session simply
+    starts a new conversation.
+    """
+    def __init__(self, backend: Optional[CacheBackend]):
+        self.backend = backend
+        self.started = 0
+        self.resumed = 0
+        # One lock per active session, so concurrent requests on the same session
+        # run one turn at a time instead of overwriting each other's history.
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None and self.backend.max_size > 0
+
+    @staticmethod
+    def new_session_id() -> str:
+        return secrets.token_urlsafe(16)
+
+    def lock(self, session_id: str) -> asyncio.Lock:
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[session_id] = lock
+        return lock
+
+    def load(self, session_id: str) -> List[Dict]:
+        """Returns the stored history, or an empty one for a new or expired session."""
+        history = self.backend.get(session_id)
+        if history is None:
+            self.started += 1
+            return []
+        self.resumed += 1
+        # Copy so a turn that fails halfway never leaves a partial history in the store.
+        return list(history)
+
+    def save(self, session_id: str, history: List[Dict]) -> None:
+        self.backend.set(session_id, history)
+
+    def delete(self, session_id: str) -> None:
+        self.backend.delete(session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "size": len(self.backend) if self.enabled else 0,
+            "max_size": self.backend.max_size if self.backend else 0,
+            "ttl_seconds": self.backend.ttl_seconds if self.backend else 0,
+            "started": self.started,
+            "resumed": self.resumed,
+            "evictions": self.backend.evictions if self.backend else 0,
+            "expirations": self.backend.expirations if self.backend else 0,
+        }
+
+def session_store_from_env() -> SessionStore:
+    """
+    Builds the session store from environment variables:
+      SESSION_STORE_SIZE (0 disables sessions), SESSION_TTL_SECONDS,
+      SESSION_STORE_BACKEND ("memory" or "sqlite"), SESSION_STORE_PATH (sqlite file).
+    """
+    max_size = int(os.getenv("SESSION_STORE_SIZE", "10000"))
+    if max_size <= 0:
+        return SessionStore(None)
+
+    backend = create_cache_backend(
+        os.getenv("SESSION_STORE_BACKEND", "memory"),
+        max_size=max_size,
+        ttl_seconds=float(os.getenv("SESSION_TTL_SECONDS", "1800")),
+        path=os.getenv("SESSION_STORE_PATH", "sessions.sqlite3"),
+    )
+    return SessionStore(backend)
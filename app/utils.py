@@ -1,6 +1,18 @@
-from typing import List, Dict
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from collections import Counter
+from functools import lru_cache
+from math import log, sqrt
+from typing import List, Dict, Optional
+
+from .text import ENGLISH_STOP_WORDS, build_analyzer
+
+# Pronouns that usually refer back to the previous topic.
+CONTEXTUAL_WORDS = {'it', 'they', 'them', 'that', 'those', 'this', 'his', 'her', 'their'}
+
+def has_contextual_pronoun(user_input: str) -> bool:
+    # Short inputs with pronouns are very likely follow-ups. This handles cases
+    # like "Who is it for?"
+    words = user_input.lower().split()
+    return len(words) <= 15 and any(word.strip(".,?!") in CONTEXTUAL_WORDS for word in words)
 
 def is_follow_up_question(user_input: str, history: List[Dict], threshold: float = 0.3) -> bool:
     """
@@ -8,6 +20,7 @@ def is_follow_up_question(user_input: str, history: List[Dict], threshold: float
 
     This function uses TF-IDF to vectorize the user's input and the entire
     conversation history. It then calculates the cosine similarity between them.
+    It is the reference for FollowUpDetector and imports scikit-learn on first use.
 
     Args:
         user_input: The user's latest message.
@@ -22,16 +35,15 @@ def is_follow_up_question(user_input: str, history: List[Dict], threshold: float
     if not history:
         return False
 
-    # Short inputs with pronouns are very likely follow-ups. This handles cases
-    # like "Who is it for?"
-    words = user_input.lower().split()
-    contextual_words = {'it', 'they', 'them', 'that', 'those', 'this', 'his', 'her', 'their'}
-    if len(words) <= 15 and any(word.strip(".,?!") in contextual_words for word in words):
+    if has_contextual_pronoun(user_input):
         return True
 
     # Join the list of historical messages into a single string.
     history_text = " ".join([msg.get("content", "") for msg in history])
 
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.metrics.pairwise import cosine_similarity
+
     # Create a TF-IDF Vectorizer.
     vectorizer = TfidfVectorizer(stop_words='english')
 
@@ -47,3 +59,86 @@ def is_follow_up_question(user_input: str, history: List[Dict], threshold: float
 
     # Return True if the similarity score exceeds our defined threshold.
     return similarity_score > threshold
+
+# With smooth IDF over the two documents (history, input), a term found in both gets
+# idf = ln(3/3) + 1 = 1 and a term found in only one gets ln(3/2) + 1.
+UNSHARED_TERM_WEIGHT = log(3 / 2) + 1
+
+class HistoryVector:
+    """
+    Term counts for a conversation history, built up one message at a time.
+    Also tracks the sum of squared counts so the vector norm never needs a full pass.
+    """
+    def __init__(self):
+        self.counts: Dict[str, int] = {}
+        self.sum_of_squares = 0
+
+    def add(self, term_counts: Dict[str, int]) -> None:
+        for term, count in term_counts.items():
+            old = self.counts.get(term, 0)
+            self.counts[term] = old + count
+            self.sum_of_squares += (old + count) ** 2 - old ** 2
+
+class FollowUpDetector:
+    """
+    Drop-in replacement for is_follow_up_question that never refits a vectorizer.
+
+    The analyzer (tokenizer + stop words) is built once. Each history message is
+    tokenized once and its term counts memoized, so a turn only tokenizes the new
+    input and takes a sparse dot product against the history counts. The score is
+    the same cosine similarity the per-request TF-IDF fit produces, computed in
+    closed form from the two-document IDF weights, so decisions are identical.
+    """
+    def __init__(self, threshold: float = 0.3, cache_size: int = 4096):
+        self.threshold = threshold
+        self._analyzer = build_analyzer(ENGLISH_STOP_WORDS)
+        self._term_counts = lru_cache(maxsize=cache_size)(self._count_terms)
+
+    def _count_terms(self, text: str) -> Dict[str, int]:
+        return dict(Counter(self._analyzer(text)))
+
+    def history_vector(self, history: List[Dict]) -> HistoryVector:
+        vector = HistoryVector()
+        for msg in history:
+            vector.add(self._term_counts(msg.get("content", "")))
+        return vector
+
+    def similarity(self, user_input: str, vector: HistoryVector) -> float:
+        """
+        Cosine similarity between the input and history TF-IDF vectors.
+        """
+        input_counts = self._term_counts(user_input)
+
+        dot = 0
+        shared_history_squares = 0
+        shared_input_squares = 0
+        for term, count in input_counts.items():
+            history_count = vector.counts.get(term)
+            if history_count:
+                dot += history_count * count
+                shared_history_squares += history_count ** 2
+                shared_input_squares += count ** 2
+
+        if dot == 0:
+            return 0.0
+
+        # Shared terms have weight 1, every other term has UNSHARED_TERM_WEIGHT.
+        extra = UNSHARED_TERM_WEIGHT ** 2
+        history_norm = extra * vector.sum_of_squares - (extra - 1) * shared_history_squares
+        input_norm = extra * sum(count ** 2 for count in input_counts.values()) - (extra - 1) * shared_input_squares
+        return dot / sqrt(history_norm * input_norm)
+
+    def is_follow_up(self, user_input: str, history: List[Dict], vector: Optional[HistoryVector] = None) -> bool:
+        """
+        Same decision as is_follow_up_question. Pass a precomputed HistoryVector to
+        skip rebuilding it from the history.
+        """
+        if not history:
+            return False
+
+        if has_contextual_pronoun(user_input):
+            return True
+
+        if vector is None:
+            vector = self.history_vector(history)
+        return self.similarity(user_input, vector) > self.threshold
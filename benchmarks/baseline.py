@@ -0,0 +1,48 @@
+"""
+Helpers shared by the benchmarks that save their results as a JSON baseline and
+compare a later run against it (load_suite.py, eval_retrieval.py).
+"""
+import os
+import subprocess
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+def compare(baseline, results, comparable_metrics, tolerance, min_delta_ms):
+    """
+    Prints metrics that moved by more than `tolerance` (and, for latencies, by more
+    than `min_delta_ms`, so sub-millisecond noise is ignored). `comparable_metrics`
+    flattens a results dict into {name: (value, higher_is_better)}; latency metric
+    names end in "_ms". Returns the number of regressions.
+    """
+    if baseline.get("config") != results["config"]:
+        print("\nWarning: baseline was recorded with a different configuration:")
+        print(f"  baseline {baseline.get('config')}\n  current  {results['config']}")
+
+    old_metrics = comparable_metrics(baseline)
+    regressions = 0
+    print(f"\nCompared with baseline {baseline.get('git_commit') or '?'} (tolerance {tolerance:.0%}):")
+    for name, (value, higher_is_better) in comparable_metrics(results).items():
+        if name not in old_metrics or old_metrics[name][0] == 0:
+            continue
+        if name.endswith("_ms") and abs(value - old_metrics[name][0]) < min_delta_ms:
+            continue
+        change = (value - old_metrics[name][0]) / old_metrics[name][0]
+        worse = -change if higher_is_better else change
+        if abs(change) > tolerance:
+            status = "REGRESSION" if worse > 0 else "improved"
+            regressions += worse > 0
+            print(f"  {status:<10} {name:<48} {old_metrics[name][0]:10.2f} -> {value:10.2f} ({change:+.0%})")
+    print(f"  {regressions} regression(s)")
+    return regressions
@@ -0,0 +1,41 @@
+"""
+Bulk retrieval benchmark: per-query find_best_match vs. batched find_best_matches.
+
+Usage:
+    python3 benchmarks/bench_batch_retrieval.py --queries 10000 --size 12
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.retrieval import FAQRetriever
+from synthetic import sample_queries, synthetic_faqs
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=10_000, help="Number of queries to score.")
+    parser.add_argument("--size", type=int, default=12, help="Corpus size (12 = the seed FAQs).")
+    args = parser.parse_args()
+
+    faqs = synthetic_faqs(args.size)
+    retriever = FAQRetriever(faqs)
+    queries = sample_queries(faqs, args.queries)
+
+    start = time.perf_counter()
+    single = [retriever.find_best_match(query) for query in queries]
+    single_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = retriever.find_best_matches(queries)
+    batched_time = time.perf_counter() - start
+
+    mismatches = sum(a is not b for a, b in zip(single, batched))
+    print(f"Corpus: {args.size} FAQs, {args.queries} queries, mismatches: {mismatches}")
+    print(f"  per-query  {args.queries / single_time:10.0f} queries/s")
+    print(f"  batched    {args.queries / batched_time:10.0f} queries/s   ({single_time / batched_time:.1f}x)")
+
+if __name__ == "__main__":
+    main()
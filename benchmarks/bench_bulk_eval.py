@@ -0,0 +1,82 @@
+"""
+Throughput and memory of the bulk evaluation CLI (app/bulk_eval.py) with the mock LLM.
+
+Generates request logs of increasing size from the labelled seed queries (every
+--conversation-every'th line a two-turn conversation), then runs
+`python -m app.bulk_eval` on each in a fresh process at several concurrency
+levels. Reports requests/s and the peak RSS of the process, which should stay
+flat as the log grows.
+
+Usage:
+    python3 benchmarks/bench_bulk_eval.py
+    python3 benchmarks/bench_bulk_eval.py --sizes 1000 10000 100000 --concurrency 1 8 32 --latency-ms 50
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+QUERIES_PATH = os.path.join(ROOT, "SEED_DATA", "epic_vendor_faq_queries.jsonl")
+
+RUNNER = (
+    "import resource, sys\n"
+    "from app.bulk_eval import main\n"
+    "main(sys.argv[1:])\n"
+    "print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, file=sys.stderr)\n"
+)
+
+def write_log(path, labelled, size, conversation_every):
+    with open(path, "w") as f:
+        for i in range(size):
+            row = labelled[i % len(labelled)]
+            if conversation_every and i % conversation_every == 0:
+                record = {"id": str(i), "messages": [row["query"], "Tell me more about that"]}
+            else:
+                record = {"id": str(i), "message": row["query"], "faq_id": row["faq_id"]}
+            f.write(json.dumps(record) + "\n")
+
+def run(log_path, output_path, concurrency, latency_ms):
+    env = {**os.environ, "USE_MOCK_GEMINI": "true", "MOCK_LLM_LATENCY_MS": str(latency_ms), "ANSWER_CACHE_SIZE": "0"}
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", RUNNER, log_path, "--output", output_path, "--fresh",
+         "--concurrency", str(concurrency)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    elapsed = time.perf_counter() - start
+    report = json.loads(proc.stdout)
+    return {
+        "elapsed_s": elapsed,
+        "rps": report["requests"] / elapsed,
+        "peak_rss_mb": int(proc.stderr.strip().splitlines()[-1]) / 1024,
+        "p50_ms": report["p50_ms"],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="Requests per log.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="Concurrency levels to compare.")
+    parser.add_argument("--latency-ms", type=float, default=20, help="Mock LLM latency.")
+    parser.add_argument("--conversation-every", type=int, default=5, help="Every Nth request is a two-turn conversation (0: none).")
+    args = parser.parse_args()
+
+    with open(QUERIES_PATH) as f:
+        labelled = [json.loads(line) for line in f if line.strip()]
+
+    print(f"mock LLM latency {args.latency_ms:.0f} ms")
+    print(f"{'requests':>9} {'concurrency':>12} {'elapsed_s':>10} {'req/s':>8} {'p50_ms':>8} {'peak_rss_mb':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            log_path = os.path.join(tmp, f"requests_{size}.jsonl")
+            write_log(log_path, labelled, size, args.conversation_every)
+            for concurrency in args.concurrency:
+                result = run(log_path, os.path.join(tmp, "results.jsonl"), concurrency, args.latency_ms)
+                print(f"{size:>9} {concurrency:>12} {result['elapsed_s']:>10.2f} {result['rps']:>8.0f} "
+                      f"{result['p50_ms']:>8.1f} {result['peak_rss_mb']:>12.0f}")
+
+if __name__ == "__main__":
+    main()
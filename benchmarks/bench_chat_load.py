@@ -0,0 +1,92 @@
+"""
+Load benchmark for the /chat endpoint against the mock LLM.
+
+Compares the async chat pipeline with a blocking `def` handler that does the same
+work synchronously (the previous design), so the effect of freeing threadpool
+workers during the LLM round-trip is visible.
+
+Usage:
+    python3 benchmarks/bench_chat_load.py --requests 2000 --concurrency 500 --latency-ms 500
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="Total requests per run.")
+    parser.add_argument("--concurrency", type=int, default=500, help="Concurrent in-flight requests.")
+    parser.add_argument("--latency-ms", type=float, default=500, help="Simulated mock LLM latency.")
+    parser.add_argument("--llm-concurrency", type=int, default=1000, help="LLM_MAX_CONCURRENCY for the async path.")
+    return parser.parse_args()
+
+args = parse_args()
+
+# Configure the app before it is imported.
+os.environ["USE_MOCK_GEMINI"] = "true"
+os.environ["MOCK_LLM_LATENCY_MS"] = str(args.latency_ms)
+os.environ["LLM_MAX_CONCURRENCY"] = str(args.llm_concurrency)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import httpx
+from fastapi import FastAPI
+
+from app.main import app, corpus
+from app.mock import call_mock_llm
+from app.models import ChatRequest
+
+QUESTIONS = [
+    "What is Vendor Services?",
+    "How much does it cost to subscribe to Vendor Services?",
+    "Does Vendor Services offer a trial period?",
+    "What is Epic on FHIR?",
+]
+
+def build_blocking_app() -> FastAPI:
+    """A sync handler that blocks a worker thread for the whole LLM call."""
+    blocking_app = FastAPI()
+
+    @blocking_app.post("/chat")
+    def chat(req: ChatRequest):
+        relevant_faq = corpus.retriever.find_best_match(req.message)
+        return {"answer": call_mock_llm(relevant_faq)}
+
+    return blocking_app
+
+async def run_load(target_app, total: int, concurrency: int):
+    transport = httpx.ASGITransport(app=target_app)
+    latencies = []
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(QUESTIONS[i % len(QUESTIONS)])
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            while not queue.empty():
+                message = queue.get_nowait()
+                start = time.perf_counter()
+                response = await client.post("/chat", json={"message": message, "history": []})
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+def main():
+    print(f"Requests: {args.requests}, concurrency: {args.concurrency}, mock latency: {args.latency_ms}ms")
+    for name, target_app in [("blocking def", build_blocking_app()), ("async def", app)]:
+        result = asyncio.run(run_load(target_app, args.requests, args.concurrency))
+        print(f"  {name:<14} {result['rps']:8.1f} req/s   p50 {result['p50_ms']:7.1f}ms   p99 {result['p99_ms']:7.1f}ms")
+
+if __name__ == "__main__":
+    main()
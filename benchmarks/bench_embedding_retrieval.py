@@ -0,0 +1,121 @@
+"""
+Recall and latency of the retriever backends on the seed FAQs and on a synthetic
+corpus: TF-IDF vs. an LSA embedding model scanned exactly vs. through the IVF index.
+
+Queries are labelled with the FAQ they were made from (its question, half of its
+question's words, or a run of words from its answer). match@1 is the fraction for
+which find_best_match returns that FAQ; recall@5 is the fraction for which it is
+among the top 5 hits of either field. IVF recall@10 is the fraction of the IVF
+top 10 (question field) scoring at least the exact 10th-best score; the synthetic
+questions share a small vocabulary, so exact ties are common and comparing FAQ ids
+would understate it.
+
+Usage:
+    python3 benchmarks/bench_embedding_retrieval.py --size 100000 --queries 300
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+from app.build_embedding_model import corpus_texts, fit_lsa
+from app.embeddings import EmbeddingRetriever, IVFIndex, ProjectionEncoder
+from app.index import TermVectorizer
+from app.retrieval import FAQRetriever
+from bench_retrieval import time_per_query
+from synthetic import load_seed_faqs, synthetic_faqs
+
+def labelled_queries(faqs, count, seed=2):
+    """Returns (query, FAQ index) pairs."""
+    rng = random.Random(seed)
+    queries = []
+    for i in range(count):
+        label = rng.randrange(len(faqs))
+        faq = faqs[label]
+        kind = i % 3
+        if kind == 0:
+            queries.append((faq["question"], label))
+        elif kind == 1:
+            words = faq["question"].split()
+            queries.append((" ".join(rng.sample(words, max(1, len(words) // 2))), label))
+        else:
+            words = faq["answer"].split()
+            start = rng.randrange(max(1, len(words) - 8))
+            queries.append((" ".join(words[start:start + 8]), label))
+    return queries
+
+def quality(retriever, queries):
+    match = sum(retriever.find_best_match(q) is retriever.faq_data[label] for q, label in queries)
+    recall = sum(label in {hit.index for hit in retriever.search(q, k=5)} for q, label in queries)
+    return match / len(queries), recall / len(queries)
+
+def report(name, retriever, queries):
+    match, recall = quality(retriever, queries)
+    texts = [q for q, _ in queries]
+    best = time_per_query(retriever.find_best_match, texts)
+    top = time_per_query(lambda q: retriever.search(q, k=5), texts)
+    print(f"  {name:<22} match@1 {match:6.1%}  recall@5 {recall:6.1%}  find_best_match {best * 1000:7.2f} ms  search(k=5) {top * 1000:7.2f} ms")
+
+def lsa_encoder(faqs, dim, max_docs):
+    start = time.perf_counter()
+    terms, idf, projection = fit_lsa(corpus_texts(faqs, max_docs), dim)
+    encoder = ProjectionEncoder(TermVectorizer(terms, idf, ENGLISH_STOP_WORDS), np.ascontiguousarray(projection, dtype=np.float32))
+    print(f"  LSA model: {len(terms)} terms, {encoder.dim} dims, fitted in {time.perf_counter() - start:.2f}s")
+    return encoder
+
+def bench_corpus(label, faqs, args):
+    print(f"{label}: {len(faqs)} FAQs, {args.queries} queries")
+    queries = labelled_queries(faqs, args.queries)
+    encoder = lsa_encoder(faqs, args.dim, args.max_docs)
+
+    start = time.perf_counter()
+    tfidf = FAQRetriever(faqs)
+    print(f"  TF-IDF index built in {time.perf_counter() - start:.2f}s")
+    start = time.perf_counter()
+    exact = EmbeddingRetriever(faqs, encoder, ann_min_size=len(faqs) + 1)
+    print(f"  embeddings computed in {time.perf_counter() - start:.2f}s "
+          f"({sum(v.nbytes for v in exact.embeddings.values()) / 2**20:.1f} MB float32)")
+
+    report("tfidf", tfidf, queries)
+    report("embedding exact", exact, queries)
+
+    if len(faqs) < args.ann_min_size:
+        return
+    start = time.perf_counter()
+    ivf = IVFIndex(exact.embeddings["question"])
+    print(f"  IVF index ({ivf.n_lists} lists) built in {time.perf_counter() - start:.2f}s")
+    ann = EmbeddingRetriever.__new__(EmbeddingRetriever)
+    ann.__dict__.update(exact.__dict__)
+    ann.embeddings = {}
+    ann.ann = {"question": ivf, "answer": IVFIndex(exact.embeddings["answer"])}
+
+    query_vectors = encoder.encode([q for q, _ in queries])
+    tenth_best = [np.partition(exact.embeddings["question"] @ v, -10)[-10] for v in query_vectors]
+    for nprobe in args.nprobe:
+        ann.nprobe = nprobe
+        found = [ivf.search(v, 10, nprobe)[1] for v in query_vectors]
+        ann_recall = np.mean([np.sum(scores >= kth - 1e-6) / 10 for scores, kth in zip(found, tenth_best)])
+        print(f"  IVF nprobe={nprobe:<3} recall@10 vs. exact {ann_recall:6.1%}")
+        report(f"embedding ivf/{nprobe}", ann, queries)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100_000, help="Number of FAQs in the synthetic corpus.")
+    parser.add_argument("--queries", type=int, default=300, help="Number of labelled queries per corpus.")
+    parser.add_argument("--dim", type=int, default=128, help="LSA dimensions.")
+    parser.add_argument("--max-docs", type=int, default=20_000, help="Fit LSA on a sample of this many FAQs.")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 64], help="IVF lists probed per query.")
+    parser.add_argument("--ann-min-size", type=int, default=20_000, help="Benchmark the IVF index on corpora at least this large.")
+    args = parser.parse_args()
+
+    bench_corpus("Seed FAQs", load_seed_faqs(), args)
+    bench_corpus("Synthetic corpus", synthetic_faqs(args.size), args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Hit rate, precision and latency of the canned-answer fast path on the labelled
+seed queries.
+
+Every query runs through the real /chat pipeline in-process with the mock LLM
+(--latency-ms per call) and the answer cache disabled, first with the fast path
+off and then with canned answers at each confidence threshold. Reports:
+  hit_rate    queries answered from a canned answer
+  precision   canned answers served for the labelled FAQ (wrong or unanswerable otherwise)
+  p50/mean    end-to-end chat_turn latency
+  saved_s     LLM time the fast path skipped, from chat_fast_path_saved_seconds_total
+
+Usage:
+    python3 benchmarks/bench_fast_path.py
+    python3 benchmarks/bench_fast_path.py --thresholds 0.6 0.8 0.9 0.95 --latency-ms 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.7, 0.8, 0.9, 0.95], help="Fast-path confidence thresholds.")
+    parser.add_argument("--latency-ms", type=float, default=200, help="Mock LLM latency.")
+    return parser.parse_args()
+
+args = parse_args()
+
+os.environ["USE_MOCK_GEMINI"] = "true"
+os.environ["MOCK_LLM_LATENCY_MS"] = str(args.latency_ms)
+os.environ["ANSWER_CACHE_SIZE"] = "0"
+os.environ["FAQ_WATCH_INTERVAL_SECONDS"] = "0"
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import app.main as chat_app
+from app.canned import CANNED_FILE, build_canned_answers, faq_key, save_canned_answers
+from app.corpus import CorpusManager
+from app.metrics import FAST_PATH_SAVED_SECONDS
+from baseline import percentile
+
+QUERIES_PATH = os.path.join(os.path.dirname(__file__), "..", "SEED_DATA", "epic_vendor_faq_queries.jsonl")
+
+async def run(labelled):
+    latencies = []
+    hits = correct = 0
+    for row in labelled:
+        start = time.perf_counter()
+        response = await chat_app.chat_turn(row["query"], [])
+        latencies.append(time.perf_counter() - start)
+        if response.canned:
+            hits += 1
+            faq = chat_app.corpus.retriever.find_best_match(row["query"])
+            correct += faq is not None and faq_key(faq) == row["faq_id"]
+    latencies.sort()
+    return {
+        "hit_rate": hits / len(labelled),
+        "precision": correct / hits if hits else 1.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+    }
+
+def main():
+    with open(QUERIES_PATH) as f:
+        labelled = [json.loads(line) for line in f if line.strip()]
+    with open(chat_app.FAQ_FILE_PATH) as f:
+        faq_data = json.load(f)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        canned_path = os.path.join(tmp, CANNED_FILE)
+        entries, _ = asyncio.run(build_canned_answers(faq_data))
+        save_canned_answers(entries, canned_path)
+
+        print(f"{len(labelled)} labelled queries, mock LLM latency {args.latency_ms:.0f} ms")
+        print(f"{'threshold':>10} {'hit_rate':>9} {'precision':>10} {'p50_ms':>8} {'mean_ms':>8} {'saved_s':>8}")
+        result = asyncio.run(run(labelled))
+        print(f"{'off':>10} {result['hit_rate']:>9.1%} {'-':>10} {result['p50_ms']:>8.1f} {result['mean_ms']:>8.1f} {0:>8.1f}")
+
+        chat_app.corpus = CorpusManager(chat_app.FAQ_FILE_PATH, canned_path=canned_path)
+        for threshold in args.thresholds:
+            chat_app.CANNED_ANSWER_THRESHOLD = threshold
+            saved = FAST_PATH_SAVED_SECONDS.value()
+            result = asyncio.run(run(labelled))
+            print(f"{threshold:>10.2f} {result['hit_rate']:>9.1%} {result['precision']:>10.1%} {result['p50_ms']:>8.1f} "
+                  f"{result['mean_ms']:>8.1f} {FAST_PATH_SAVED_SECONDS.value() - saved:>8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Micro-benchmark for follow-up detection: the per-request TF-IDF fit in
+is_follow_up_question vs. the incremental FollowUpDetector.
+
+Each iteration simulates one chat turn: the history is the previous turn's
+history plus new messages, and the input has no pronouns so the similarity
+path is always taken.
+
+Usage:
+    python3 benchmarks/bench_follow_up.py --turns 500
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.utils import FollowUpDetector, is_follow_up_question
+
+FAQ_FILE_PATH = os.path.join(os.path.dirname(__file__), "..", "SEED_DATA", "epic_vendor_faq.json")
+
+def build_turns(faq_data, history_length: int, turns: int):
+    """Returns (user_input, history) pairs for consecutive turns of one conversation."""
+    messages = []
+    for i in range(history_length + turns):
+        faq = faq_data[i % len(faq_data)]
+        messages.append({"role": "user" if i % 2 == 0 else "assistant", "content": faq["question"] if i % 2 == 0 else faq["answer"]})
+
+    return [
+        (f"subscription pricing and sandbox access question {i}", messages[i:i + history_length])
+        for i in range(turns)
+    ]
+
+def time_per_call(fn, turns) -> float:
+    start = time.perf_counter()
+    for user_input, history in turns:
+        fn(user_input, history)
+    return (time.perf_counter() - start) / len(turns)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=500, help="Turns per history length.")
+    args = parser.parse_args()
+
+    with open(FAQ_FILE_PATH) as f:
+        faq_data = json.load(f)
+
+    detector = FollowUpDetector()
+    print(f"{'history':>8} {'refit (us)':>12} {'incremental (us)':>18} {'speedup':>8}")
+    for history_length in [4, 10, 20, 50]:
+        turns = build_turns(faq_data, history_length, args.turns)
+        refit = time_per_call(is_follow_up_question, turns)
+        incremental = time_per_call(detector.is_follow_up, turns)
+        print(f"{history_length:>8} {refit * 1e6:>12.1f} {incremental * 1e6:>18.1f} {refit / incremental:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
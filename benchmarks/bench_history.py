@@ -0,0 +1,118 @@
+"""
+Prompt size and end-to-end latency of follow-up turns in long conversations:
+the history as one repr'd context block (the previous format) vs. the compacted
+user/model turns with a rolling summary.
+
+Each conversation is a stored history of N turns over the seed FAQs, shaped as
+/chat stores it (user, Edited user, Matched FAQ, assistant), followed by a
+follow-up question. End-to-end latency runs the real /chat pipeline in-process
+with a simulated LLM whose latency grows with prompt size:
+    --llm-base-ms + --llm-ms-per-1k-tokens * prompt tokens / 1000
+which models prompt processing time on a hosted model.
+
+Usage:
+    python3 benchmarks/bench_history.py
+    python3 benchmarks/bench_history.py --turns 5 10 20 50 --requests 20 --llm-ms-per-1k-tokens 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, nargs="+", default=[2, 5, 10, 20, 50], help="Conversation lengths (turns).")
+    parser.add_argument("--requests", type=int, default=20, help="Follow-up requests per conversation length.")
+    parser.add_argument("--llm-base-ms", type=float, default=300, help="Simulated LLM latency independent of the prompt.")
+    parser.add_argument("--llm-ms-per-1k-tokens", type=float, default=150, help="Simulated LLM latency per 1000 prompt tokens.")
+    return parser.parse_args()
+
+args = parse_args()
+
+# The real-LLM code path builds the prompt; the LLM itself is simulated below.
+os.environ["USE_MOCK_GEMINI"] = "false"
+os.environ["FAQ_WATCH_INTERVAL_SECONDS"] = "0"
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import app.main as chat_app
+from app.passages import context_text
+from app.response import build_messages, prompt_tokens
+from baseline import percentile
+
+FOLLOW_UP = "How much does it cost?"
+
+def legacy_build_messages(user_input, faq, history=None, passages=None, token_budget=0):
+    """The previous prompt format: the raw history list as one context block."""
+    context_block = f"""
+        FAQ TITLE: {faq.get('question', 'Unknown')}
+        SECTION: {faq.get('section', 'General')}
+        CONTENT: {context_text(faq, passages, user_input, token_budget) or 'No content provided'}
+        SOURCE URL: {faq.get('url', 'N/A')}
+    """
+    messages = []
+    if history:
+        messages.append({"role": "user", "parts": [f"Previous conversation context: {history}"]})
+        messages.append({"role": "model", "parts": ["I have reviewed the history. How can I help with the FAQ?"]})
+    messages.append({"role": "user", "parts": [f"CONTEXT:\n{context_block}\n\nUSER QUESTION: {user_input}"]})
+    return messages
+
+def build_history(faq_data, turns):
+    """A stored conversation of `turns` turns, each answered from one FAQ."""
+    history = []
+    for i in range(turns):
+        faq = faq_data[(i // 2) % len(faq_data)]
+        question = faq["question"] if i % 2 == 0 else "Can you tell me more about it?"
+        history += [
+            {"role": "user", "content": question},
+            {"role": "Edited user", "content": faq["question"]},
+            {"role": "Matched FAQ", "content": f"Found: {faq['question']}"},
+            {"role": "assistant", "content": f"Here is what I found. {faq['answer']}"},
+        ]
+    return history
+
+async def simulated_llm(messages, temperature=0.2):
+    await asyncio.sleep((args.llm_base_ms + args.llm_ms_per_1k_tokens * prompt_tokens(messages) / 1000) / 1000)
+    return "Simulated answer."
+
+async def simulated_rewrite(user_input, history):
+    return user_input
+
+async def end_to_end(history, requests):
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = await chat_app.chat_turn(FOLLOW_UP, list(history))
+        latencies.append(time.perf_counter() - start)
+        assert response.memory_used, "the follow-up was not detected"
+    latencies.sort()
+    return percentile(latencies, 0.50) * 1000
+
+def main():
+    with open(chat_app.FAQ_FILE_PATH) as f:
+        faq_data = json.load(f)
+    faq = faq_data[0]
+
+    chat_app.call_llm_async = simulated_llm
+    chat_app.generate_rewrite_async = simulated_rewrite
+
+    print(f"{'turns':>6} {'before tokens':>14} {'after tokens':>13} {'before build us':>16} {'after build us':>15} "
+          f"{'before p50 ms':>14} {'after p50 ms':>13}")
+    for turns in args.turns:
+        history = build_history(faq_data, turns)
+        row = {}
+        for name, builder in (("before", legacy_build_messages), ("after", build_messages)):
+            start = time.perf_counter()
+            for _ in range(100):
+                messages = builder(FOLLOW_UP, faq, history)
+            row[f"{name}_build"] = (time.perf_counter() - start) / 100 * 1e6
+            row[f"{name}_tokens"] = prompt_tokens(messages)
+            chat_app.build_messages = builder
+            row[f"{name}_p50"] = asyncio.run(end_to_end(history, args.requests))
+        print(f"{turns:>6} {row['before_tokens']:>14} {row['after_tokens']:>13} {row['before_build']:>16.1f} "
+              f"{row['after_build']:>15.1f} {row['before_p50']:>14.1f} {row['after_p50']:>13.1f}")
+    print(f"\nSummary cache: {chat_app.history_compactor.stats()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Cold-start benchmark: fitting TF-IDF at startup vs. memory-mapping a prebuilt index.
+
+Each mode starts N fresh worker processes that load the retriever and answer a few
+queries. Once all workers are ready, their memory is read from /proc/<pid>/smaps_rollup:
+RSS counts shared pages in every process, PSS splits them between the processes
+sharing them, so PSS shows what N workers really cost together.
+
+Usage:
+    python3 benchmarks/bench_index_startup.py --size 100000 --workers 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.corpus import corpus_version
+from app.index import save_index
+from app.retrieval import FAQRetriever
+from synthetic import sample_queries, synthetic_faqs
+
+WORKER = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+mode, faq_file, index_dir = sys.argv[1:4]
+if mode == "fit":
+    from app.retrieval import FAQRetriever
+    with open(faq_file) as f:
+        retriever = FAQRetriever(json.load(f))
+else:
+    from app.index import load_index
+    retriever = load_index(index_dir)
+for query in json.loads(sys.argv[4]):
+    retriever.find_best_match(query)
+print(time.perf_counter() - start, flush=True)
+sys.stdin.read()
+"""
+
+def memory_kb(pid):
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                values[parts[0][:-1]] = int(parts[1])
+    return values
+
+def run_mode(mode, faq_file, index_dir, queries, workers):
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+    code = WORKER.format(root=root)
+    procs = [
+        subprocess.Popen(
+            [sys.executable, "-W", "ignore", "-c", code, mode, faq_file, index_dir, json.dumps(queries)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+        )
+        for _ in range(workers)
+    ]
+    startup = [float(proc.stdout.readline()) for proc in procs]
+    memory = [memory_kb(proc.pid) for proc in procs]
+    for proc in procs:
+        proc.stdin.close()
+        proc.wait()
+
+    return {
+        "startup_seconds": max(startup),
+        "rss_mb": sum(m["Rss"] for m in memory) / 1024,
+        "pss_mb": sum(m["Pss"] for m in memory) / 1024,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100_000, help="Synthetic corpus size.")
+    parser.add_argument("--workers", type=int, default=4, help="Worker processes per mode.")
+    args = parser.parse_args()
+
+    faqs = synthetic_faqs(args.size)
+    queries = sample_queries(faqs, 20)
+    with tempfile.TemporaryDirectory() as tmp:
+        faq_file = os.path.join(tmp, "faq.json")
+        with open(faq_file, 'w') as f:
+            json.dump(faqs, f)
+        with open(faq_file, 'rb') as f:
+            version = corpus_version(f.read())
+
+        start = time.perf_counter()
+        index_dir = os.path.join(tmp, "index")
+        save_index(FAQRetriever(faqs), index_dir, corpus_version=version)
+        print(f"Corpus: {args.size} FAQs, {args.workers} workers (index built in {time.perf_counter() - start:.1f}s)")
+
+        for mode in ("fit", "mmap"):
+            result = run_mode(mode, faq_file, index_dir, queries, args.workers)
+            print(
+                f"  {mode:5s} startup {result['startup_seconds']:6.2f}s   "
+                f"RSS total {result['rss_mb']:8.1f} MB   PSS total {result['pss_mb']:8.1f} MB"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Prompt size and retrieval accuracy with whole FAQs vs. passages.
+
+For each passage size and prompt budget, every labelled query is retrieved (cascade
+ranking) and its answer prompt is built as /chat would build it. Reports the mean
+and p95 estimated prompt tokens, and parent-FAQ accuracy (the matched passage
+belongs to the labelled FAQ, or nothing is matched for unanswerable queries).
+
+Usage:
+    python3 benchmarks/bench_prompt_size.py
+    python3 benchmarks/bench_prompt_size.py --passage-tokens 40 80 --budgets 0 100 200 400
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.passages import sibling_passages, split_passages
+from app.response import build_messages, prompt_tokens
+from app.retrieval import FAQRetriever
+from baseline import percentile
+
+SEED_DIR = os.path.join(os.path.dirname(__file__), "..", "SEED_DATA")
+FAQ_FILE_PATH = os.path.join(SEED_DIR, "epic_vendor_faq.json")
+QUERIES_PATH = os.path.join(SEED_DIR, "epic_vendor_faq_queries.jsonl")
+
+def measure(faqs, labelled, passage_tokens, budget):
+    documents = split_passages(faqs, passage_tokens)
+    retriever = FAQRetriever(documents)
+    sizes = []
+    correct = 0
+    for row in labelled:
+        match = retriever.find_best_match(row["query"])
+        match_id = (match.get("faq_id") or match.get("id")) if match else None
+        correct += match_id == row["faq_id"]
+        if match:
+            passages = sibling_passages(documents, match)
+            sizes.append(prompt_tokens(build_messages(row["query"], match, passages=passages, token_budget=budget)))
+    sizes.sort()
+    return {
+        "documents": len(documents),
+        "accuracy": correct / len(labelled),
+        "mean_tokens": sum(sizes) / max(len(sizes), 1),
+        "p95_tokens": percentile(sizes, 0.95) if sizes else 0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--faq-file", default=FAQ_FILE_PATH, help="FAQ corpus.")
+    parser.add_argument("--queries", default=QUERIES_PATH, help="Labelled queries (JSONL).")
+    parser.add_argument("--passage-tokens", type=int, nargs="+", default=[40, 80, 160], help="Passage sizes to compare.")
+    parser.add_argument("--budgets", type=int, nargs="+", default=[100, 200, 400], help="Prompt context budgets (0: no limit).")
+    args = parser.parse_args()
+
+    with open(args.faq_file) as f:
+        faqs = json.load(f)
+    with open(args.queries) as f:
+        labelled = [json.loads(line) for line in f if line.strip()]
+
+    print(f"{'passages':>9} {'budget':>7} {'documents':>10} {'accuracy':>9} {'mean tokens':>12} {'p95 tokens':>11}")
+    configs = [(0, 0)] + [(size, budget) for size in args.passage_tokens for budget in args.budgets]
+    for passage_tokens, budget in configs:
+        result = measure(faqs, labelled, passage_tokens, budget)
+        print(
+            f"{passage_tokens or 'whole':>9} {budget or '-':>7} {result['documents']:>10} {result['accuracy']:>9.1%} "
+            f"{result['mean_tokens']:>12.0f} {result['p95_tokens']:>11.0f}"
+        )
+
+if __name__ == "__main__":
+    main()
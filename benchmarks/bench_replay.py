@@ -0,0 +1,123 @@
+"""
+Fidelity and cost of LLM record/replay (app/recording.py).
+
+Records the labelled seed queries, each followed by a follow-up that needs an
+LLM rewrite, through the real /chat pipeline in-process. The upstream is a
+simulated Gemini model with seeded log-normal latency (median --median-ms,
+spread --sigma). The recording is then replayed twice with no model at all.
+Reports end-to-end latency percentiles of every run (replays should match the
+recording, and each other) and the calls replayed and missed. Also reports the load time
+and per-lookup cost of a synthetic recording of --records calls.
+
+Usage:
+    python3 benchmarks/bench_replay.py
+    python3 benchmarks/bench_replay.py --median-ms 400 --sigma 0.5 --records 1000000
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# The real-LLM code path, with the model simulated below; no answer cache, so every turn calls the LLM.
+os.environ["USE_MOCK_GEMINI"] = "false"
+os.environ["ANSWER_CACHE_SIZE"] = "0"
+os.environ["FAQ_WATCH_INTERVAL_SECONDS"] = "0"
+
+import app.main as chat_app
+import app.response as response
+from app.recording import LLMRecorder, LLMReplayer, call_key
+from app.rewrite import QueryRewriter
+from baseline import percentile
+
+QUERIES_PATH = os.path.join(os.path.dirname(__file__), "..", "SEED_DATA", "epic_vendor_faq_queries.jsonl")
+FOLLOW_UP = "What does that cost for a small team?"
+
+class SimulatedResponse:
+    def __init__(self, text):
+        self.text = text
+        self.parts = [text]
+
+class SimulatedModel:
+    """Stands in for the Gemini model with seeded log-normal latency."""
+    def __init__(self, median_ms, sigma, seed=0):
+        self.median = median_ms / 1000
+        self.sigma = sigma
+        self.rng = random.Random(seed)
+
+    async def generate_content_async(self, prompt, generation_config=None, stream=False):
+        await asyncio.sleep(self.median * math.exp(self.rng.gauss(0, self.sigma)))
+        return SimulatedResponse(f"Simulated answer {self.rng.randrange(1000)}.")
+
+async def run(labelled):
+    # A fresh rewriter per run, so memoized rewrites don't skip recorded calls.
+    chat_app.query_rewriter = QueryRewriter(chat_app.resilient_rewrite_query)
+    latencies = []
+    for row in labelled:
+        history = []
+        for message in (row["query"], FOLLOW_UP):
+            start = time.perf_counter()
+            history = (await chat_app.chat_turn(message, history)).history
+            latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {name: percentile(latencies, fraction) * 1000 for name, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))}
+
+def lookup_cost(records, tmp):
+    path = os.path.join(tmp, "large.jsonl")
+    with open(path, "w") as f:
+        for i in range(records):
+            prompt = [{"role": "user", "parts": [f"USER QUESTION: synthetic question {i} " + "context " * 100]}]
+            record = {"key": call_key("answer", "m", None, prompt, 0.2), "kind": "answer", "model": "m", "prompt": prompt,
+                      "temperature": 0.2, "latency": 0.5, "response": f"Answer {i}. " * 20}
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+    start = time.perf_counter()
+    replayer = LLMReplayer(path, speed=0)
+    load_seconds = time.perf_counter() - start
+
+    prompts = [[{"role": "user", "parts": [f"USER QUESTION: synthetic question {i} " + "context " * 100]}]
+               for i in random.Random(0).sample(range(records), min(records, 1000))]
+    start = time.perf_counter()
+    for prompt in prompts:
+        replayer.lookup("answer", "m", None, prompt, 0.2)
+    lookup_us = (time.perf_counter() - start) / len(prompts) * 1e6
+    return os.path.getsize(path) / 1e6, load_seconds, lookup_us
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--median-ms", type=float, default=200, help="Median simulated LLM latency.")
+    parser.add_argument("--sigma", type=float, default=0.6, help="Log-normal spread of the simulated latency.")
+    parser.add_argument("--records", type=int, default=100000, help="Size of the synthetic recording for the lookup benchmark.")
+    args = parser.parse_args()
+
+    with open(QUERIES_PATH) as f:
+        labelled = [json.loads(line) for line in f if line.strip()]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "llm.jsonl")
+        model = SimulatedModel(args.median_ms, args.sigma)
+        response.get_model = lambda *_, **__: model
+
+        response.llm_recording = LLMRecorder(path)
+        runs = [("record", asyncio.run(run(labelled)), response.llm_recording.stats())]
+        response.llm_recording.close()
+        for name in ("replay 1", "replay 2"):
+            response.llm_recording = LLMReplayer(path)
+            runs.append((name, asyncio.run(run(labelled)), response.llm_recording.stats()))
+
+        print(f"{len(labelled)} conversations of 2 turns, simulated LLM median {args.median_ms:.0f} ms, sigma {args.sigma}")
+        print(f"{'run':>9} {'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8} {'llm calls':>10} {'misses':>7}")
+        for name, result, stats in runs:
+            calls = stats.get("recorded", stats.get("hits"))
+            print(f"{name:>9} {result['p50']:>8.1f} {result['p95']:>8.1f} {result['p99']:>8.1f} {calls:>10} {stats.get('misses', 0):>7}")
+
+        size_mb, load_seconds, lookup_us = lookup_cost(args.records, tmp)
+        print(f"\nRecording of {args.records} calls ({size_mb:.0f} MB): loaded in {load_seconds:.2f}s, {lookup_us:.1f} us per lookup")
+
+if __name__ == "__main__":
+    main()
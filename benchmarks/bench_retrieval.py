@@ -0,0 +1,62 @@
+"""
+Retrieval benchmark on a synthetic FAQ corpus: the original two-pass
+cosine_similarity cascade vs. FAQRetriever.search / find_best_match.
+
+Usage:
+    python3 benchmarks/bench_retrieval.py --size 100000 --queries 200
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sklearn.metrics.pairwise import cosine_similarity
+
+from app.retrieval import FAQRetriever
+from synthetic import sample_queries, synthetic_faqs
+
+def legacy_find_best_match(retriever: FAQRetriever, query: str):
+    """The original implementation: two transforms and two cosine_similarity calls."""
+    q_similarities = cosine_similarity(retriever.question_vectorizer.transform([query]), retriever.question_matrix).flatten()
+    best_q_index = q_similarities.argmax()
+    if q_similarities[best_q_index] > 0.3:
+        return retriever.faq_data[best_q_index]
+
+    a_similarities = cosine_similarity(retriever.answer_vectorizer.transform([query]), retriever.answer_matrix).flatten()
+    best_a_index = a_similarities.argmax()
+    if a_similarities[best_a_index] > 0.1:
+        return retriever.faq_data[best_a_index]
+    return None
+
+def time_per_query(fn, queries) -> float:
+    start = time.perf_counter()
+    for query in queries:
+        fn(query)
+    return (time.perf_counter() - start) / len(queries)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100_000, help="Number of FAQs in the synthetic corpus.")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries to time.")
+    args = parser.parse_args()
+
+    faqs = synthetic_faqs(args.size)
+    start = time.perf_counter()
+    retriever = FAQRetriever(faqs)
+    print(f"Corpus: {args.size} FAQs, index built in {time.perf_counter() - start:.2f}s")
+
+    queries = sample_queries(faqs, args.queries)
+    mismatches = sum(legacy_find_best_match(retriever, q) is not retriever.find_best_match(q) for q in queries)
+    print(f"find_best_match mismatches vs. legacy: {mismatches}")
+
+    legacy = time_per_query(lambda q: legacy_find_best_match(retriever, q), queries)
+    fused = time_per_query(retriever.find_best_match, queries)
+    top_k = time_per_query(lambda q: retriever.search(q, k=10), queries)
+    print(f"  legacy cascade       {legacy * 1000:8.2f} ms/query")
+    print(f"  find_best_match      {fused * 1000:8.2f} ms/query   ({legacy / fused:.1f}x)")
+    print(f"  search(k=10)         {top_k * 1000:8.2f} ms/query")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Stateless vs. session mode for multi-turn conversations against the mock LLM.
+
+In stateless mode the client posts the full history every turn and gets it back;
+in session mode it sends only the new message and receives only the new turn.
+Reports bytes on the wire per turn and per-turn latency percentiles.
+
+Usage:
+    python3 benchmarks/bench_sessions.py --conversations 200 --turns 20 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=200, help="Conversations per mode.")
+    parser.add_argument("--turns", type=int, default=20, help="Turns per conversation.")
+    parser.add_argument("--concurrency", type=int, default=50, help="Conversations in flight at once.")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Simulated mock LLM latency.")
+    return parser.parse_args()
+
+args = parse_args()
+
+# Configure the app before it is imported.
+os.environ["USE_MOCK_GEMINI"] = "true"
+os.environ["MOCK_LLM_LATENCY_MS"] = str(args.latency_ms)
+os.environ["ANSWER_CACHE_SIZE"] = "0"
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import httpx
+
+from app.main import app
+
+# A topic question followed by follow-ups, so the history keeps growing up to MAX_HISTORY_LENGTH.
+OPENERS = ["What is Vendor Services?", "What is Epic on FHIR?"]
+FOLLOW_UPS = ["Who is it for?", "How much does it cost?", "Tell me more about it.", "How do I sign up for it?"]
+
+def conversation_messages(index: int, turns: int):
+    messages = [OPENERS[index % len(OPENERS)]]
+    messages += [FOLLOW_UPS[i % len(FOLLOW_UPS)] for i in range(turns - 1)]
+    return messages
+
+async def run_mode(session_mode: bool):
+    transport = httpx.ASGITransport(app=app)
+    latencies, sent, received = [], [], []
+    queue = asyncio.Queue()
+    for i in range(args.conversations):
+        queue.put_nowait(conversation_messages(i, args.turns))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            while not queue.empty():
+                messages = queue.get_nowait()
+                history = []
+                session_id = (await client.post("/sessions")).json()["sessionID"] if session_mode else ""
+                for message in messages:
+                    payload = {"message": message, "sessionID": session_id} if session_mode else {"message": message, "history": history}
+                    body = json.dumps(payload).encode()
+
+                    start = time.perf_counter()
+                    response = await client.post("/chat", content=body, headers={"Content-Type": "application/json"})
+                    response.raise_for_status()
+                    latencies.append(time.perf_counter() - start)
+
+                    sent.append(len(body))
+                    received.append(len(response.content))
+                    if not session_mode:
+                        history = response.json()["history"]
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "turns_per_second": len(latencies) / elapsed,
+        "sent_bytes": sum(sent) / len(sent),
+        "received_bytes": sum(received) / len(received),
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+def main():
+    print(f"{args.conversations} conversations x {args.turns} turns, concurrency {args.concurrency}, mock latency {args.latency_ms}ms")
+    for name, session_mode in [("stateless", False), ("session", True)]:
+        result = asyncio.run(run_mode(session_mode))
+        print(
+            f"  {name:<10} sent {result['sent_bytes']:7.0f} B/turn   received {result['received_bytes']:7.0f} B/turn   "
+            f"{result['turns_per_second']:7.1f} turns/s   p50 {result['p50_ms']:6.1f}ms   p99 {result['p99_ms']:6.1f}ms"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Cold-start cost of importing the app (app.main, including the FAQ index) per mode.
+
+Each run imports app.main in a fresh interpreter and reports:
+  import_s     wall time of `import app.main` (median of --runs)
+  rss_mb       resident memory once it is imported
+  sklearn      whether scikit-learn was imported
+  gemini       whether the Gemini SDK was imported
+Modes combine the mock or Gemini LLM (no call is made) with fitting the FAQ
+corpus at startup or loading a prebuilt index (FAQ_INDEX_PATH). The index is
+built into a temporary directory first.
+
+--repo measures another checkout, e.g. a git worktree of an earlier commit.
+
+Usage:
+    python3 benchmarks/bench_startup.py
+    python3 benchmarks/bench_startup.py --runs 10 --repo /tmp/baseline-checkout
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+PROBE = (
+    "import json, sys, time\n"
+    "start = time.perf_counter()\n"
+    "import app.main\n"
+    "elapsed = time.perf_counter() - start\n"
+    "rss_kb = int(next(line for line in open('/proc/self/status') if line.startswith('VmRSS')).split()[1])\n"
+    "print(json.dumps({'import_s': elapsed, 'rss_mb': rss_kb / 1024,\n"
+    "                  'sklearn': 'sklearn' in sys.modules, 'gemini': 'google.generativeai' in sys.modules}))\n"
+)
+
+MODES = [
+    ("mock, fit", {"USE_MOCK_GEMINI": "true"}, False),
+    ("mock, index", {"USE_MOCK_GEMINI": "true"}, True),
+    ("gemini, fit", {"USE_MOCK_GEMINI": "false"}, False),
+    ("gemini, index", {"USE_MOCK_GEMINI": "false"}, True),
+]
+
+def measure(repo, env, runs):
+    results = []
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-W", "ignore", "-c", PROBE], cwd=repo, env=env, capture_output=True, text=True, check=True,
+        )
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    return {
+        "import_s": statistics.median(r["import_s"] for r in results),
+        "rss_mb": statistics.median(r["rss_mb"] for r in results),
+        "sklearn": results[-1]["sklearn"],
+        "gemini": results[-1]["gemini"],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per mode.")
+    parser.add_argument("--repo", default=ROOT, help="Checkout to measure.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as index_path:
+        subprocess.run([sys.executable, "-W", "ignore", "-m", "app.build_index", "--output", index_path],
+                       cwd=args.repo, check=True, capture_output=True)
+        base_env = {**os.environ, "FAQ_WATCH_INTERVAL_SECONDS": "0", "GEMINI_API_KEY": os.getenv("GEMINI_API_KEY", "unused")}
+
+        print(f"{'mode':>14} {'import_s':>9} {'rss_mb':>7} {'sklearn':>8} {'gemini':>7}")
+        for name, env, use_index in MODES:
+            env = {**base_env, **env, "FAQ_INDEX_PATH": index_path if use_index else ""}
+            result = measure(args.repo, env, args.runs)
+            print(f"{name:>14} {result['import_s']:>9.3f} {result['rss_mb']:>7.0f} "
+                  f"{'yes' if result['sklearn'] else 'no':>8} {'yes' if result['gemini'] else 'no':>7}")
+
+if __name__ == "__main__":
+    main()
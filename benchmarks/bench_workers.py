@@ -0,0 +1,168 @@
+"""
+Scaling benchmark for the multi-process launcher (app/serve.py) with the mock LLM.
+
+For each worker count, starts `python -m app.serve` twice: with the app preloaded
+in the parent and shared copy-on-write ("preload"), and imported by every worker
+after the fork ("per-worker"). Reports:
+  ready_s     time until every worker has answered /readyz
+  rss/pss_mb  total memory of the workers (PSS splits shared pages between them)
+  req/s       /chat throughput from --clients load generator processes
+  p50/p99     /chat latency
+
+Throughput only scales with workers up to the number of CPU cores (shown in the header),
+and the load generators compete with the workers for the same cores.
+
+Usage:
+    python3 benchmarks/bench_workers.py
+    python3 benchmarks/bench_workers.py --workers 1 2 4 8 --seconds 10 --concurrency 64 --latency-ms 50
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from baseline import percentile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+QUESTIONS = [
+    "What is Vendor Services?",
+    "How much does it cost to subscribe to Vendor Services?",
+    "Does Vendor Services offer a trial period?",
+    "How do I enroll in Vendor Services?",
+    "asdfghjkl qwerty",
+]
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def child_pids(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(child) for child in f.read().split()]
+
+def memory_kb(pid):
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                values[parts[0][:-1]] = int(parts[1])
+    return values
+
+def wait_ready(url, workers, timeout=120):
+    """Polls /readyz until `workers` distinct worker pids have reported ready."""
+    ready = set()
+    deadline = time.monotonic() + timeout
+    # A new connection per poll, so the polls reach every worker.
+    with httpx.Client(timeout=5, headers={"Connection": "close"}) as client:
+        while len(ready) < workers:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"only {len(ready)} of {workers} workers became ready")
+            try:
+                response = client.get(f"{url}/readyz")
+                if response.status_code == 200:
+                    ready.add(response.json()["pid"])
+                    continue
+            except httpx.TransportError:
+                pass
+            time.sleep(0.05)
+
+async def client_load(url, seconds, concurrency, offset):
+    latencies = []
+    deadline = time.monotonic() + seconds
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        async def loop(n):
+            i = offset + n
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                response = await client.post("/chat", json={"message": QUESTIONS[i % len(QUESTIONS)]})
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+                i += concurrency
+        await asyncio.gather(*(loop(n) for n in range(concurrency)))
+    return latencies
+
+def run_client(job):
+    return asyncio.run(client_load(*job))
+
+def run(workers, preload, args):
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = {
+        **os.environ,
+        "USE_MOCK_GEMINI": "true",
+        "MOCK_LLM_LATENCY_MS": str(args.latency_ms),
+        "FAQ_WATCH_INTERVAL_SECONDS": "0",
+        # Every request is answered by the pipeline, not the answer cache.
+        "ANSWER_CACHE_SIZE": "0",
+    }
+    command = [sys.executable, "-W", "ignore", "-m", "app.serve", "--workers", str(workers), "--port", str(port),
+               "--drain-seconds", "0"]
+    if not preload:
+        command.append("--no-preload")
+
+    start = time.perf_counter()
+    proc = subprocess.Popen(command, cwd=ROOT, env=env, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(url, workers)
+        ready_seconds = time.perf_counter() - start
+
+        per_client = max(args.concurrency // args.clients, 1)
+        jobs = [(url, args.seconds, per_client, n * per_client) for n in range(args.clients)]
+        with multiprocessing.Pool(args.clients) as pool:
+            latencies = sorted(latency for result in pool.map(run_client, jobs) for latency in result)
+
+        memory = [memory_kb(pid) for pid in child_pids(proc.pid)]
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=60)
+
+    return {
+        "ready_s": ready_seconds,
+        "rss_mb": sum(m["Rss"] for m in memory) / 1024,
+        "pss_mb": sum(m["Pss"] for m in memory) / 1024,
+        "rps": len(latencies) / args.seconds,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="Worker counts to compare.")
+    parser.add_argument("--seconds", type=float, default=5, help="Load duration per run.")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent requests in total.")
+    parser.add_argument("--clients", type=int, default=2, help="Load generator processes.")
+    parser.add_argument("--latency-ms", type=float, default=20, help="Mock LLM latency.")
+    parser.add_argument("--output", help="Write results as JSON.")
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPU cores, mock LLM latency {args.latency_ms:.0f} ms, concurrency {args.concurrency}")
+    print(f"{'mode':>11} {'workers':>8} {'ready_s':>8} {'rss_mb':>8} {'pss_mb':>8} {'req/s':>8} {'p50_ms':>8} {'p99_ms':>8}")
+    results = []
+    for workers in args.workers:
+        for preload in (True, False):
+            result = run(workers, preload, args)
+            mode = "preload" if preload else "per-worker"
+            results.append({"mode": mode, "workers": workers, **result})
+            print(f"{mode:>11} {workers:>8} {result['ready_s']:>8.2f} {result['rss_mb']:>8.0f} {result['pss_mb']:>8.0f} "
+                  f"{result['rps']:>8.0f} {result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"cpu_count": os.cpu_count(), "results": results}, f, indent=2)
+        print(f"\nWrote results to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Offline relevance + latency evaluation of the retrieval modes on labelled queries.
+
+Each line of the query file is {"query": ..., "faq_id": ...}, with faq_id null for
+queries the FAQ cannot answer. For every mode it reports:
+  accuracy      find_best_match returns the labelled FAQ (or None for unanswerable queries)
+  hit@1, mrr@5  ranking quality on answerable queries, ignoring thresholds
+  false_accept  unanswerable queries that were matched anyway
+  brier         mean squared error of the top hit's confidence (hybrid modes only)
+  p50/p99       find_best_match latency
+
+Results can be saved as a JSON baseline and compared on a later commit, like
+load_suite.py; the script exits non-zero if relevance or latency regressed.
+--calibrate fits the hybrid confidence model on the top hit of each labelled query
+and writes it as JSON for HYBRID_CALIBRATION_PATH; the results that follow are then
+in-sample, so use a held-out query file to judge the calibrated thresholds.
+
+Usage:
+    python3 benchmarks/eval_retrieval.py
+    python3 benchmarks/eval_retrieval.py --embedding-model embedding_model --output eval.json
+    python3 benchmarks/eval_retrieval.py --compare eval.json
+    python3 benchmarks/eval_retrieval.py --embedding-model embedding_model --calibrate calibration.json \
+        --calibrate-mode hybrid-weighted+semantic
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.hybrid import HybridRetriever, fit_calibration
+from app.retrieval import FAQRetriever
+from baseline import compare, git_commit, percentile
+
+SEED_DIR = os.path.join(os.path.dirname(__file__), "..", "SEED_DATA")
+FAQ_FILE_PATH = os.path.join(SEED_DIR, "epic_vendor_faq.json")
+QUERIES_PATH = os.path.join(SEED_DIR, "epic_vendor_faq_queries.jsonl")
+
+def load_labelled_queries(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def build_modes(faqs, embedding_model_path=""):
+    lexical = FAQRetriever(faqs)
+    modes = {
+        "cascade": lexical,
+        "hybrid-rrf": HybridRetriever(lexical, fusion="rrf"),
+        "hybrid-weighted": HybridRetriever(lexical, fusion="weighted"),
+    }
+    if embedding_model_path:
+        from app.embeddings import EmbeddingRetriever, load_encoder
+        semantic = EmbeddingRetriever(faqs, load_encoder(embedding_model_path))
+        modes["embedding"] = semantic
+        modes["hybrid-rrf+semantic"] = HybridRetriever(lexical, semantic, fusion="rrf")
+        modes["hybrid-weighted+semantic"] = HybridRetriever(lexical, semantic, fusion="weighted")
+    return modes
+
+def ranked_ids(retriever, query, k=5):
+    """Distinct FAQ ids in the order search returns them."""
+    ids = []
+    for hit in retriever.search(query, k=k):
+        if hit.faq.get("id") not in ids:
+            ids.append(hit.faq.get("id"))
+    return ids[:k]
+
+def evaluate(retriever, labelled, repeat):
+    answerable = [row for row in labelled if row["faq_id"]]
+    unanswerable = [row for row in labelled if not row["faq_id"]]
+
+    correct = 0
+    false_accepts = 0
+    for row in labelled:
+        match = retriever.find_best_match(row["query"])
+        match_id = match.get("id") if match else None
+        correct += match_id == row["faq_id"]
+        false_accepts += not row["faq_id"] and match_id is not None
+
+    hits_at_1 = 0
+    reciprocal_ranks = 0.0
+    for row in answerable:
+        ids = ranked_ids(retriever, row["query"])
+        hits_at_1 += bool(ids) and ids[0] == row["faq_id"]
+        if row["faq_id"] in ids:
+            reciprocal_ranks += 1 / (ids.index(row["faq_id"]) + 1)
+
+    result = {
+        "accuracy": correct / len(labelled),
+        "hit@1": hits_at_1 / max(len(answerable), 1),
+        "mrr@5": reciprocal_ranks / max(len(answerable), 1),
+        "false_accept": false_accepts / max(len(unanswerable), 1),
+    }
+
+    if isinstance(retriever, HybridRetriever):
+        errors = []
+        for row in labelled:
+            hits = retriever.search(row["query"], k=1)
+            if hits:
+                errors.append((hits[0].confidence - (hits[0].faq.get("id") == row["faq_id"])) ** 2)
+        result["brier"] = sum(errors) / max(len(errors), 1)
+
+    latencies = []
+    for _ in range(repeat):
+        for row in labelled:
+            start = time.perf_counter()
+            retriever.find_best_match(row["query"])
+            latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    result["p50_ms"] = percentile(latencies, 0.50) * 1000
+    result["p99_ms"] = percentile(latencies, 0.99) * 1000
+    return result
+
+def calibrate(retriever, labelled, k, path):
+    rows, labels = [], []
+    for row in labelled:
+        scores = retriever.signal_scores(row["query"])
+        for hit in retriever.rank(scores, k):
+            rows.append(retriever.features(scores, hit.index))
+            labels.append(int(hit.faq.get("id") == row["faq_id"]))
+    signals = sorted({signal for features in rows for signal in features})
+    calibration = fit_calibration(rows, labels, signals)
+    calibration.save(path)
+    print(f"Wrote calibration fitted on {len(rows)} hits ({sum(labels)} correct) to {path}:")
+    print(f"  intercept {calibration.intercept:.3f}  " + "  ".join(f"{s} {w:.3f}" for s, w in calibration.coef.items()))
+    return calibration
+
+def comparable_metrics(results):
+    """Flattens the results into {name: (value, higher_is_better)}."""
+    metrics = {}
+    for mode, result in results["modes"].items():
+        for key in ("accuracy", "hit@1", "mrr@5"):
+            metrics[f"{mode}.{key}"] = (result[key], True)
+        metrics[f"{mode}.false_accept"] = (result["false_accept"], False)
+        for key in ("p50_ms", "p99_ms"):
+            metrics[f"{mode}.{key}"] = (result[key], False)
+    return metrics
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--faq-file", default=FAQ_FILE_PATH, help="FAQ corpus.")
+    parser.add_argument("--queries", default=QUERIES_PATH, help="Labelled queries (JSONL).")
+    parser.add_argument("--embedding-model", default="", help="Also evaluate the embedding and hybrid+semantic modes.")
+    parser.add_argument("--repeat", type=int, default=20, help="Timing passes over the queries.")
+    parser.add_argument("--output", help="Write results as JSON.")
+    parser.add_argument("--compare", help="Baseline JSON to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="Allowed relative regression when comparing.")
+    parser.add_argument("--min-delta-ms", type=float, default=0.1, help="Ignore latency changes smaller than this.")
+    parser.add_argument("--calibrate", help="Fit the hybrid confidence model and write it here.")
+    parser.add_argument("--calibrate-mode", default="hybrid-weighted", help="Hybrid mode whose hits the calibration is fitted on.")
+    parser.add_argument("--calibrate-k", type=int, default=1, help="Top hits per query used as calibration examples.")
+    args = parser.parse_args()
+
+    with open(args.faq_file) as f:
+        faqs = json.load(f)
+    labelled = load_labelled_queries(args.queries)
+    modes = build_modes(faqs, args.embedding_model)
+
+    if args.calibrate:
+        # Only the calibrated mode uses the new model: other modes have different signals or fusion.
+        retriever = modes[args.calibrate_mode]
+        retriever.calibration = calibrate(retriever, labelled, args.calibrate_k, args.calibrate)
+
+    results = {
+        "format_version": 1,
+        "git_commit": git_commit(),
+        "created_at": time.time(),
+        "config": {"faqs": len(faqs), "queries": len(labelled), "embedding_model": bool(args.embedding_model)},
+        "modes": {},
+    }
+    print(f"{len(labelled)} labelled queries ({sum(1 for row in labelled if row['faq_id'])} answerable), {len(faqs)} FAQs")
+    for name, retriever in modes.items():
+        result = evaluate(retriever, labelled, args.repeat)
+        results["modes"][name] = result
+        brier = f"  brier {result['brier']:.3f}" if "brier" in result else ""
+        print(
+            f"  {name:<26} accuracy {result['accuracy']:6.1%}  hit@1 {result['hit@1']:6.1%}  mrr@5 {result['mrr@5']:.3f}  "
+            f"false_accept {result['false_accept']:6.1%}  p50 {result['p50_ms']:6.2f}ms  p99 {result['p99_ms']:6.2f}ms{brier}"
+        )
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote results to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(baseline, results, comparable_metrics, args.tolerance, args.min_delta_ms):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+Reproducible load test for /chat, run in-process against the mock LLM.
+
+Replays a seeded mix of workloads (new topics, follow-ups, retrieval misses,
+empty input and long histories) against an optionally scaled synthetic corpus,
+with configurable mock LLM latency and jitter. Reports throughput, latency
+percentiles per workload and per pipeline stage (from the request traces), and
+RSS per phase. Results can be saved as a JSON baseline and compared against a
+previous run to catch regressions between commits.
+
+Usage:
+    python3 benchmarks/load_suite.py --output baseline.json
+    python3 benchmarks/load_suite.py --compare baseline.json --tolerance 0.15
+    python3 benchmarks/load_suite.py --corpus-size 100000 --latency-ms 300 --jitter-ms 100 --concurrency 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+WORKLOADS = ("new_topic", "follow_up", "miss", "empty", "long_history")
+DEFAULT_MIX = "new_topic=0.4,follow_up=0.25,miss=0.15,empty=0.05,long_history=0.15"
+FOLLOW_UPS = ["How much does it cost?", "Who is it for?", "Tell me more about it.", "How do I sign up for that?"]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=3000, help="Requests in the measured run.")
+    parser.add_argument("--warmup", type=int, default=200, help="Requests sent before measuring.")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent in-flight requests.")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Mock LLM latency.")
+    parser.add_argument("--jitter-ms", type=float, default=20, help="Mock LLM latency jitter (+/-).")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of mock LLM calls that fail.")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="Fraction of mock LLM calls that hang (exercises timeouts).")
+    parser.add_argument("--corpus-size", type=int, default=12, help="FAQ corpus size (12 = the seed FAQs).")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Workload weights, e.g. new_topic=1,miss=1.")
+    parser.add_argument("--per-workload", action="store_true", help="Also run each workload on its own.")
+    parser.add_argument("--answer-cache", action="store_true", help="Keep the answer cache enabled.")
+    parser.add_argument("--trace-memory", action="store_true", help="Report peak Python allocations per phase (slower).")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the workload and the mock jitter.")
+    parser.add_argument("--output", help="Write the results as JSON here.")
+    parser.add_argument("--compare", help="Baseline JSON to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative regression when comparing.")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="Ignore latency changes smaller than this.")
+    return parser.parse_args()
+
+args = parse_args()
+
+# Configure the app before it is imported.
+os.environ["USE_MOCK_GEMINI"] = "true"
+os.environ["MOCK_LLM_LATENCY_MS"] = str(args.latency_ms)
+os.environ["MOCK_LLM_JITTER_MS"] = str(args.jitter_ms)
+os.environ["MOCK_LLM_SEED"] = str(args.seed)
+os.environ["MOCK_LLM_FAILURE_RATE"] = str(args.failure_rate)
+os.environ["MOCK_LLM_HANG_RATE"] = str(args.hang_rate)
+os.environ["LLM_MAX_CONCURRENCY"] = str(max(args.concurrency, 1))
+os.environ["FAQ_WATCH_INTERVAL_SECONDS"] = "0"
+if not args.answer_cache:
+    os.environ["ANSWER_CACHE_SIZE"] = "0"
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+startup_start = time.perf_counter()
+import httpx
+
+from app import main as app_main
+from app.mock import _mock_answer
+from app.retrieval import FAQRetriever
+from baseline import compare, git_commit, percentile
+from synthetic import synthetic_faqs
+
+def latency_summary(seconds):
+    values = sorted(seconds)
+    return {
+        "count": len(values),
+        "p50_ms": percentile(values, 0.50) * 1000,
+        "p95_ms": percentile(values, 0.95) * 1000,
+        "p99_ms": percentile(values, 0.99) * 1000,
+    }
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(","):
+        name, weight = part.split("=")
+        if name not in WORKLOADS:
+            raise SystemExit(f"Unknown workload {name!r}; expected one of {', '.join(WORKLOADS)}")
+        weights[name] = float(weight)
+    return weights
+
+def faq_turn(faq):
+    """The four history entries a completed turn about `faq` leaves behind in mock mode."""
+    return [
+        {"role": "user", "content": faq["question"]},
+        {"role": "Edited user", "content": "No rewrite needed (mock mode)"},
+        {"role": "Matched FAQ", "content": f"Found: {faq['question']}"},
+        {"role": "assistant", "content": _mock_answer(faq)},
+    ]
+
+def build_request(workload, rng, faqs, index):
+    faq = rng.choice(faqs)
+    history = []
+    if workload == "new_topic":
+        message = faq["question"]
+    elif workload == "follow_up":
+        message = rng.choice(FOLLOW_UPS)
+        history = faq_turn(faq)
+    elif workload == "miss":
+        message = f"asdf qwerty zxcv {index}"
+    elif workload == "empty":
+        message = rng.choice(["", "   "])
+    else:
+        message = rng.choice(FOLLOW_UPS)
+        history = [entry for other in rng.sample(faqs, min(5, len(faqs))) for entry in faq_turn(other)]
+        history = history[-app_main.MAX_HISTORY_LENGTH:]
+    return workload, {"message": message, "history": history, "requestID": f"{workload}-{index}"}
+
+def build_workload(count, weights, seed, faqs):
+    rng = random.Random(seed)
+    names = list(weights)
+    chosen = rng.choices(names, weights=[weights[name] for name in names], k=count)
+    return [build_request(workload, rng, faqs, i) for i, workload in enumerate(chosen)]
+
+async def run_phase(requests, concurrency):
+    traces = {}
+    app_main.tracer.trace_hooks.append(lambda trace: traces.__setitem__(trace.request_id, trace.spans))
+    latencies = {}
+    errors = 0
+    queue = asyncio.Queue()
+    for request in requests:
+        queue.put_nowait(request)
+
+    transport = httpx.ASGITransport(app=app_main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                workload, payload = queue.get_nowait()
+                start = time.perf_counter()
+                response = await client.post("/chat", json=payload)
+                elapsed = time.perf_counter() - start
+                if response.status_code != 200:
+                    errors += 1
+                latencies.setdefault(workload, []).append(elapsed)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    app_main.tracer.trace_hooks.pop()
+
+    stages = {}
+    for spans in traces.values():
+        for stage, seconds in spans:
+            stages.setdefault(stage, []).append(seconds)
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    return {
+        "requests": len(all_latencies),
+        "errors": errors,
+        "rps": len(all_latencies) / elapsed,
+        **latency_summary(all_latencies),
+        "workloads": {name: latency_summary(values) for name, values in sorted(latencies.items())},
+        "stages": {name: latency_summary(values) for name, values in sorted(stages.items())},
+    }
+
+def measure_phase(name, requests, results):
+    if args.trace_memory:
+        tracemalloc.reset_peak()
+    rss_before = rss_mb()
+    result = asyncio.run(run_phase(requests, args.concurrency))
+    result["rss_mb"] = rss_mb()
+    result["rss_delta_mb"] = result["rss_mb"] - rss_before
+    if args.trace_memory:
+        result["python_peak_mb"] = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    results["phases"][name] = result
+    print_phase(name, result)
+    return result
+
+def print_phase(name, result):
+    memory = f"RSS {result['rss_mb']:7.1f} MB ({result['rss_delta_mb']:+.1f})"
+    if "python_peak_mb" in result:
+        memory += f"  py peak {result['python_peak_mb']:.1f} MB"
+    print(
+        f"\n[{name}] {result['requests']} requests, {result['errors']} errors, {result['rps']:.1f} req/s   "
+        f"p50 {result['p50_ms']:.1f}ms  p95 {result['p95_ms']:.1f}ms  p99 {result['p99_ms']:.1f}ms   {memory}"
+    )
+    for group in ("workloads", "stages"):
+        for key, summary in result[group].items():
+            print(
+                f"  {group[:-1]:<8} {key:<16} n={summary['count']:<6} "
+                f"p50 {summary['p50_ms']:8.2f}ms  p95 {summary['p95_ms']:8.2f}ms  p99 {summary['p99_ms']:8.2f}ms"
+            )
+
+def comparable_metrics(results):
+    """Flattens the results into {name: (value, higher_is_better)}."""
+    metrics = {}
+    for phase, result in results["phases"].items():
+        metrics[f"{phase}.rps"] = (result["rps"], True)
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            metrics[f"{phase}.{key}"] = (result[key], False)
+        for group in ("workloads", "stages"):
+            for name, summary in result[group].items():
+                metrics[f"{phase}.{group}.{name}.p95_ms"] = (summary["p95_ms"], False)
+    return metrics
+
+def main():
+    if args.trace_memory:
+        tracemalloc.start()
+
+    results = {
+        "format_version": 1,
+        "git_commit": git_commit(),
+        "created_at": time.time(),
+        "config": {
+            key: getattr(args, key)
+            for key in ("requests", "concurrency", "latency_ms", "jitter_ms", "failure_rate", "hang_rate", "corpus_size", "mix", "answer_cache", "seed")
+        },
+        "phases": {},
+    }
+
+    if args.corpus_size != len(app_main.corpus.faq_data):
+        app_main.corpus.retriever = FAQRetriever(synthetic_faqs(args.corpus_size, seed=args.seed))
+    startup_seconds = time.perf_counter() - startup_start
+    results["startup"] = {"seconds": startup_seconds, "rss_mb": rss_mb()}
+    print(f"Startup (import + {len(app_main.corpus.faq_data)} FAQ corpus): {startup_seconds:.2f}s, RSS {rss_mb():.1f} MB")
+
+    faqs = app_main.corpus.faq_data
+    weights = parse_mix(args.mix)
+    asyncio.run(run_phase(build_workload(args.warmup, weights, args.seed + 1, faqs), args.concurrency))
+
+    measure_phase("mixed", build_workload(args.requests, weights, args.seed, faqs), results)
+    if args.per_workload:
+        for workload in weights:
+            measure_phase(workload, build_workload(args.requests, {workload: 1.0}, args.seed, faqs), results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote results to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(baseline, results, comparable_metrics, args.tolerance, args.min_delta_ms):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
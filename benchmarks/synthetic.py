@@ -0,0 +1,49 @@
+"""
+Synthetic FAQ corpus generator shared by the benchmarks.
+Entries are built from the seed FAQ vocabulary so term statistics stay realistic.
+"""
+import json
+import os
+import random
+from typing import Dict, List
+
+FAQ_FILE_PATH = os.path.join(os.path.dirname(__file__), "..", "SEED_DATA", "epic_vendor_faq.json")
+
+def load_seed_faqs() -> List[Dict]:
+    with open(FAQ_FILE_PATH) as f:
+        return json.load(f)
+
+def synthetic_faqs(size: int, seed: int = 0) -> List[Dict]:
+    """Returns `size` FAQ entries: the seed FAQs followed by generated ones."""
+    seed_faqs = load_seed_faqs()
+    rng = random.Random(seed)
+    question_words = " ".join(faq["question"] for faq in seed_faqs).split()
+    answer_words = " ".join(faq["answer"] for faq in seed_faqs).split()
+    sections = sorted({faq["section"] for faq in seed_faqs})
+
+    faqs = list(seed_faqs[:size])
+    for i in range(len(faqs), size):
+        faqs.append({
+            "id": f"synthetic_{i}",
+            "section": rng.choice(sections),
+            "question": " ".join(rng.choices(question_words, k=rng.randint(4, 12))) + f" topic{i}?",
+            "answer": " ".join(rng.choices(answer_words, k=rng.randint(30, 120))),
+            "url": f"https://example.com/faq/{i}",
+        })
+    return faqs
+
+def sample_queries(faqs: List[Dict], count: int, seed: int = 1) -> List[str]:
+    """Mixes exact questions, partial questions and noise."""
+    rng = random.Random(seed)
+    queries = []
+    for i in range(count):
+        faq = rng.choice(faqs)
+        kind = i % 3
+        if kind == 0:
+            queries.append(faq["question"])
+        elif kind == 1:
+            words = faq["question"].split()
+            queries.append(" ".join(rng.sample(words, max(1, len(words) // 2))))
+        else:
+            queries.append(f"asdf qwerty {i}")
+    return queries
@@ -9,7 +9,7 @@ document.addEventListener('DOMContentLoaded', () => {
     let history = []; // The exact list you send to backend
     let uiMessages = []; // What you render, includes metadata for assistant messages
     const MAX_VISIBLE = 8; // Max messages to show in UI
-    const API_URL = '/chat'; // Backend endpoint
+    const API_URL = '/chat/stream'; // Backend endpoint (Server-Sent Events)
 
     // --- Core Functions ---
 
@@ -124,20 +124,34 @@ document.addEventListener('DOMContentLoaded', () => {
                 throw new Error(`HTTP error! Status: ${response.status}, Body: ${errorText}`);
             }
 
-            const data = await response.json();
-
-            // 5. On success: Replace "Thinking..." with the real response
-            uiMessages.pop(); // Remove "Thinking..."
-            uiMessages.push({
-                role: 'assistant',
-                content: data.answer,
-                memory_used: data.memory_used,
-                sources: data.sources,
-                url: data.url,
+            // 5. Replace "Thinking..." with the streamed response as events arrive
+            const assistantMessage = { role: 'assistant', content: 'Thinking...' };
+            let done = null;
+
+            await readEventStream(response, (event, data) => {
+                if (event === 'meta') {
+                    assistantMessage.memory_used = data.memory_used;
+                    assistantMessage.sources = data.sources;
+                    assistantMessage.url = data.url;
+                    uiMessages[uiMessages.length - 1] = assistantMessage;
+                } else if (event === 'token') {
+                    if (assistantMessage.content === 'Thinking...') {
+                        assistantMessage.content = '';
+                    }
+                    assistantMessage.content += data.text;
+                } else if (event === 'done') {
+                    done = data;
+                    assistantMessage.content = data.answer;
+                }
+                renderMessages();
             });
 
+            if (!done) {
+                throw new Error('Stream ended before the response was complete.');
+            }
+
             // 6. Update backend history
-            history = data.history;
+            history = done.history;
 
         } catch (error) {
             console.error('Error fetching chat response:', error);
@@ -159,6 +173,38 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     };
 
+    /**
+     * Reads a Server-Sent Events response body, calling onEvent(event, data) for each event.
+     * @param {Response} response The fetch response.
+     * @param {function(string, object)} onEvent Callback for each parsed event.
+     */
+    const readEventStream = async (response, onEvent) => {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            // Events are separated by a blank line
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const rawEvent = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let event = 'message';
+                let data = '';
+                rawEvent.split('\n').forEach(line => {
+                    if (line.startsWith('event: ')) event = line.slice(7);
+                    else if (line.startsWith('data: ')) data += line.slice(6);
+                });
+                onEvent(event, JSON.parse(data));
+            }
+        }
+    };
+
     // --- Event Listeners ---
 
     messageForm.addEventListener('submit', (e) => {
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Run the in-process tests against the deterministic mock LLM.
+os.environ.setdefault("USE_MOCK_GEMINI", "true")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
@@ -0,0 +1,103 @@
+"""
+Tests for the bulk evaluation CLI over JSONL request logs.
+"""
+import asyncio
+import json
+import random
+
+import app.main as main
+from app.bulk_eval import LatencySketch, main as bulk_eval, ordered_map, read_items
+from app.corpus import CorpusManager
+
+def write_lines(path, records):
+    with open(path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+def read_results(path):
+    return [json.loads(line) for line in open(path)]
+
+def test_ordered_map_keeps_input_order_with_bounded_concurrency():
+    running = []
+    peak = []
+
+    async def work(n):
+        running.append(n)
+        peak.append(len(running))
+        await asyncio.sleep(random.Random(n).uniform(0, 0.01))
+        running.remove(n)
+        return n * n
+
+    async def collect():
+        return [result async for result in ordered_map(iter(range(50)), work, concurrency=4, window=8)]
+
+    assert asyncio.run(collect()) == [n * n for n in range(50)]
+    assert max(peak) <= 4
+
+def test_read_items_normalizes_requests_and_conversations():
+    lines = [
+        json.dumps({"query": "What is Vendor Services?", "faq_id": "faq_1"}),
+        "",
+        json.dumps({"id": "c1", "messages": ["Hi", {"message": "And the cost?", "faq_id": None}]}),
+    ]
+    items = list(read_items(lines))
+    assert [number for number, _ in items] == [0, 2]
+    assert items[0][1]["id"] == "0" and items[0][1]["turns"] == [("What is Vendor Services?", "faq_1")]
+    assert items[1][1]["turns"][1] == ("And the cost?", None)
+    assert list(read_items(lines, start=1))[0][0] == 2
+
+def test_conversations_thread_history_and_labels_are_scored(tmp_path, capsys):
+    faq = main.corpus.faq_data[0]
+    write_lines(tmp_path / "in.jsonl", [
+        {"id": "q1", "message": faq["question"], "faq_id": faq["id"]},
+        {"id": "q2", "message": "asdfghjkl qwerty", "faq_id": None},
+        {"id": "c1", "messages": [faq["question"], "Can you tell me more about it?"]},
+    ])
+    report = bulk_eval([str(tmp_path / "in.jsonl"), "--output", str(tmp_path / "out.jsonl"), "--concurrency", "2"])
+
+    results = read_results(tmp_path / "out.jsonl")
+    assert [(r["id"], r["turn"]) for r in results] == [("q1", 0), ("q2", 0), ("c1", 0), ("c1", 1)]
+    assert results[0]["correct"] and results[1]["correct"] and "correct" not in results[2]
+    # The follow-up was detected from the history returned by the first turn.
+    assert results[3]["memory_used"] and not results[2]["memory_used"]
+    assert report["requests"] == 3 and report["turns"] == 4 and report["accuracy"] == 1.0
+    assert report["follow_up_rate"] == 0.25 and report["retrieval_hit_rate"] == 0.5
+    assert json.loads(capsys.readouterr().out) == report
+
+def test_labels_resolve_to_parent_faqs_with_passages(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "corpus", CorpusManager(main.FAQ_FILE_PATH, passage_tokens=40))
+    faqs = [faq for faq in main.corpus.faq_data if faq["id"].endswith("#0")][:3]
+    write_lines(tmp_path / "in.jsonl", [{"message": faq["question"], "faq_id": faq["faq_id"]} for faq in faqs])
+    report = bulk_eval([str(tmp_path / "in.jsonl"), "--output", str(tmp_path / "out.jsonl")])
+    assert report["accuracy"] == 1.0
+
+def test_resume_skips_completed_requests_and_drops_partial_ones(tmp_path):
+    questions = [faq["question"] for faq in main.corpus.faq_data[:6]]
+    write_lines(tmp_path / "in.jsonl", [{"id": str(i), "messages": [q, "Tell me more about that"]} for i, q in enumerate(questions)])
+    out = tmp_path / "out.jsonl"
+    bulk_eval([str(tmp_path / "in.jsonl"), "--output", str(out)])
+    complete = read_results(out)
+
+    # Interrupted after 2 conversations, in the middle of the third one's results.
+    lines = out.read_text().splitlines(keepends=True)
+    out.write_text("".join(lines[:5]) + lines[5][:20])
+    report = bulk_eval([str(tmp_path / "in.jsonl"), "--output", str(out)])
+
+    resumed = read_results(out)
+    assert [(r["line"], r["turn"]) for r in resumed] == [(r["line"], r["turn"]) for r in complete]
+    assert report["requests"] == 6 and report["turns"] == 12
+
+    # Nothing left to do.
+    assert bulk_eval([str(tmp_path / "in.jsonl"), "--output", str(out)])["requests"] == 6
+    assert len(read_results(out)) == 12
+
+def test_latency_sketch_percentiles_are_close():
+    rng = random.Random(0)
+    values = sorted(rng.lognormvariate(3, 1) for _ in range(20000))
+    sketch = LatencySketch()
+    for value in values:
+        sketch.add(value)
+    for fraction in (0.5, 0.95, 0.99):
+        exact = values[int(len(values) * fraction)]
+        assert abs(sketch.percentile(fraction) - exact) / exact < 0.02
+    assert len(sketch.counts) < 1000
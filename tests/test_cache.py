@@ -0,0 +1,79 @@
+"""
+Tests for the answer cache backends and the cached /chat path.
+"""
+import time
+
+from fastapi.testclient import TestClient
+
+from app.cache import AnswerCache, MemoryCacheBackend, SQLiteCacheBackend, normalize_query
+from app.main import app, answer_cache
+
+client = TestClient(app)
+
+def test_normalize_query():
+    assert normalize_query("  What is Vendor-Services?? ") == "what is vendor services"
+
+def test_memory_backend_lru_eviction():
+    backend = MemoryCacheBackend(max_size=2, ttl_seconds=60)
+    backend.set("a", 1)
+    backend.set("b", 2)
+    assert backend.get("a") == 1  # "a" is now most recently used
+    backend.set("c", 3)
+    assert backend.get("b") is None
+    assert backend.get("a") == 1
+    assert backend.get("c") == 3
+    assert backend.evictions == 1
+
+def test_memory_backend_ttl():
+    backend = MemoryCacheBackend(max_size=2, ttl_seconds=0.01)
+    backend.set("a", 1)
+    time.sleep(0.02)
+    assert backend.get("a") is None
+    assert backend.expirations == 1
+
+def test_sqlite_backend_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    writer = SQLiteCacheBackend(path, max_size=2, ttl_seconds=60)
+    reader = SQLiteCacheBackend(path, max_size=2, ttl_seconds=60)
+
+    writer.set("a", {"answer": "x"})
+    assert reader.get("a") == {"answer": "x"}
+
+    writer.set("b", 2)
+    writer.set("c", 3)
+    assert len(reader) == 2
+    assert writer.evictions == 1
+
+def test_answer_cache_counters():
+    cache = AnswerCache(MemoryCacheBackend(max_size=4, ttl_seconds=60))
+    assert cache.get("faq_1", "What is Vendor Services?") is None
+    cache.set("faq_1", "What is Vendor Services?", "answer")
+    assert cache.get("faq_1", "what is vendor services") == "answer"
+    assert cache.get("faq_2", "what is vendor services") is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 2, 1)
+
+def test_cached_response_matches_uncached():
+    answer_cache.backend.clear()
+    payload = {"message": "How much does it cost to subscribe to Vendor Services?", "history": []}
+
+    first = client.post("/chat", json=payload)
+    second = client.post("/chat", json=payload)
+
+    assert "cached" not in first.json()
+    assert second.json().pop("cached") is True
+    body = second.json()
+    body.pop("cached")
+    assert body == first.json()
+
+def test_follow_ups_are_not_cached():
+    answer_cache.backend.clear()
+    first = client.post("/chat", json={"message": "What is Vendor Services?", "history": []}).json()
+    payload = {"message": "Who is it for?", "history": first["history"]}
+
+    client.post("/chat", json=payload)
+    second = client.post("/chat", json=payload).json()
+
+    assert "cached" not in second
+    assert len(answer_cache.backend) == 1
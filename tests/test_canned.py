@@ -0,0 +1,147 @@
+"""
+Tests for the canned-answer fast path.
+"""
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.build_canned import main as build_canned
+from app.build_index import main as build_index
+from app.canned import (
+    CANNED_FILE, CannedAnswers, build_canned_answers, content_hash, faq_key, read_canned_answers, save_canned_answers,
+)
+from app.corpus import CorpusManager
+from app.metrics import FAST_PATH, STAGE_SECONDS, Histogram
+from app.mock import template_answer
+
+client = TestClient(main.app)
+
+@pytest.fixture
+def canned_corpus(tmp_path, monkeypatch):
+    faqs = json.load(open(main.FAQ_FILE_PATH))
+    entries, _ = asyncio.run(build_canned_answers(faqs))
+    for entry in entries.values():
+        entry["answer"] = "CANNED: " + entry["answer"]
+    path = tmp_path / CANNED_FILE
+    save_canned_answers(entries, str(path))
+    manager = CorpusManager(main.FAQ_FILE_PATH, canned_path=str(path))
+    monkeypatch.setattr(main, "corpus", manager)
+    return manager
+
+def test_build_keeps_unchanged_entries_and_regenerates_the_rest():
+    faqs = [{"id": "a", "question": "Q1?", "answer": "A1."}, {"id": "b", "question": "Q2?", "answer": "A2."}]
+    entries, counts = asyncio.run(build_canned_answers(faqs))
+    assert counts == {"kept": 0, "generated": 0, "templated": 2, "failed": 0}
+    assert entries["a"]["answer"] == template_answer(faqs[0])
+
+    faqs[1] = {**faqs[1], "answer": "A2, edited."}
+    async def generate(faq):
+        if faq["id"] == "c":
+            raise RuntimeError("quota")
+        return f"polished {faq['id']}"
+    faqs.append({"id": "c", "question": "Q3?", "answer": "A3."})
+    entries, counts = asyncio.run(build_canned_answers(faqs, entries, generate, "llm:test"))
+    # Templated entries are regenerated once an LLM source is asked for.
+    assert counts == {"kept": 0, "generated": 2, "templated": 1, "failed": 1}
+    assert entries["b"] == {"question": "Q2?", "content_hash": content_hash(faqs[1]), "answer": "polished b", "source": "llm:test"}
+    assert entries["c"]["source"] == "template"
+
+    entries, counts = asyncio.run(build_canned_answers(faqs[:2], entries, generate, "llm:test"))
+    assert counts["kept"] == 2 and set(entries) == {"a", "b"}
+
+def test_load_ignores_entries_built_from_an_older_faq(tmp_path):
+    faqs = [{"id": "a", "question": "Q1?", "answer": "A1."}, {"id": "b", "question": "Q2?", "answer": "A2."}]
+    entries, _ = asyncio.run(build_canned_answers(faqs))
+    save_canned_answers(entries, str(tmp_path / CANNED_FILE))
+
+    faqs[0] = {**faqs[0], "answer": "A1, edited."}
+    canned = CannedAnswers.load(str(tmp_path / CANNED_FILE), faqs)
+    assert len(canned) == 1 and canned.get(faqs[0]) is None and canned.get(faqs[1]) == entries["b"]["answer"]
+    # Passages are looked up by their parent FAQ.
+    assert faq_key({"faq_id": "b", "id": "b#1"}) == "b"
+
+def test_exact_question_is_served_without_the_llm(canned_corpus):
+    hits = FAST_PATH.value("hit")
+    response = client.post("/chat", json={"message": "What is Vendor Services?"}).json()
+    assert response["canned"] is True and response["answer"].startswith("CANNED: ")
+    assert response["sources"] == ["What is Vendor Services?"]
+    assert FAST_PATH.value("hit") == hits + 1
+    assert main.corpus.stats()["canned_answers"] == len(main.corpus.faq_data)
+
+    events = client.post("/chat/stream", json={"message": "What is Vendor Services?"}).text
+    assert "CANNED: " in events and '"canned": true' in events
+
+def test_loose_match_and_follow_up_go_to_the_llm(canned_corpus):
+    low = FAST_PATH.value("low_confidence")
+    response = client.post("/chat", json={"message": "vendor services cost trial enroll"}).json()
+    assert not response.get("canned") and FAST_PATH.value("low_confidence") == low + 1
+
+    history = client.post("/chat", json={"message": "What is Vendor Services?"}).json()["history"]
+    follow_up = client.post("/chat", json={"message": "Tell me more about that", "history": history}).json()
+    assert follow_up["memory_used"] and not follow_up.get("canned")
+
+def test_fast_path_is_off_without_a_canned_file():
+    spans = STAGE_SECONDS.count("fast_path")
+    response = client.post("/chat", json={"message": "What is Vendor Services?"}).json()
+    assert "canned" not in response
+    assert STAGE_SECONDS.count("fast_path") == spans
+
+def test_saved_time_falls_back_to_streams_then_the_configured_estimate(monkeypatch):
+    stages = Histogram("stages", "", ["stage"])
+    monkeypatch.setattr(main, "STAGE_SECONDS", stages)
+    monkeypatch.setattr(main, "CANNED_ANSWER_LLM_SECONDS", 1.5)
+    assert main.llm_seconds_estimate() == 1.5
+    stages.observe(0.4, "llm_stream")
+    assert main.llm_seconds_estimate() == 0.4
+    stages.observe(0.2, "llm")
+    assert main.llm_seconds_estimate() == 0.2
+
+def test_reload_never_serves_the_answer_of_an_edited_faq(tmp_path, monkeypatch):
+    faqs = json.load(open(main.FAQ_FILE_PATH))
+    corpus_path = tmp_path / "faq.json"
+    corpus_path.write_text(json.dumps(faqs))
+    entries, _ = asyncio.run(build_canned_answers(faqs))
+    for entry in entries.values():
+        entry["answer"] = "OLD CANNED: " + entry["answer"]
+    save_canned_answers(entries, str(tmp_path / CANNED_FILE))
+    manager = CorpusManager(str(corpus_path), canned_path=str(tmp_path / CANNED_FILE))
+    monkeypatch.setattr(main, "corpus", manager)
+    old_retriever = manager.retriever
+
+    edited = next(faq for faq in faqs if faq["question"] == "What is Vendor Services?")
+    edited["answer"] = "Vendor Services, edited."
+    corpus_path.write_text(json.dumps(faqs))
+
+    # Slow down building the canned answers, so requests run while the reload is in progress.
+    load = CannedAnswers.load
+    def slow_load(*args):
+        time.sleep(0.2)
+        return load(*args)
+    monkeypatch.setattr(CannedAnswers, "load", slow_load)
+    reload = threading.Thread(target=manager.load)
+    reload.start()
+    served_with_new_corpus = 0
+    while reload.is_alive() or not served_with_new_corpus:
+        new_corpus_live = manager.retriever is not old_retriever
+        answer = client.post("/chat", json={"message": "What is Vendor Services?"}).json()["answer"]
+        if new_corpus_live:
+            assert "OLD CANNED" not in answer
+            served_with_new_corpus += 1
+    reload.join()
+    assert manager.canned.get(edited) is None
+
+def test_build_index_writes_canned_answers_and_build_canned_keeps_them(tmp_path):
+    build_index(["--output", str(tmp_path)])
+    entries = read_canned_answers(str(tmp_path / CANNED_FILE))
+    assert len(entries) == len(main.corpus.faq_data)
+    assert all(entry["source"] == "template" for entry in entries.values())
+
+    created_at = json.load(open(tmp_path / CANNED_FILE))["created_at"]
+    build_canned(["--output", str(tmp_path / CANNED_FILE)])
+    assert read_canned_answers(str(tmp_path / CANNED_FILE)) == entries
+    assert json.load(open(tmp_path / CANNED_FILE))["created_at"] >= created_at
@@ -0,0 +1,77 @@
+"""
+In-process tests for the /chat pipeline using FastAPI's TestClient and the mock LLM.
+These mirror the scenarios in test_client.py without needing a running server.
+"""
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import app.response as response
+from app.main import app
+
+client = TestClient(app)
+
+def send_chat_message(message: str, history: list = None):
+    payload = {"message": message, "history": history or [], "requestID": "test"}
+    response = client.post("/chat", json=payload)
+    assert response.status_code == 200
+    return response.json()
+
+def test_direct_faq_hit():
+    resp = send_chat_message("What is Vendor Services?")
+    assert resp["memory_used"] is False
+    assert resp["sources"] == ["What is Vendor Services?"]
+    assert resp["url"] != ""
+    assert [msg["role"] for msg in resp["history"]] == ["user", "Edited user", "Matched FAQ", "assistant"]
+
+def test_follow_up_uses_memory():
+    resp1 = send_chat_message("What is Vendor Services?")
+    resp2 = send_chat_message("Who is it for?", history=resp1["history"])
+    assert resp2["memory_used"] is True
+    assert "I'm sorry" not in resp2["answer"]
+
+def test_new_topic_resets_history():
+    resp1 = send_chat_message("What is Vendor Services?")
+    resp2 = send_chat_message("Who is it for?", history=resp1["history"])
+    resp3 = send_chat_message("Tell me about FHIR", history=resp2["history"])
+    assert resp3["memory_used"] is False
+    assert len(resp3["history"]) < len(resp2["history"])
+
+def test_follow_up_without_match():
+    resp1 = send_chat_message("Tell me about FHIR")
+    resp2 = send_chat_message("Tell me more about that.", history=resp1["history"])
+    assert resp2["memory_used"] is True
+    assert resp2["sources"] == []
+    assert resp2["url"] == ""
+    assert "follow-up" in resp2["answer"]
+
+def test_no_match():
+    resp = send_chat_message("asdfghjkl qwerty")
+    assert resp["sources"] == []
+    assert resp["url"] == ""
+    assert "I apologize" in resp["answer"]
+
+def test_empty_input():
+    resp = send_chat_message(" ")
+    assert "sent an empty message" in resp["answer"]
+    assert resp["sources"] == []
+    assert resp["memory_used"] is False
+
+def test_login_routes_to_support():
+    resp = send_chat_message("I'm having trouble logging into the Vendor Services website. What do I do?")
+    assert len(resp["sources"]) > 0
+    assert "contact a Vendor Services TS or use the \"Contact\" form" in resp["answer"]
+
+def test_llm_limiter_is_per_event_loop(monkeypatch):
+    monkeypatch.setattr(response, "LLM_MAX_CONCURRENCY", 1)
+
+    async def contend():
+        async def hold():
+            async with response.llm_limiter():
+                await asyncio.sleep(0.01)
+        # A second caller has to wait, which binds the semaphore to this loop.
+        await asyncio.gather(hold(), hold())
+        return response.llm_limiter().semaphore
+
+    first, second = asyncio.run(contend()), asyncio.run(contend())
+    assert first is not second
@@ -0,0 +1,80 @@
+"""
+Tests for the /chat/stream Server-Sent Events endpoint using the chunked mock LLM.
+"""
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import mock as mock_llm
+from app.main import app, answer_cache, chat_events
+from app.models import ChatRequest
+
+client = TestClient(app)
+
+@pytest.fixture(autouse=True)
+def empty_answer_cache():
+    # Cache hits are streamed as a single token, so start every test with a cold cache.
+    answer_cache.backend.clear()
+
+def parse_events(body: str):
+    events = []
+    for raw_event in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in raw_event.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+def stream_chat_message(message: str, history: list = None):
+    payload = {"message": message, "history": history or [], "requestID": "test"}
+    response = client.post("/chat/stream", json=payload)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    return parse_events(response.text)
+
+def test_stream_event_order_and_metadata():
+    events = stream_chat_message("What is Vendor Services?")
+    names = [name for name, _ in events]
+    assert names[0] == "meta"
+    assert names[-1] == "done"
+    assert set(names[1:-1]) == {"token"}
+    assert len(names) > 3
+
+    meta = events[0][1]
+    assert meta["sources"] == ["What is Vendor Services?"]
+    assert meta["url"] != ""
+    assert meta["memory_used"] is False
+
+def test_stream_matches_non_streaming_response():
+    events = stream_chat_message("What is Vendor Services?")
+    tokens = "".join(data["text"] for name, data in events if name == "token")
+    done = events[-1][1]
+
+    expected = client.post("/chat", json={"message": "What is Vendor Services?", "history": []}).json()
+    assert tokens == expected["answer"]
+    # Either response may have been served from the answer cache.
+    done.pop("cached", None)
+    expected.pop("cached", None)
+    assert done == expected
+
+def test_stream_empty_input():
+    events = stream_chat_message(" ")
+    assert [name for name, _ in events] == ["meta", "token", "done"]
+    assert "sent an empty message" in events[-1][1]["answer"]
+
+def test_time_to_first_byte_precedes_generation(monkeypatch):
+    monkeypatch.setattr(mock_llm, "MOCK_LLM_LATENCY_MS", 200)
+
+    async def measure():
+        start = time.perf_counter()
+        first_event_at = None
+        async for _ in chat_events(ChatRequest(message="What is Vendor Services?")):
+            if first_event_at is None:
+                first_event_at = time.perf_counter() - start
+        return first_event_at, time.perf_counter() - start
+
+    time_to_first_byte, total = asyncio.run(measure())
+    # Retrieval metadata is sent before the LLM starts generating.
+    assert time_to_first_byte < 0.1
+    assert total >= 0.2
@@ -0,0 +1,91 @@
+"""
+Tests for hot-reloading the FAQ corpus.
+"""
+import asyncio
+import json
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.corpus import CorpusManager
+from app.retrieval import FAQRetriever
+
+client = TestClient(main.app)
+
+@pytest.fixture
+def corpus_file(tmp_path):
+    path = tmp_path / "faq.json"
+    path.write_text(json.dumps(main.corpus.faq_data))
+    return path
+
+def write_corpus(path, faq_data):
+    path.write_text(json.dumps(faq_data))
+    # Make sure the watcher sees a new modification time.
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 1))
+
+def test_reload_swaps_in_new_retriever(corpus_file):
+    manager = CorpusManager(str(corpus_file))
+    original = manager.retriever
+    version = manager.version
+
+    assert asyncio.run(manager.reload()) is False  # unchanged file is a no-op
+    assert manager.retriever is original
+
+    faq_data = json.loads(corpus_file.read_text())
+    faq_data.append({"id": "faq_new", "section": "General", "question": "Where is the sandbox status page?", "answer": "See the status page.", "url": "https://example.com"})
+    write_corpus(corpus_file, faq_data)
+
+    assert manager.file_changed()
+    assert asyncio.run(manager.reload()) is True
+    assert manager.retriever is not original
+    assert manager.version != version
+    assert manager.stats()["reload_count"] == 1
+    assert manager.retriever.find_best_match("Where is the sandbox status page?")["id"] == "faq_new"
+    # The old retriever is untouched, so requests already holding it keep working.
+    assert len(original.faq_data) == len(faq_data) - 1
+
+def test_invalid_corpus_keeps_current_retriever(corpus_file):
+    manager = CorpusManager(str(corpus_file))
+    original = manager.retriever
+    corpus_file.write_text("{not json")
+
+    with pytest.raises(ValueError):
+        asyncio.run(manager.reload())
+    assert manager.retriever is original
+    assert manager.stats()["last_error"]
+
+def test_incremental_rebuild_matches_fresh_fit():
+    faq_data = main.corpus.faq_data
+    edited = [dict(faq) for faq in faq_data]
+    edited[3]["answer"] = "Epic on FHIR is a free resource for developers using FHIR APIs."
+
+    incremental = FAQRetriever(edited, analyzed_cache=FAQRetriever(faq_data).analyzed_cache)
+    fresh = FAQRetriever(edited)
+
+    assert (incremental.answer_matrix != fresh.answer_matrix).nnz == 0
+    assert (incremental.question_matrix != fresh.question_matrix).nnz == 0
+    assert incremental.answer_vectorizer.vocabulary_ == fresh.answer_vectorizer.vocabulary_
+
+def test_admin_reload_endpoint(corpus_file, monkeypatch):
+    manager = CorpusManager(str(corpus_file))
+    monkeypatch.setattr(main, "corpus", manager)
+
+    faq_data = json.loads(corpus_file.read_text())
+    faq_data[0]["question"] = "What exactly is the Vendor Services program?"
+    write_corpus(corpus_file, faq_data)
+
+    response = client.post("/admin/reload").json()
+    assert response["reloaded"] is True
+    assert response["version"] == manager.version
+    assert response["last_reload_seconds"] > 0
+
+    chat = client.post("/chat", json={"message": "What exactly is the Vendor Services program?"}).json()
+    assert chat["sources"] == ["What exactly is the Vendor Services program?"]
+
+def test_admin_token(monkeypatch):
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "secret")
+    assert client.get("/admin/corpus").status_code == 403
+    assert client.get("/admin/corpus", headers={"X-Admin-Token": "secret"}).json()["faq_count"] == 12
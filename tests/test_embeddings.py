@@ -0,0 +1,99 @@
+"""
+Tests for the dense-embedding retriever backend and its IVF index.
+"""
+import json
+
+import numpy as np
+import pytest
+
+import app.main as main
+from app.build_embedding_model import main as build_embedding_model
+from app.corpus import CorpusManager
+from app.embeddings import EmbeddingRetriever, IVFIndex, load_encoder, normalize_rows
+
+QUERIES = [
+    "What is Vendor Services?",
+    "how much does it cost",
+    "FHIR APIs for developers",
+    "I can't log in",
+    "completely unrelated text about bananas",
+]
+
+@pytest.fixture(scope="module")
+def model_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("embedding_model"))
+    build_embedding_model(["--output", path, "--dim", "16"])
+    return path
+
+@pytest.fixture
+def retriever(model_path):
+    return EmbeddingRetriever(main.corpus.faq_data, load_encoder(model_path))
+
+def test_embeddings_are_contiguous_unit_float32(retriever):
+    for vectors in retriever.embeddings.values():
+        assert vectors.dtype == np.float32 and vectors.flags.c_contiguous
+        assert np.allclose(np.linalg.norm(vectors, axis=1), 1, atol=1e-5)
+
+    # A query with no known words encodes to a zero vector and matches nothing.
+    assert not retriever.encoder.encode(["qwertyuiop"]).any()
+    assert retriever.find_best_match("qwertyuiop") is None
+
+def test_finds_faqs_by_question(retriever):
+    for faq in main.corpus.faq_data:
+        assert retriever.find_best_match(faq["question"]) is faq
+        hit = retriever.search(faq["question"], k=3)[0]
+        assert hit.field == "question" and hit.faq is faq
+
+def test_batched_matches_equal_single_queries(retriever):
+    queries = QUERIES + [faq["question"] for faq in main.corpus.faq_data]
+    assert retriever.find_best_matches(queries) == [retriever.find_best_match(q) for q in queries]
+
+def test_ivf_index_matches_exact_search_when_probing_every_list():
+    rng = np.random.default_rng(0)
+    vectors = normalize_rows(rng.standard_normal((2000, 16)))
+    index = IVFIndex(vectors, n_lists=20)
+    assert np.array_equal(index.vectors[np.argsort(index.ids)], vectors)
+
+    for query in normalize_rows(rng.standard_normal((10, 16))):
+        exact = np.argsort(-(vectors @ query), kind="stable")[:10]
+        ids, scores = index.search(query, k=10, nprobe=20)
+        assert list(ids) == list(exact)
+        assert np.allclose(scores, (vectors @ query)[exact])
+        # Probing fewer lists scans fewer vectors but still returns the best ones found.
+        ids, scores = index.search(query, k=10, nprobe=4)
+        assert len(ids) == 10 and np.all(np.diff(scores) <= 0)
+
+def test_ann_search_used_above_min_size(model_path):
+    faqs = main.corpus.faq_data
+    retriever = EmbeddingRetriever(faqs, load_encoder(model_path), ann_min_size=1, nprobe=100, ann_lists=4)
+    assert set(retriever.ann) == {"question", "answer"} and not retriever.embeddings
+
+    for query in QUERIES:
+        assert [(h.index, h.field) for h in retriever.search(query)] == [(h.index, h.field) for h in retriever.search(query, exact=True)]
+
+def test_word_vector_model(tmp_path):
+    faqs = [
+        {"id": "1", "question": "How do I reset my password?", "answer": "Use the account page."},
+        {"id": "2", "question": "How much does a subscription cost?", "answer": "See the pricing page."},
+    ]
+    faq_file = tmp_path / "faqs.json"
+    faq_file.write_text(json.dumps(faqs))
+    # "passphrase" and "price" never occur in the corpus but are close to words that do.
+    (tmp_path / "vectors.txt").write_text("6 3\n" + "\n".join([
+        "password 1 0 0", "passphrase 0.9 0.1 0", "reset 0.8 0 0.2",
+        "cost 0 1 0", "price 0.1 0.9 0", "subscription 0 0.8 0.2",
+    ]))
+
+    output = str(tmp_path / "model")
+    build_embedding_model(["--faq-file", str(faq_file), "--output", output, "--word-vectors", str(tmp_path / "vectors.txt")])
+    retriever = EmbeddingRetriever(faqs, load_encoder(output))
+    assert retriever.find_best_match("forgot passphrase")["id"] == "1"
+    assert retriever.find_best_match("price")["id"] == "2"
+
+def test_corpus_manager_embedding_backend(model_path):
+    manager = CorpusManager(main.FAQ_FILE_PATH, backend="embedding", embedding_model_path=model_path)
+    assert isinstance(manager.retriever, EmbeddingRetriever)
+    assert manager.stats()["backend"] == "embedding" and manager.stats()["source"] == "embedding"
+
+    with pytest.raises(ValueError):
+        CorpusManager(main.FAQ_FILE_PATH, backend="bm25")
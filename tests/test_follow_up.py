@@ -0,0 +1,56 @@
+"""
+Equivalence tests: FollowUpDetector must make the same decisions as the
+original per-request TF-IDF is_follow_up_question.
+"""
+import json
+import os
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+from app.main import app, corpus
+from app.utils import FollowUpDetector, is_follow_up_question
+
+CONVERSATIONS_PATH = os.path.join(os.path.dirname(__file__), "data", "conversations.json")
+
+client = TestClient(app)
+faq_data = corpus.faq_data
+detector = FollowUpDetector()
+
+with open(CONVERSATIONS_PATH) as f:
+    CONVERSATIONS = json.load(f)
+
+@pytest.mark.parametrize("conversation", CONVERSATIONS)
+def test_recorded_conversations_match_reference(conversation):
+    history = []
+    for message in conversation:
+        assert detector.is_follow_up(message, history) == is_follow_up_question(message, history), message
+        history = client.post("/chat", json={"message": message, "history": history}).json()["history"]
+
+def test_similarity_matches_sklearn():
+    words = " ".join(faq["question"] + " " + faq["answer"] for faq in faq_data).split()
+    rng = random.Random(0)
+
+    for _ in range(200):
+        history = [{"role": "user", "content": " ".join(rng.choices(words, k=rng.randint(1, 40)))} for _ in range(rng.randint(1, 6))]
+        user_input = " ".join(rng.choices(words, k=rng.randint(1, 10)))
+
+        history_text = " ".join(msg["content"] for msg in history)
+        try:
+            matrix = TfidfVectorizer(stop_words='english').fit_transform([history_text, user_input])
+        except ValueError:
+            continue
+        expected = cosine_similarity(matrix[0:1], matrix[1:2])[0][0]
+
+        assert detector.similarity(user_input, detector.history_vector(history)) == pytest.approx(expected)
+
+def test_edge_cases():
+    history = [{"role": "user", "content": "What is Vendor Services?"}]
+    assert detector.is_follow_up("anything", []) is False
+    assert detector.is_follow_up("Who is it for?", history) is True
+    # Only stop words in the input: no shared terms, so neither counts it as a follow-up.
+    assert detector.is_follow_up("and or but", history) is False
+    assert not is_follow_up_question("and or but", history)
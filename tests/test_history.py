@@ -0,0 +1,128 @@
+"""
+Tests for compacting the chat history into prompt turns.
+"""
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.history import FAQ_REFERENCE, SUMMARY_HEADER, HistoryCompactor, history_turns
+from app.metrics import PROMPT_TOKENS
+from app.passages import estimate_tokens
+from app.response import build_messages, prompt_tokens
+
+client = TestClient(main.app)
+
+FAQ = {"question": "What is Vendor Services?", "answer": "Vendor Services is a support program offered by Epic.", "url": "https://example.com"}
+
+def stored_turn(user, faq_question, reply):
+    return [
+        {"role": "user", "content": user},
+        {"role": "Edited user", "content": "No rewrite needed"},
+        {"role": "Matched FAQ", "content": f"Found: {faq_question}" if faq_question else "No relevant FAQ found."},
+        {"role": "assistant", "content": reply},
+    ]
+
+def conversation(turns):
+    history = []
+    for i in range(turns):
+        history += stored_turn(f"Question {i} about sandbox access and pricing?", f"FAQ {i // 2}?", f"Answer {i}. " + "Details " * 40)
+    return history
+
+def test_history_becomes_alternating_turns_without_bookkeeping():
+    history = stored_turn("What is Vendor Services?", FAQ["question"], f"Sure! {FAQ['answer']}")
+    history += stored_turn("Who is it for?", FAQ["question"], "Developers integrating with Epic.")
+    history += [{"role": "user", "content": "How do I join?"}, {"role": "Edited user", "content": "How do I join Vendor Services?"}]
+
+    messages = HistoryCompactor().compact(history, FAQ, "How do I join?")
+    assert [m["role"] for m in messages] == ["user", "model", "user", "model"]
+    text = "\n".join(part for m in messages for part in m["parts"])
+    assert "Edited user" not in text and "Found:" not in text and "How do I join?" not in text
+    # The FAQ answer already in the prompt is referenced, not repeated.
+    assert messages[1]["parts"] == [f"Sure! {FAQ_REFERENCE}"]
+
+def test_matched_faq_noted_only_when_topic_changes():
+    history = stored_turn("Tell me about FHIR", "What is FHIR?", "FHIR is a standard.")
+    history += stored_turn("Which versions?", "What is FHIR?", "R4.")
+    history += stored_turn("And pricing?", None, "I'm not sure.")
+
+    users = [m["parts"][0] for m in HistoryCompactor().compact(history, FAQ) if m["role"] == "user"]
+    assert users == ["Tell me about FHIR\n(matched FAQ: What is FHIR?)", "Which versions?", "And pricing?"]
+
+def test_trimmed_history_and_unanswered_turns():
+    history = [{"role": "assistant", "content": "orphan reply"}] + stored_turn("Hi", None, "Hello")[:3]
+    assert [(t.user, t.reply) for t in history_turns(history)] == [("Hi", None)]
+    # An unanswered earlier turn is merged with the next user message.
+    messages = build_messages("Next question?", FAQ, history)
+    assert [m["role"] for m in messages] == ["user"] and len(messages[0]["parts"]) == 2
+
+def test_budget_folds_old_turns_into_summary():
+    compactor = HistoryCompactor(token_budget=150, summary_tokens=60)
+    messages = compactor.compact(conversation(10), FAQ)
+
+    assert messages[0]["role"] == "user" and messages[0]["parts"][0].startswith(SUMMARY_HEADER)
+    assert estimate_tokens(messages[0]["parts"][0]) <= 60 + estimate_tokens(SUMMARY_HEADER) + 1
+    assert prompt_tokens(messages) - estimate_tokens(messages[0]["parts"][0]) <= 150
+    assert "Answer 9." in messages[-1]["parts"][0]
+
+    unlimited = HistoryCompactor(token_budget=0).compact(conversation(10), FAQ)
+    assert len(unlimited) == 20
+
+def test_most_recent_turn_is_cut_to_the_budget():
+    history = stored_turn("Long one?", None, "word " * 1000)
+    messages = HistoryCompactor(token_budget=100).compact(history, FAQ)
+    assert prompt_tokens(messages) <= 110
+
+def test_rolling_summary_is_cached():
+    compactor = HistoryCompactor(token_budget=150)
+    history = conversation(10)
+    first = compactor.compact(history, FAQ)
+    assert compactor.stats()["summary_misses"] == 1
+    assert compactor.compact(history, FAQ) == first
+    assert compactor.stats()["summary_hits"] == 1
+
+    # The next turn only summarizes the newly folded turn on top of the cached prefix.
+    size = len(compactor.summaries)
+    compactor.compact(history + stored_turn("One more?", "FAQ 9?", "Yes. " * 100), FAQ)
+    assert len(compactor.summaries) == size + 1
+
+def test_cached_prefix_summary_holds_only_that_prefix():
+    shared = stored_turn("What is Vendor Services?", FAQ["question"], "It is a program.")
+    session_a = history_turns(shared + stored_turn("Secret question of user A?", None, "...") + stored_turn("Another one of A?", None, "..."))
+    session_b = history_turns(shared + stored_turn("Question of user B?", None, "..."))
+
+    compactor = HistoryCompactor()
+    compactor.summarize(session_a)
+    # B folds only the turn it shares with A, which is a cache hit.
+    summary = compactor.summarize(session_b[:1])
+    assert compactor.stats()["summary_hits"] == 1
+    assert summary == HistoryCompactor().summarize(session_b[:1])
+    assert "user A" not in summary
+
+def test_follow_up_prompt_is_compact():
+    old_size = len(f"Previous conversation context: {conversation(5)}") // 4
+    messages = build_messages("And the price?", FAQ, conversation(5))
+    assert prompt_tokens(messages) < old_size
+    assert client.get("/history/stats").json()["token_budget"] == main.history_compactor.token_budget
+
+def test_prompt_is_built_once_and_only_for_llm_calls(monkeypatch):
+    async def fake_llm(messages):
+        return "Generated answer."
+    async def fake_rewrite(user_input, history):
+        return "How much does Vendor Services cost?"
+    monkeypatch.setattr(main, "USE_MOCK_GEMINI", False)
+    monkeypatch.setattr(main, "call_llm_async", fake_llm)
+    monkeypatch.setattr(main, "generate_rewrite_async", fake_rewrite)
+    main.answer_cache.backend.clear()
+
+    history = conversation(10) + stored_turn("What is Vendor Services?", FAQ["question"], "A support program.")
+    stats = main.history_compactor.stats()
+    prompts = PROMPT_TOKENS.count("budgeted")
+    client.post("/chat", json={"message": "And how much does it cost?", "history": history})
+    # One compaction of the folded turns, not a second one for the full-FAQ size.
+    after = main.history_compactor.stats()
+    assert after["summary_misses"] == stats["summary_misses"] + 1 and after["summary_hits"] == stats["summary_hits"]
+    assert PROMPT_TOKENS.count("budgeted") == prompts + 1 and PROMPT_TOKENS.count("full_faq") == PROMPT_TOKENS.count("budgeted")
+
+    # A cached answer needs no prompt.
+    for _ in range(2):
+        client.post("/chat", json={"message": "What is Vendor Services?"})
+    assert PROMPT_TOKENS.count("budgeted") == prompts + 2
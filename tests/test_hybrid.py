@@ -0,0 +1,94 @@
+"""
+Tests for hybrid (fused) ranking and its confidence calibration.
+"""
+import json
+import os
+
+import numpy as np
+import pytest
+
+import app.main as main
+from app.corpus import CorpusManager
+from app.hybrid import Calibration, HybridRetriever, fit_calibration
+from app.retrieval import FAQRetriever
+
+QUERIES_PATH = os.path.join(os.path.dirname(__file__), "..", "SEED_DATA", "epic_vendor_faq_queries.jsonl")
+
+@pytest.fixture
+def hybrid():
+    return HybridRetriever(FAQRetriever(main.corpus.faq_data))
+
+def test_weak_title_match_does_not_hide_better_answer():
+    faqs = [
+        {"id": "title", "section": "Billing", "question": "How do I update billing details?", "answer": "Open the account settings page."},
+        {"id": "body", "section": "Billing", "question": "What payment methods are accepted?",
+         "answer": "You can update your billing card details and invoice address from the billing portal."},
+        {"id": "other", "section": "Accounts", "question": "How do I delete my account?", "answer": "Contact support to close it."},
+    ]
+    query = "billing portal card invoice address"
+    lexical = FAQRetriever(faqs)
+    assert lexical.find_best_match(query)["id"] == "title"
+
+    hits = HybridRetriever(lexical, thresholds={"confidence": 0.0}).search(query)
+    assert hits[0].faq["id"] == "body"
+    assert {hit.field for hit in hits} == {"hybrid"}
+
+def test_hits_are_ranked_with_calibrated_confidence(hybrid):
+    hits = hybrid.search("How much does it cost to subscribe to Vendor Services?", k=5)
+    assert hits[0].faq["id"] == "faq_7"
+    assert [hit.score for hit in hits] == sorted((hit.score for hit in hits), reverse=True)
+    assert all(0 <= hit.confidence <= 1 for hit in hits)
+    assert hits[0].confidence > 0.5 > hits[-1].confidence
+    assert hybrid.find_best_match("How much does it cost to subscribe to Vendor Services?")["id"] == "faq_7"
+
+    assert hybrid.search("asdfghjkl qwerty") == []
+    assert hybrid.find_best_match("asdfghjkl qwerty") is None
+    assert hybrid.search("What is Vendor Services?", k=0) == []
+
+def test_each_field_is_scored_once_per_query(hybrid, monkeypatch):
+    calls = []
+    field_scores = hybrid.lexical.field_scores
+    monkeypatch.setattr(hybrid.lexical, "field_scores", lambda query: calls.append(query) or field_scores(query))
+
+    hybrid.search("How do I enroll in Vendor Services?", k=5)
+    assert calls == ["How do I enroll in Vendor Services?"]
+
+def test_rrf_fusion(hybrid):
+    rrf = HybridRetriever(hybrid.lexical, fusion="rrf", weights={"section": 0.0})
+    scores = {"question": np.array([0.9, 0.5, 0.5, 0.0]), "answer": np.array([0.0, 0.2, 0.4, 0.1])}
+    fused = rrf.fuse(scores, np.arange(4))
+    # Tied question scores share a rank, so the answer score decides between them.
+    assert fused[2] > fused[1] and fused[0] > fused[3] > 0
+
+    with pytest.raises(ValueError):
+        HybridRetriever(hybrid.lexical, fusion="max")
+
+def test_fit_calibration(tmp_path):
+    rng = np.random.default_rng(0)
+    good = [{"question": q} for q in rng.uniform(0.5, 1.0, 50)]
+    bad = [{"question": q} for q in rng.uniform(0.0, 0.5, 50)]
+    calibration = fit_calibration(good + bad, [1] * 50 + [0] * 50, ["question"])
+    assert calibration.coef["question"] > 0
+    assert calibration.confidence({"question": 0.9}) > 0.8 > 0.2 > calibration.confidence({"question": 0.1})
+
+    calibration.save(str(tmp_path / "calibration.json"))
+    assert Calibration.load(str(tmp_path / "calibration.json")) == calibration
+
+def test_labelled_seed_queries(hybrid):
+    with open(QUERIES_PATH) as f:
+        labelled = [json.loads(line) for line in f]
+
+    def accuracy(retriever):
+        matches = retriever.find_best_matches([row["query"] for row in labelled])
+        return sum((match or {}).get("id") == row["faq_id"] for match, row in zip(matches, labelled)) / len(labelled)
+
+    assert accuracy(hybrid) > accuracy(hybrid.lexical)
+    assert all(hybrid.find_best_match(row["query"]) is None for row in labelled if row["faq_id"] is None)
+
+def test_corpus_manager_hybrid_ranking():
+    manager = CorpusManager(main.FAQ_FILE_PATH, ranking="hybrid", hybrid_options={"fusion": "rrf"})
+    assert isinstance(manager.retriever, HybridRetriever) and manager.retriever.fusion == "rrf"
+    assert manager.stats()["ranking"] == "hybrid" and manager.stats()["source"] == "fit"
+
+    with pytest.raises(ValueError):
+        CorpusManager(main.FAQ_FILE_PATH, ranking="best")
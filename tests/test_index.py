@@ -0,0 +1,114 @@
+"""
+Tests for the persisted, memory-mapped retrieval index.
+"""
+import json
+
+import numpy as np
+import pytest
+
+import app.index as index
+import app.main as main
+from app.build_index import main as build_index
+from app.corpus import CorpusManager, corpus_version
+from app.index import TermVectorizer, load_index, read_manifest, save_index
+from app.retrieval import FAQRetriever
+
+QUERIES = [
+    "What is Vendor Services?",
+    "how much does it cost",
+    "FHIR APIs for developers",
+    "Who do I contact for help?",
+    "completely unrelated text about bananas",
+]
+
+@pytest.fixture
+def retriever():
+    return FAQRetriever(main.corpus.faq_data)
+
+def test_round_trip_matches_fitted_retriever(retriever, tmp_path):
+    save_index(retriever, str(tmp_path), corpus_version="abc")
+    loaded = load_index(str(tmp_path))
+
+    assert read_manifest(str(tmp_path))["corpus_version"] == "abc"
+    for query in QUERIES:
+        assert loaded.find_best_match(query) == retriever.find_best_match(query)
+        assert [(h.index, h.field) for h in loaded.search(query)] == [(h.index, h.field) for h in retriever.search(query)]
+    assert loaded.find_best_matches(QUERIES) == retriever.find_best_matches(QUERIES)
+
+def test_matrix_arrays_are_memory_mapped(retriever, tmp_path):
+    save_index(retriever, str(tmp_path))
+    loaded = load_index(str(tmp_path))
+
+    for field in ("question", "answer"):
+        matrix = loaded._column_matrices[field]
+        for array in (matrix.data, matrix.indices):
+            # scipy keeps a view of the mapped array rather than copying it.
+            assert not array.flags.owndata and not array.flags.writeable
+
+def test_rewriting_an_index_in_place_is_never_loaded_half_written(retriever, tmp_path, monkeypatch):
+    save_index(retriever, str(tmp_path), corpus_version="v1")
+    serving = load_index(str(tmp_path))
+    other = FAQRetriever(main.corpus.faq_data[::-1])
+
+    # While the files are replaced, there is no manifest to load them by.
+    save = np.save
+    def checked_save(file, array):
+        assert read_manifest(str(tmp_path)) is None
+        save(file, array)
+    monkeypatch.setattr(index.np, "save", checked_save)
+    save_index(other, str(tmp_path), corpus_version="v2")
+    monkeypatch.setattr(index.np, "save", save)
+    # The retriever already serving keeps its memory-mapped arrays.
+    for query in QUERIES:
+        assert serving.find_best_match(query) == retriever.find_best_match(query)
+
+    # A rewrite that starts while an index is being loaded is detected.
+    load = np.load
+    def load_during_rewrite(*args, **kwargs):
+        monkeypatch.setattr(index.np, "load", load)
+        save_index(retriever, str(tmp_path), corpus_version="v3")
+        return load(*args, **kwargs)
+    monkeypatch.setattr(index.np, "load", load_during_rewrite)
+    with pytest.raises(ValueError, match="rewritten while loading"):
+        load_index(str(tmp_path))
+    assert load_index(str(tmp_path)).find_best_matches(QUERIES) == retriever.find_best_matches(QUERIES)
+
+def test_corpus_manager_fits_when_the_index_cannot_be_loaded(tmp_path, monkeypatch):
+    build_index(["--output", str(tmp_path)])
+    def rewritten(path, thresholds=None):
+        raise ValueError(f"Index at {path} was rewritten while loading")
+    monkeypatch.setattr("app.corpus.load_index", rewritten)
+    assert CorpusManager(main.FAQ_FILE_PATH, index_path=str(tmp_path)).source == "fit"
+
+def test_term_vectorizer_matches_sklearn(retriever):
+    for sk in (retriever.question_vectorizer, retriever.answer_vectorizer):
+        terms = sorted(sk.vocabulary_, key=sk.vocabulary_.get)
+        stop_words = sk.get_stop_words() or []
+        ours = TermVectorizer(terms, sk.idf_, stop_words)
+        assert np.allclose(ours.transform(QUERIES).toarray(), sk.transform(QUERIES).toarray())
+
+def test_unsupported_format_is_rejected(retriever, tmp_path):
+    save_index(retriever, str(tmp_path))
+    manifest = read_manifest(str(tmp_path))
+    manifest["format_version"] = 999
+    (tmp_path / "manifest.json").write_text(json.dumps(manifest))
+
+    with pytest.raises(ValueError):
+        load_index(str(tmp_path))
+
+def test_corpus_manager_uses_index_only_for_matching_version(tmp_path):
+    faq_file = tmp_path / "faq.json"
+    faq_file.write_text(json.dumps(main.corpus.faq_data))
+    index_dir = tmp_path / "index"
+    build_index(["--faq-file", str(faq_file), "--output", str(index_dir)])
+
+    assert read_manifest(str(index_dir))["corpus_version"] == corpus_version(faq_file.read_bytes())
+    assert CorpusManager(str(faq_file), index_path=str(index_dir)).source == "index"
+
+    # A stale index is ignored and the corpus is fitted instead.
+    faq_data = json.loads(faq_file.read_text())
+    faq_data[0]["question"] = "What exactly is the Vendor Services program?"
+    faq_file.write_text(json.dumps(faq_data))
+    manager = CorpusManager(str(faq_file), index_path=str(index_dir))
+    assert manager.source == "fit"
+    assert manager.retriever.find_best_match("What exactly is the Vendor Services program?")["id"] == faq_data[0]["id"]
@@ -0,0 +1,199 @@
+"""
+Tests for the resilient LLM client (timeouts, retries, circuit breaker) and the
+chat fallbacks it drives, using the fault-injecting mock LLM.
+"""
+import asyncio
+import random
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main as main
+import app.response as response
+from app import mock as mock_llm
+from app.llm_client import CallPolicy, CircuitBreaker, CircuitOpenError, ResilientLLMClient, RetryBudget
+from app.rewrite import QueryRewriter
+
+client = TestClient(main.app)
+
+class UpstreamError(Exception):
+    code = 503
+
+class BadRequest(Exception):
+    code = 400
+
+def make_client(max_retries=2, attempt_timeout=0.05, deadline=1.0, failures=3, reset=60.0):
+    return ResilientLLMClient(
+        policies={"answer": CallPolicy(attempt_timeout, deadline, max_retries)},
+        breaker=CircuitBreaker(failure_threshold=failures, reset_seconds=reset),
+        retry_budget=RetryBudget(ratio=1.0),
+        backoff_base_seconds=0.001,
+        rng=random.Random(0),
+    )
+
+def flaky(failures, result="ok", error=UpstreamError):
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise error("upstream failed")
+        return result
+
+    return fn, calls
+
+def test_retries_then_succeeds():
+    llm = make_client()
+    fn, calls = flaky(2)
+    assert asyncio.run(llm.call("answer", fn)) == "ok"
+    assert len(calls) == 3
+    assert llm.retries == 2
+    assert llm.breaker.state == "closed"
+
+def test_attempt_timeout_bounds_a_hanging_call():
+    llm = make_client(max_retries=1, attempt_timeout=0.05)
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    start = time.perf_counter()
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(llm.call("answer", hang))
+    assert time.perf_counter() - start < 0.5
+    assert llm.timeouts == 2
+
+def test_non_retryable_errors_are_not_retried_or_counted():
+    llm = make_client()
+    fn, calls = flaky(5, error=BadRequest)
+    with pytest.raises(BadRequest):
+        asyncio.run(llm.call("answer", fn))
+    assert len(calls) == 1
+    assert llm.breaker.consecutive_failures == 0
+
+def test_retry_budget_limits_retries():
+    llm = make_client(max_retries=5, failures=100)
+    llm.retry_budget = RetryBudget(ratio=0.0, max_tokens=1)
+    fn, calls = flaky(10)
+    with pytest.raises(UpstreamError):
+        asyncio.run(llm.call("answer", fn))
+    assert len(calls) == 2  # one retry, then the budget is empty
+
+def test_breaker_opens_short_circuits_and_recovers():
+    llm = make_client(max_retries=0, failures=3, reset=0.05)
+    fn, calls = flaky(3)
+    for _ in range(3):
+        with pytest.raises(UpstreamError):
+            asyncio.run(llm.call("answer", fn))
+    assert llm.breaker.state == "open"
+
+    # Open: rejected without calling the upstream.
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(llm.call("answer", fn))
+    assert len(calls) == 3
+    assert llm.short_circuits == 1
+
+    # After the reset timeout a trial call goes through and closes the breaker.
+    time.sleep(0.06)
+    assert asyncio.run(llm.call("answer", fn)) == "ok"
+    assert llm.breaker.state == "closed"
+    assert llm.stats()["breaker"]["times_opened"] == 1
+
+def test_stream_retries_only_before_first_chunk():
+    llm = make_client()
+    attempts = []
+
+    async def stream():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise UpstreamError("failed before the first chunk")
+        yield "a"
+        yield "b"
+        if len(attempts) == 2:
+            raise UpstreamError("failed mid-stream")
+
+    async def consume():
+        chunks = []
+        async for chunk in llm.stream("answer", stream):
+            chunks.append(chunk)
+        return chunks
+
+    with pytest.raises(UpstreamError, match="mid-stream"):
+        asyncio.run(consume())
+    assert len(attempts) == 2
+
+def test_queueing_on_the_limiter_is_not_a_timeout(monkeypatch):
+    monkeypatch.setattr(response, "LLM_MAX_CONCURRENCY", 1)
+    llm = ResilientLLMClient(
+        policies={"answer": CallPolicy(0.05, 0.1, 0)}, breaker=CircuitBreaker(failure_threshold=2), limiter=response.llm_limiter,
+    )
+
+    # Like the app's LLM calls, these also acquire the limiter themselves.
+    async def slow_call():
+        async with response.llm_limiter():
+            await asyncio.sleep(0.02)
+            return "ok"
+
+    async def slow_stream():
+        async with response.llm_limiter():
+            await asyncio.sleep(0.02)
+            yield "ok"
+
+    async def consume():
+        return [chunk async for chunk in llm.stream("answer", slow_stream)]
+
+    async def saturate():
+        # Each call waits behind the others for far longer than its attempt timeout.
+        return await asyncio.gather(*(llm.call("answer", slow_call) for _ in range(5)), *(consume() for _ in range(5)))
+
+    assert asyncio.run(saturate()) == ["ok"] * 5 + [["ok"]] * 5
+    assert llm.timeouts == 0 and llm.breaker.state == "closed"
+
+@pytest.fixture
+def failing_mock(monkeypatch):
+    monkeypatch.setattr(mock_llm, "MOCK_LLM_FAILURE_RATE", 1.0)
+    monkeypatch.setattr(main, "llm_client", make_client(max_retries=0, failures=2))
+    main.answer_cache.backend.clear()
+    return main.llm_client
+
+def test_chat_serves_fallback_and_short_circuits_when_breaker_opens(failing_mock):
+    for _ in range(2):
+        response = client.post("/chat", json={"message": "What is Vendor Services?"}).json()
+        assert "having trouble generating" in response["answer"]
+    assert client.get("/llm/stats").json()["breaker"]["state"] == "open"
+    assert "chat_llm_breaker_state 2" in client.get("/metrics").text
+
+    response = client.post("/chat", json={"message": "What is Vendor Services?"}).json()
+    assert "having trouble generating" in response["answer"]
+    assert failing_mock.short_circuits == 1
+
+def test_stream_serves_fallback_when_llm_fails(failing_mock):
+    body = client.post("/chat/stream", json={"message": "What is Vendor Services?"}).text
+    assert "having trouble generating" in body
+
+def test_breaker_reports_half_open_once_reset_time_passes(monkeypatch):
+    monkeypatch.setattr(main, "llm_client", make_client(failures=1, reset=0.05))
+    main.llm_client.breaker.record_failure()
+    assert "chat_llm_breaker_state 2" in client.get("/metrics").text
+
+    # No call is needed for the reported state to catch up.
+    time.sleep(0.06)
+    assert client.get("/llm/stats").json()["breaker"]["state"] == "half_open"
+    assert "chat_llm_breaker_state 1" in client.get("/metrics").text
+
+def test_rewrite_uses_raw_query_while_breaker_open():
+    llm = ResilientLLMClient(policies={"rewrite": CallPolicy(1.0, 1.0, 0)}, breaker=CircuitBreaker(failure_threshold=1))
+    llm.breaker.record_failure()
+    upstream_calls = []
+
+    async def llm_rewrite(user_input, history):
+        async def generate():
+            upstream_calls.append(user_input)
+            return "rewritten"
+        return await llm.call("rewrite", generate)
+
+    rewriter = QueryRewriter(llm_rewrite)
+    history = [{"role": "Matched FAQ", "content": "No relevant FAQ found."}]
+    query, _ = asyncio.run(rewriter.rewrite("what about them", history, main.corpus.retriever))
+    assert query == "what about them"
+    assert upstream_calls == []
@@ -0,0 +1,80 @@
+"""
+Tests for per-stage tracing, the /metrics endpoint and the slow-request profiler hook.
+"""
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.metrics import STAGE_SECONDS, TURNS, MetricsRegistry, RequestTrace, SamplingProfiler, profile_dump_hook
+
+client = TestClient(main.app)
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("test_seconds", "Test.", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 5.0):
+        histogram.observe(value, "a")
+    counter = registry.counter("test_total", "Test.")
+
+    lines = registry.render().splitlines()
+    assert 'test_seconds_bucket{stage="a",le="0.1"} 2' in lines
+    assert 'test_seconds_bucket{stage="a",le="1"} 3' in lines
+    assert 'test_seconds_bucket{stage="a",le="+Inf"} 4' in lines
+    assert 'test_seconds_count{stage="a"} 4' in lines
+    assert "test_total 0" in lines
+    counter.inc()
+    assert "test_total 1" in registry.render().splitlines()
+
+def test_chat_records_stages_and_counters():
+    # A cache hit skips the llm stage.
+    main.answer_cache.backend.clear()
+    turns = TURNS.value()
+    stages = {stage: STAGE_SECONDS.count(stage) for stage in ("follow_up", "retrieval", "cache", "llm", "serialize")}
+
+    client.post("/chat", json={"message": "What is Vendor Services?", "requestID": "metrics-test"})
+
+    assert TURNS.value() == turns + 1
+    for stage, count in stages.items():
+        assert STAGE_SECONDS.count(stage) == count + 1, stage
+
+    body = client.get("/metrics").text
+    assert 'chat_request_seconds_count{endpoint="/chat"}' in body
+    assert 'chat_stage_seconds_bucket{stage="retrieval",le="+Inf"}' in body
+    assert "chat_retrieval_misses_total" in body
+
+def test_slow_request_hook_gets_tagged_trace(monkeypatch):
+    traces = []
+    monkeypatch.setattr(main.tracer, "slow_request_seconds", 1e-9)
+    monkeypatch.setattr(main.tracer, "slow_request_hooks", [traces.append])
+
+    client.post("/chat", json={"message": "What is Vendor Services?", "requestID": "slow-1"})
+
+    assert len(traces) == 1
+    assert traces[0].request_id == "slow-1"
+    stages = [stage for stage, _ in traces[0].spans]
+    assert stages[:2] == ["follow_up", "retrieval"]
+    assert stages[-1] == "serialize"
+    assert "slow-1" in traces[0].summary()
+
+def busy_wait(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+def test_sampling_profiler_dumps_slow_request(tmp_path):
+    profiler = SamplingProfiler(interval_seconds=0.001)
+    worker = threading.Thread(target=busy_wait, args=(0.2,))
+    worker.start()
+    profiler.start(thread_id=worker.ident)
+    start = time.perf_counter()
+    worker.join()
+    profiler.stop()
+
+    trace = RequestTrace("/chat")
+    trace.request_id, trace.start, trace.end = "req/1", start, time.perf_counter()
+    profile_dump_hook(profiler, str(tmp_path))(trace)
+
+    dump = (tmp_path / "req1.folded").read_text()
+    assert "busy_wait" in dump
@@ -0,0 +1,19 @@
+"""
+Tests for the mock LLM's simulated latency.
+"""
+import random
+
+from app import mock as mock_llm
+
+def test_mock_latency_jitter_is_seeded(monkeypatch):
+    monkeypatch.setattr(mock_llm, "MOCK_LLM_LATENCY_MS", 100)
+    monkeypatch.setattr(mock_llm, "MOCK_LLM_JITTER_MS", 50)
+
+    def draw():
+        monkeypatch.setattr(mock_llm, "_jitter_rng", random.Random(7))
+        return [mock_llm.mock_latency_seconds() for _ in range(20)]
+
+    latencies = draw()
+    assert latencies == draw()
+    assert all(0.05 <= latency <= 0.15 for latency in latencies)
+    assert len(set(latencies)) > 1
@@ -0,0 +1,103 @@
+"""
+Tests for splitting FAQ answers into passages and budgeting the prompt context.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.build_index import main as build_index
+from app.corpus import CorpusManager
+from app.metrics import PROMPT_TOKENS
+from app.passages import estimate_tokens, select_context, sibling_passages, split_answer, split_passages
+from app.response import build_messages, prompt_tokens
+
+client = TestClient(main.app)
+
+@pytest.fixture(scope="module")
+def passage_corpus():
+    return CorpusManager(main.FAQ_FILE_PATH, passage_tokens=40)
+
+def test_split_answer_keeps_bullets_whole_and_within_budget():
+    answer = "Intro paragraph.\n\n- first item\n- second item\n- third item\n\nClosing sentence. Another one."
+    assert split_answer(answer, 1000) == ["Intro paragraph.\n- first item\n- second item\n- third item\nClosing sentence. Another one."]
+
+    passages = split_answer(answer, 8)
+    assert all(estimate_tokens(p) <= 8 for p in passages)
+    assert "\n".join(passages).split("\n") == [
+        "Intro paragraph.", "- first item", "- second item", "- third item", "Closing sentence. Another one.",
+    ]
+
+def test_passages_point_back_to_their_faq():
+    faqs = main.corpus.faq_data
+    assert split_passages(faqs, 0) is faqs
+
+    passages = split_passages(faqs, 40)
+    assert len(passages) > len(faqs)
+    first = [p for p in passages if p["faq_id"] == faqs[0]["id"]]
+    assert len(first) > 1 and [p["passage"] for p in first] == list(range(len(first)))
+    assert all(p["url"] == faqs[0]["url"] and p["question"] == faqs[0]["question"] for p in first)
+    assert all(passages[p["row"]] is p for p in passages)
+
+    assert sibling_passages(passages, first[-1]) == first
+    assert sibling_passages(faqs, faqs[0]) == [faqs[0]]
+
+def test_select_context_fits_the_budget():
+    passages = split_passages(main.corpus.faq_data, 40)
+    faq = next(p for p in passages if p["passage"] == 1 and p["passages"] > 3)
+    siblings = sibling_passages(passages, faq)
+
+    assert select_context(faq, siblings, "anything", 0) == siblings
+    chosen = select_context(faq, siblings, "anything", 60)
+    assert faq in chosen and len(chosen) < len(siblings)
+    assert sum(estimate_tokens(p["answer"]) for p in chosen) <= 60
+    assert [p["passage"] for p in chosen] == sorted(p["passage"] for p in chosen)
+    # The matched passage is always sent, even over budget.
+    assert select_context(faq, siblings, "anything", 1) == [faq]
+
+def test_build_messages_budget_shrinks_prompt():
+    passages = split_passages(main.corpus.faq_data, 40)
+    faq = passages[0]
+    siblings = sibling_passages(passages, faq)
+    full = build_messages("What is Vendor Services?", faq, passages=siblings, token_budget=0)
+    budgeted = build_messages("What is Vendor Services?", faq, passages=siblings, token_budget=50)
+
+    assert prompt_tokens(budgeted) < prompt_tokens(full)
+    assert faq["answer"] in budgeted[-1]["parts"][0]
+    # Whole FAQs are sent unchanged.
+    whole = main.corpus.faq_data[0]
+    assert whole["answer"] in build_messages("What is Vendor Services?", whole)[-1]["parts"][0]
+
+def test_corpus_manager_indexes_passages(passage_corpus):
+    assert passage_corpus.stats()["passage_tokens"] == 40
+    assert passage_corpus.stats()["faq_count"] == len(split_passages(main.corpus.faq_data, 40))
+    match = passage_corpus.retriever.find_best_match("How much does it cost to subscribe to Vendor Services?")
+    assert match["faq_id"] == "faq_7"
+
+def test_index_built_with_other_passage_size_is_not_used(tmp_path):
+    index_dir = tmp_path / "index"
+    build_index(["--faq-file", main.FAQ_FILE_PATH, "--output", str(index_dir), "--passage-tokens", "40"])
+
+    assert CorpusManager(main.FAQ_FILE_PATH, index_path=str(index_dir), passage_tokens=40).source == "index"
+    assert CorpusManager(main.FAQ_FILE_PATH, index_path=str(index_dir)).source == "fit"
+
+def test_chat_with_passages_records_prompt_size(passage_corpus, monkeypatch):
+    prompts = []
+    async def fake_llm(messages):
+        prompts.append(messages[-1]["parts"][0])
+        return "Generated answer."
+    monkeypatch.setattr(main, "corpus", passage_corpus)
+    monkeypatch.setattr(main, "USE_MOCK_GEMINI", False)
+    monkeypatch.setattr(main, "call_llm_async", fake_llm)
+    main.answer_cache.backend.clear()
+    counts = PROMPT_TOKENS.count("budgeted"), PROMPT_TOKENS.count("full_faq")
+
+    question = "I'm having trouble logging into the Vendor Services website. What do I do?"
+    resp = client.post("/chat", json={"message": question}).json()
+    assert resp["sources"] == [question]
+    assert resp["url"] != ""
+    assert "contact a Vendor Services TS" in prompts[0]
+
+    assert (PROMPT_TOKENS.count("budgeted"), PROMPT_TOKENS.count("full_faq")) == (counts[0] + 1, counts[1] + 1)
+    body = client.get("/metrics").text
+    assert 'chat_prompt_tokens_count{context="budgeted"}' in body
+    assert 'chat_prompt_tokens_count{context="full_faq"}' in body
@@ -0,0 +1,140 @@
+"""
+Tests for recording LLM traffic and replaying it with the recorded timing.
+"""
+import asyncio
+import json
+import time
+
+import pytest
+
+import app.response as response
+from app.recording import LLMRecorder, LLMReplayer, ReplayMissError, call_key, llm_recording_from_env
+
+MESSAGES = [{"role": "user", "parts": ["CONTEXT: ...\n\nUSER QUESTION: What is Vendor Services?"]}]
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+        self.parts = [text]
+
+    def __aiter__(self):
+        async def chunks():
+            for word in self.text.split(" "):
+                await asyncio.sleep(0.02)
+                yield FakeResponse(word + " ")
+        return chunks()
+
+class FakeModel:
+    def __init__(self):
+        self.calls = 0
+
+    async def generate_content_async(self, prompt, generation_config=None, stream=False):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return FakeResponse(f"answer {self.calls}" if not stream else "streamed answer text")
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    model = FakeModel()
+    monkeypatch.setattr(response, "get_model", lambda *args, **kwargs: model)
+    return model
+
+async def collect(chunks):
+    return [chunk async for chunk in chunks]
+
+def run_calls():
+    """One answer, one streamed answer and one rewrite, through app/response.py."""
+    answer = asyncio.run(response.call_llm_async(MESSAGES))
+    chunks = asyncio.run(collect(response.stream_llm_async(MESSAGES)))
+    rewrite = asyncio.run(response.generate_rewrite_async("How much is it?", [{"role": "user", "content": "What is Vendor Services?"}]))
+    return answer, chunks, rewrite
+
+def record(path, monkeypatch):
+    monkeypatch.setattr(response, "llm_recording", LLMRecorder(str(path)))
+    return run_calls()
+
+def test_record_writes_prompt_response_and_latency(tmp_path, fake_model, monkeypatch):
+    answer, chunks, rewrite = record(tmp_path / "llm.jsonl", monkeypatch)
+    records = [json.loads(line) for line in open(tmp_path / "llm.jsonl")]
+    assert [r["kind"] for r in records] == ["answer", "stream", "rewrite"]
+    assert records[0]["prompt"] == MESSAGES and records[0]["response"] == answer
+    assert records[0]["key"] == call_key("answer", response.MODEL_NAME, response.SYSTEM_PROMPT, MESSAGES, 0.2)
+    assert records[0]["latency"] >= 0.05
+    assert [text for _, text in records[1]["chunks"]] == chunks
+    assert [offset for offset, _ in records[1]["chunks"]] == sorted(offset for offset, _ in records[1]["chunks"])
+    assert records[2]["response"].strip() == rewrite
+
+def test_replay_serves_recording_without_the_llm(tmp_path, fake_model, monkeypatch):
+    recorded = record(tmp_path / "llm.jsonl", monkeypatch)
+    calls = fake_model.calls
+
+    replayer = LLMReplayer(str(tmp_path / "llm.jsonl"))
+    monkeypatch.setattr(response, "llm_recording", replayer)
+    start = time.perf_counter()
+    replayed = run_calls()
+    assert replayed == recorded and fake_model.calls == calls
+    # The recorded latencies are replayed: one call, about 6 stream chunks and one rewrite.
+    assert time.perf_counter() - start >= 0.15
+    assert replayer.stats()["hits"] == 3 and replayer.stats()["misses"] == 0
+
+def test_repeated_prompts_replay_round_robin_and_speed_scales(tmp_path, fake_model, monkeypatch):
+    monkeypatch.setattr(response, "llm_recording", LLMRecorder(str(tmp_path / "llm.jsonl")))
+    first = [asyncio.run(response.call_llm_async(MESSAGES)) for _ in range(2)]
+
+    replayer = LLMReplayer(str(tmp_path / "llm.jsonl"), speed=0)
+    monkeypatch.setattr(response, "llm_recording", replayer)
+    start = time.perf_counter()
+    assert [asyncio.run(response.call_llm_async(MESSAGES)) for _ in range(3)] == first + first[:1]
+    assert time.perf_counter() - start < 0.05
+
+def test_miss_raises_or_samples(tmp_path, fake_model, monkeypatch):
+    record(tmp_path / "llm.jsonl", monkeypatch)
+    other = [{"role": "user", "parts": ["a prompt that was never recorded"]}]
+
+    monkeypatch.setattr(response, "llm_recording", LLMReplayer(str(tmp_path / "llm.jsonl"), speed=0))
+    with pytest.raises(ReplayMissError) as error:
+        asyncio.run(response.call_llm_async(other))
+    assert error.value.code == 404
+
+    sampler = LLMReplayer(str(tmp_path / "llm.jsonl"), speed=0, miss="sample")
+    monkeypatch.setattr(response, "llm_recording", sampler)
+    assert asyncio.run(response.call_llm_async(other)) == "answer 1"
+    assert sampler.stats()["sampled"] == 1
+
+def test_stream_replays_an_answer_recorded_without_streaming(tmp_path, fake_model, monkeypatch):
+    monkeypatch.setattr(response, "llm_recording", LLMRecorder(str(tmp_path / "llm.jsonl")))
+    answer = asyncio.run(response.call_llm_async(MESSAGES))
+
+    replayer = LLMReplayer(str(tmp_path / "llm.jsonl"), speed=0)
+    monkeypatch.setattr(response, "llm_recording", replayer)
+    assert asyncio.run(collect(response.stream_llm_async(MESSAGES))) == [answer]
+    assert replayer.stats()["hits"] == 1 and replayer.stats()["misses"] == 0
+
+    # Only streams fall back: a plain answer is not served from a recorded stream.
+    monkeypatch.setattr(response, "llm_recording", LLMRecorder(str(tmp_path / "streams.jsonl")))
+    asyncio.run(collect(response.stream_llm_async(MESSAGES)))
+    monkeypatch.setattr(response, "llm_recording", LLMReplayer(str(tmp_path / "streams.jsonl"), speed=0))
+    with pytest.raises(ReplayMissError):
+        asyncio.run(response.call_llm_async(MESSAGES))
+
+def test_lookup_reads_one_record_from_a_large_recording(tmp_path):
+    path = tmp_path / "large.jsonl"
+    with open(path, "w") as f:
+        for i in range(5000):
+            key = call_key("answer", "m", None, f"prompt {i}", 0.2)
+            f.write(json.dumps({"key": key, "kind": "answer", "prompt": f"prompt {i}", "latency": 0.1, "response": f"r{i}"}) + "\n")
+    replayer = LLMReplayer(str(path))
+    assert replayer.stats()["records"] == 5000
+    assert replayer.lookup("answer", "m", None, "prompt 4321", 0.2)["response"] == "r4321"
+
+def test_recording_from_env(tmp_path, monkeypatch):
+    monkeypatch.delenv("LLM_RECORD_MODE", raising=False)
+    assert llm_recording_from_env() is None
+
+    monkeypatch.setenv("LLM_RECORD_MODE", "record")
+    monkeypatch.setenv("LLM_RECORDING_PATH", str(tmp_path / "rec" / "llm.jsonl"))
+    assert isinstance(llm_recording_from_env(), LLMRecorder)
+
+    monkeypatch.setenv("LLM_RECORD_MODE", "replay")
+    monkeypatch.setenv("LLM_REPLAY_SPEED", "0.5")
+    assert llm_recording_from_env().speed == 0.5
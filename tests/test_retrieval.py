@@ -0,0 +1,108 @@
+"""
+Tests for FAQRetriever.search and the find_best_match wrapper.
+"""
+import json
+
+from sklearn.metrics.pairwise import cosine_similarity
+
+from app.main import corpus
+from app.retrieval import FAQRetriever
+
+faq_data = corpus.faq_data
+retriever = FAQRetriever(faq_data)
+
+QUERIES = [
+    "What is Vendor Services?",
+    "Who is it for?",
+    "Tell me about FHIR",
+    "How much does it cost?",
+    "sandbox test harness example data",
+    "I forgot my password",
+    "asdfghjkl qwerty",
+    "",
+    "the and of",
+]
+
+def legacy_find_best_match(query):
+    """The original cascade, kept here as the reference implementation."""
+    q_similarities = cosine_similarity(retriever.question_vectorizer.transform([query]), retriever.question_matrix).flatten()
+    if q_similarities.max() > 0.3:
+        return faq_data[q_similarities.argmax()]
+    a_similarities = cosine_similarity(retriever.answer_vectorizer.transform([query]), retriever.answer_matrix).flatten()
+    if a_similarities.max() > 0.1:
+        return faq_data[a_similarities.argmax()]
+    return None
+
+def test_find_best_match_matches_legacy():
+    for query in QUERIES:
+        assert retriever.find_best_match(query) is legacy_find_best_match(query), query
+
+def test_search_returns_sorted_hits_with_provenance():
+    hits = retriever.search("What is Vendor Services?", k=3)
+    question_hits = [hit for hit in hits if hit.field == "question"]
+    answer_hits = [hit for hit in hits if hit.field == "answer"]
+
+    assert len(question_hits) == 3
+    assert 0 < len(answer_hits) <= 3
+    assert hits[:3] == question_hits  # question hits come first
+    assert question_hits[0].faq["id"] == "faq_1"
+    assert question_hits[0].score > 0.99
+    for field_hits in (question_hits, answer_hits):
+        scores = [hit.score for hit in field_hits]
+        assert scores == sorted(scores, reverse=True)
+
+def test_search_scores_match_cosine_similarity():
+    query = "Vendor Services trial period cost"
+    expected = cosine_similarity(retriever.answer_vectorizer.transform([query]), retriever.answer_matrix).flatten()
+    for hit in retriever.search(query, k=len(faq_data)):
+        if hit.field == "answer":
+            assert abs(hit.score - expected[hit.index]) < 1e-9
+
+def test_search_edge_cases():
+    assert retriever.search("asdfghjkl qwerty") == []
+    assert retriever.search("What is Vendor Services?", k=0) == []
+    assert FAQRetriever([]).search("What is Vendor Services?") == []
+    assert FAQRetriever([]).find_best_match("What is Vendor Services?") is None
+
+def test_thresholds_are_configurable():
+    strict = FAQRetriever(faq_data, thresholds={"question": 0.99, "answer": 0.99})
+    assert strict.find_best_match("Tell me about FHIR") is None
+    assert strict.thresholds["question"] == 0.99
+
+class TransformSpy:
+    """Wraps a field's vectorizer, noting each query transform."""
+    def __init__(self, field, vectorizer, transformed):
+        self.field, self.vectorizer, self.transformed = field, vectorizer, transformed
+
+    def transform(self, texts):
+        self.transformed.append(self.field)
+        return self.vectorizer.transform(texts)
+
+def test_best_hit_scores_answers_only_without_a_question_match(monkeypatch):
+    transformed = []
+    for field in ("question", "answer"):
+        vectorizer = getattr(retriever, f"{field}_vectorizer")
+        monkeypatch.setattr(retriever, f"{field}_vectorizer", TransformSpy(field, vectorizer, transformed))
+
+    assert retriever.best_hit("What is Vendor Services?").field == "question"
+    assert transformed == ["question"]
+    transformed.clear()
+    assert retriever.best_hit("sandbox test harness example data").field == "answer"
+    assert transformed == ["question", "answer"]
+
+def test_find_best_matches_matches_single_query_path():
+    queries = QUERIES + [faq["question"] for faq in faq_data] + [faq["answer"][:80] for faq in faq_data]
+    assert retriever.find_best_matches(queries) == [retriever.find_best_match(query) for query in queries]
+    assert retriever.find_best_matches([]) == []
+
+def test_score_queries_cli(tmp_path):
+    from app.score_queries import main as score_queries
+
+    queries_file = tmp_path / "queries.jsonl"
+    queries_file.write_text('{"message": "What is Vendor Services?"}\nasdfghjkl qwerty\n')
+    output_file = tmp_path / "results.jsonl"
+
+    score_queries([str(queries_file), "--output", str(output_file)])
+
+    results = [json.loads(line) for line in output_file.read_text().splitlines()]
+    assert [result["faq_id"] for result in results] == ["faq_1", None]
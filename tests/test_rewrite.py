@@ -0,0 +1,68 @@
+"""
+Tests for the local-first follow-up rewriter.
+"""
+import asyncio
+
+from app.main import corpus
+from app.rewrite import QueryRewriter, last_matched_faq, local_rewrite
+
+HISTORY = [
+    {"role": "user", "content": "What is Vendor Services?"},
+    {"role": "Edited user", "content": "No rewrite needed"},
+    {"role": "Matched FAQ", "content": "Found: What is Vendor Services?"},
+    {"role": "assistant", "content": "Vendor Services is a support program offered by Epic."},
+]
+
+class FakeLLMRewrite:
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+
+    async def __call__(self, user_input, history):
+        self.calls += 1
+        return self.result
+
+def test_last_matched_faq():
+    assert last_matched_faq(HISTORY) == "What is Vendor Services?"
+    assert last_matched_faq(HISTORY + [{"role": "Matched FAQ", "content": "No relevant FAQ found."}]) is None
+    assert last_matched_faq([]) is None
+
+def test_local_rewrite_replaces_pronouns():
+    assert local_rewrite("Who is it for?", "What is Vendor Services?") == "Who is Vendor Services for?"
+    assert local_rewrite("Who is it for?", None) == "Who is it for?"
+
+def test_local_rewrite_skips_llm_and_is_memoized():
+    llm = FakeLLMRewrite("unused")
+    rewriter = QueryRewriter(llm)
+
+    query, faq = asyncio.run(rewriter.rewrite("Who is it for?", HISTORY, corpus.retriever))
+    assert query == "Who is Vendor Services for?"
+    assert faq is not None
+
+    asyncio.run(rewriter.rewrite("who is it for", HISTORY, corpus.retriever))
+    assert llm.calls == 0
+    assert rewriter.stats() == {"avoided": 1, "cached": 1, "llm": 0, "memo_size": 1}
+
+def test_llm_used_when_local_rewrite_misses():
+    llm = FakeLLMRewrite("How much does it cost to subscribe to Vendor Services?")
+    rewriter = QueryRewriter(llm)
+    history = HISTORY[:2] + [{"role": "Matched FAQ", "content": "No relevant FAQ found."}]
+
+    query, faq = asyncio.run(rewriter.rewrite("and the price of that?", history, corpus.retriever))
+    assert query == llm.result
+    assert faq["id"] == "faq_7"
+
+    asyncio.run(rewriter.rewrite("and the price of that?", history, corpus.retriever))
+    assert llm.calls == 1
+    assert rewriter.stats()["llm"] == 1
+    assert rewriter.stats()["cached"] == 1
+
+def test_failed_llm_rewrite_falls_back_to_input():
+    async def failing_rewrite(user_input, history):
+        raise RuntimeError("LLM unavailable")
+
+    rewriter = QueryRewriter(failing_rewrite)
+    query, faq = asyncio.run(rewriter.rewrite("asdf qwerty that", [], corpus.retriever))
+    assert query == "asdf qwerty that"
+    assert faq is None
+    assert rewriter.stats()["memo_size"] == 0
@@ -0,0 +1,97 @@
+"""
+Tests for the multi-process launcher and the health/readiness endpoints.
+"""
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import uvicorn
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.cache import SQLiteCacheBackend
+from app.serve import DrainingServer, bind_socket
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+client = TestClient(main.app)
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def test_health_and_readiness(monkeypatch):
+    assert client.get("/healthz").json()["status"] == "ok"
+    ready = client.get("/readyz")
+    assert ready.status_code == 200 and ready.json()["corpus_version"] == main.corpus.version
+
+    monkeypatch.setattr(main.app.state, "draining", True)
+    assert client.get("/readyz").status_code == 503
+    assert client.get("/healthz").status_code == 200
+
+def test_draining_server_keeps_serving_until_deadline(monkeypatch):
+    monkeypatch.setattr(main.app.state, "draining", False)
+    server = DrainingServer(uvicorn.Config(main.app), main.app, drain_seconds=60)
+    server.handle_exit(signal.SIGTERM, None)
+    assert main.app.state.draining and not server.should_exit
+    assert server.drain_deadline > time.monotonic()
+
+    # A second signal ends the drain period.
+    server.handle_exit(signal.SIGTERM, None)
+    assert server.should_exit
+
+def test_bind_socket_is_shared_with_children():
+    sock = bind_socket("127.0.0.1", 0)
+    assert sock.get_inheritable()
+    sock.close()
+
+def test_sqlite_backend_reconnects_after_fork(tmp_path):
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.sqlite3"))
+    backend.set("parent", 1)
+    pid = os.fork()
+    if pid == 0:
+        try:
+            backend.set("child", backend.get("parent") + 1)
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+    assert backend.get("child") == 2
+
+def test_launcher_serves_from_workers_and_drains():
+    port = free_port()
+    env = {**os.environ, "USE_MOCK_GEMINI": "true", "FAQ_WATCH_INTERVAL_SECONDS": "0"}
+    proc = subprocess.Popen(
+        [sys.executable, "-W", "ignore", "-m", "app.serve", "--workers", "2", "--port", str(port), "--drain-seconds", "0.5"],
+        cwd=ROOT, env=env, stderr=subprocess.PIPE, text=True,
+    )
+    try:
+        url = f"http://127.0.0.1:{port}"
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                if httpx.get(f"{url}/readyz").status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            assert time.monotonic() < deadline, "launcher did not become ready"
+            time.sleep(0.1)
+
+        response = httpx.post(f"{url}/chat", json={"message": "What is Vendor Services?"})
+        assert response.status_code == 200 and response.json()["sources"] == ["What is Vendor Services?"]
+
+        proc.send_signal(signal.SIGTERM)
+        # Workers fail readiness while they drain, before they stop accepting connections.
+        statuses = set()
+        while 503 not in statuses and time.monotonic() < deadline:
+            statuses.add(httpx.get(f"{url}/readyz").status_code)
+        assert 503 in statuses
+        assert proc.wait(timeout=30) == 0
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+    assert "Draining 2 workers" in proc.stderr.read()
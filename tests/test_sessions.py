@@ -0,0 +1,79 @@
+"""
+Tests for the opt-in server-side session mode of /chat and /chat/stream.
+"""
+import json
+
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.cache import MemoryCacheBackend
+from app.session import SessionStore
+
+client = TestClient(main.app)
+
+CONVERSATION = ["What is Vendor Services?", "Who is it for?", "How much does it cost?"]
+
+def new_session():
+    return client.post("/sessions").json()["sessionID"]
+
+def test_session_matches_stateless_conversation():
+    session_id = new_session()
+    history = []
+    for message in CONVERSATION:
+        stateless = client.post("/chat", json={"message": message, "history": history}).json()
+        stateful = client.post("/chat", json={"message": message, "sessionID": session_id}).json()
+        history = stateless["history"]
+
+        assert stateful["sessionID"] == session_id
+        assert stateful["answer"] == stateless["answer"]
+        assert stateful["memory_used"] == stateless["memory_used"]
+        # Only the new turn comes back: user, Edited user, Matched FAQ, assistant.
+        assert [entry["role"] for entry in stateful["history"]] == ["user", "Edited user", "Matched FAQ", "assistant"]
+        assert stateful["history"] == history[-4:]
+        assert main.session_store.backend.get(session_id) == history
+
+def test_empty_message_leaves_session_unchanged():
+    session_id = new_session()
+    client.post("/chat", json={"message": "What is Vendor Services?", "sessionID": session_id})
+    stored = main.session_store.backend.get(session_id)
+
+    response = client.post("/chat", json={"message": "  ", "sessionID": session_id}).json()
+    assert response["history"] == []
+    assert main.session_store.backend.get(session_id) == stored
+
+def test_stream_session_done_event_has_only_new_turn():
+    session_id = new_session()
+    client.post("/chat", json={"message": "What is Vendor Services?", "sessionID": session_id})
+
+    body = client.post("/chat/stream", json={"message": "Who is it for?", "sessionID": session_id}).text
+    done = json.loads(body.strip().split("\n\n")[-1].split("data: ", 1)[1])
+    assert done["sessionID"] == session_id
+    assert len(done["history"]) == 4
+    assert len(main.session_store.backend.get(session_id)) == 8
+
+def test_expired_session_starts_new_conversation():
+    store = SessionStore(MemoryCacheBackend(max_size=2, ttl_seconds=60))
+    assert store.load("a") == []
+    store.save("a", [{"role": "user", "content": "hi"}])
+    loaded = store.load("a")
+    loaded.append({"role": "assistant", "content": "hello"})
+    # Loaded histories are copies; only save() changes the stored conversation.
+    assert store.load("a") == [{"role": "user", "content": "hi"}]
+
+    store.save("b", [])
+    store.save("c", [])
+    assert store.load("a") == []  # evicted as least recently used
+    assert store.stats()["started"] == 2
+    assert store.stats()["evictions"] == 1
+
+def test_delete_session():
+    session_id = new_session()
+    client.post("/chat", json={"message": "What is Vendor Services?", "sessionID": session_id})
+    assert client.delete(f"/sessions/{session_id}").json() == {"deleted": True}
+    assert main.session_store.backend.get(session_id) is None
+
+def test_sessions_disabled(monkeypatch):
+    monkeypatch.setattr(main, "session_store", SessionStore(None))
+    assert client.post("/sessions").status_code == 400
+    assert client.post("/chat", json={"message": "hi", "sessionID": "abc"}).status_code == 400
+    assert client.post("/chat", json={"message": "What is Vendor Services?"}).status_code == 200
@@ -0,0 +1,47 @@
+"""
+Tests for the lazy imports that keep app startup light: mock mode never loads the
+Gemini SDK, and a prebuilt index is served without scikit-learn.
+"""
+import json
+import os
+import subprocess
+import sys
+
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS, TfidfVectorizer
+
+from app.build_index import main as build_index
+from app.retrieval import QUESTION_STOP_WORDS
+from app.text import ENGLISH_STOP_WORDS as COPIED_STOP_WORDS, build_analyzer
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+PROBE = (
+    "import json, sys\n"
+    "import app.main\n"
+    "match = app.main.corpus.retriever.find_best_match('What is Vendor Services?')\n"
+    "print(json.dumps({'source': app.main.corpus.source, 'match': match['question'] if match else None,\n"
+    "                  'modules': [m for m in ('sklearn', 'google.generativeai') if m in sys.modules]}))\n"
+)
+
+def import_app(env):
+    proc = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", PROBE], cwd=ROOT, capture_output=True, text=True, check=True,
+        env={**os.environ, "FAQ_WATCH_INTERVAL_SECONDS": "0", **env},
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def test_copied_tokenization_matches_scikit_learn():
+    assert COPIED_STOP_WORDS == ENGLISH_STOP_WORDS
+    text = "What's the COST of Vendor-Services? It's ~$5 per año for a naïve café, 2024 (x, y)"
+    assert build_analyzer(ENGLISH_STOP_WORDS)(text) == TfidfVectorizer(stop_words="english").build_analyzer()(text)
+    assert build_analyzer(QUESTION_STOP_WORDS)(text) == TfidfVectorizer(stop_words=list(QUESTION_STOP_WORDS)).build_analyzer()(text)
+
+def test_prebuilt_index_in_mock_mode_imports_neither_sklearn_nor_gemini(tmp_path):
+    build_index(["--output", str(tmp_path)])
+    result = import_app({"USE_MOCK_GEMINI": "true", "FAQ_INDEX_PATH": str(tmp_path)})
+    assert result == {"source": "index", "match": "What is Vendor Services?", "modules": []}
+
+def test_gemini_sdk_is_loaded_on_first_use_only():
+    result = import_app({"USE_MOCK_GEMINI": "false", "FAQ_INDEX_PATH": ""})
+    # Fitting the corpus still needs scikit-learn.
+    assert result["modules"] == ["sklearn"] and result["source"] == "fit"